@@ -1,120 +1,116 @@
-from flask import Flask, request, jsonify
+from flask import Flask, jsonify
 from flask_cors import CORS
 from dotenv import load_dotenv
 import os
-import json
-import firebase_admin
-from firebase_admin import credentials
-import traceback
-
-# Import Blueprints
-from routes.auth_routes import auth_bp
-from routes.profile_routes import profile_bp
-from routes.main_routes import main_bp
-from routes.article_routes import article_bp
-from routes.stretching_routes import stretching_bp
-from routes.epds_routes import epds_bp
+import logging
 
+# .env harus dibaca sebelum modul proyek di-import: metrics, logging_config dan startup
+# membaca env (PROMETHEUS_MULTIPROC_DIR, METRICS_TOKEN, LOG_LEVEL, ...) saat import
 load_dotenv()
+
+import logging_config
+import metrics
+import http_cache
+import startup
+
+logging_config.configure_logging()
+logger = logging.getLogger(__name__)
 API_KEY = os.getenv("API_KEY")
 
+# Role worker: 'api' (CRUD saja), 'inference' (deteksi pose saja) atau 'all'
+APP_ROLE = os.getenv("APP_ROLE", "all")
+
 # ==========================================
-# 1. INISIALISASI FIREBASE (GLOBAL SCOPE)
+# 1. APP FACTORY
 # ==========================================
 
-# Cek nama variable, bisa FIREBASE_KEY atau FIREBASE_CREDENTIALS
-raw_cred = os.getenv('FIREBASE_KEY') or os.getenv('FIREBASE_CREDENTIALS')
+def register_blueprints(app, role):
+    """Daftarkan hanya blueprint milik role ini.
 
-if not raw_cred:
-    print("❌ FATAL: Environment Variable Firebase tidak ditemukan!")
-    raise ValueError("Firebase Environment Variable Missing")
+    Blueprint di-import di dalam fungsi agar role 'api' tidak pernah meng-import
+    modul deteksi, dan role 'inference' tidak perlu Firebase.
+    """
+    from routes.main_routes import main_bp
+    app.register_blueprint(main_bp)
 
-try:
-    # 1. Parsing Pertama
-    cred_dict = json.loads(raw_cred)
+    if role in ('api', 'all'):
+        from routes.auth_routes import auth_bp
+        from routes.profile_routes import profile_bp
+        from routes.article_routes import article_bp
+        from routes.stretching_routes import stretching_bp
+        from routes.epds_routes import epds_bp
 
-    # 2. FIX CRITICAL ERROR: DOUBLE PARSING
-    # Jika hasil parsing masih berupa string (karena ada kutip dobel di env var),
-    # kita parse sekali lagi agar menjadi Dictionary.
-    if isinstance(cred_dict, str):
-        print("⚠️ Mendeteksi double-encoded JSON, melakukan parsing ulang...")
-        cred_dict = json.loads(cred_dict)
+        app.register_blueprint(auth_bp)
+        app.register_blueprint(profile_bp)
+        app.register_blueprint(article_bp)
+        app.register_blueprint(stretching_bp)
+        app.register_blueprint(epds_bp)
 
-    # 3. FIX BUG PRIVATE KEY
-    # Pastikan ini sudah berupa dictionary sebelum mengakses key
-    if isinstance(cred_dict, dict) and 'private_key' in cred_dict:
-        cred_dict['private_key'] = cred_dict['private_key'].replace('\\n', '\n')
-    
-    # 4. Initialize App
-    if not firebase_admin._apps:
-        cred = credentials.Certificate(cred_dict)
-        firebase_admin.initialize_app(cred)
-        print("✅ SUCCESS: Firebase Admin initialized successfully!")
-        
-except Exception as e:
-    print(f"❌ CRITICAL ERROR initializing Firebase: {str(e)}")
-    traceback.print_exc()
-    # Paksa berhenti agar kita bisa lihat lognya di deployment
-    raise e
+    if role in ('inference', 'all'):
+        from routes.detect_routes import detect_bp
+        app.register_blueprint(detect_bp)
 
-# ==========================================
-# 2. APP FACTORY
-# ==========================================
+def create_app(role=None):
+    role = role or APP_ROLE
+    if role not in ('api', 'inference', 'all'):
+        raise ValueError(f"APP_ROLE tidak dikenal: {role} (pilihan: api, inference, all)")
 
-def create_app():
     app = Flask(__name__)
+    app.config['APP_ROLE'] = role
+    # Batas ukuran body request (termasuk upload frame deteksi)
+    app.config['MAX_CONTENT_LENGTH'] = int(os.getenv("MAX_CONTENT_LENGTH", str(4 * 1024 * 1024)))
     
     # Configure CORS
     CORS(app, resources={
         r"/*": {
             "origins": "*",
             "allow_headers": ["Content-Type", "Authorization", "x-api-key"],
-            "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"]
+            "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+            "expose_headers": ["X-Next-Cursor", "ETag"]
         }
     })
 
-    # Add request logging middleware
-    @app.before_request
-    def log_request():
-        print(f"\n➡️ [{request.method}] {request.url}")
-        if request.is_json:
-            try:
-                body = request.get_json()
-                if body and 'firebase_token' in body:
-                    body_copy = body.copy()
-                    body_copy['firebase_token'] = "HIDDEN_TOKEN"
-                    print(f"Body: {body_copy}")
-                else:
-                    print(f"Body: {body}")
-            except:
-                pass
-
     # Error handlers
     @app.errorhandler(404)
     def not_found(error):
         return jsonify({'message': 'Endpoint tidak ditemukan'}), 404
 
+    @app.errorhandler(413)
+    def request_too_large(error):
+        return jsonify({'message': 'Ukuran request terlalu besar'}), 413
+
     @app.errorhandler(500)
     def internal_error(error):
-        print(f"500 Error: {error}")
+        logger.error("500 Error: %s", error)
         return jsonify({'message': 'Terjadi kesalahan server internal'}), 500
 
     # Register blueprints
-    app.register_blueprint(main_bp)
-    app.register_blueprint(auth_bp)
-    app.register_blueprint(profile_bp)
-    app.register_blueprint(article_bp)
-    app.register_blueprint(stretching_bp)
-    app.register_blueprint(epds_bp)
+    register_blueprints(app, role)
+
+    # Structured access log (body di-sample & di-redact) dan level per blueprint
+    logging_config.init_app(app)
+
+    # Histogram latency per route dan endpoint /metrics (format Prometheus)
+    metrics.init_app(app)
+
+    # ETag/304, Cache-Control per blueprint dan kompresi gzip/brotli untuk JSON besar
+    http_cache.init_app(app)
+
+    # Inisialisasi dependency paralel + warm-up model sebelum menerima traffic
+    startup.register_role_dependencies(role)
+    startup.start()
+    startup.start_background_tasks(role)
+
+    logger.info("App created with role: %s", role)
     
     return app
 
 # ==========================================
-# 3. ENTRY POINT
+# 2. ENTRY POINT
 # ==========================================
 
 app = create_app()
 
 if __name__ == '__main__':
-    print(f"Starting Flask app...")
+    logger.info("Starting Flask app...")
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,117 @@
+"""Mode serving async (ASGI) dengan URL dan bentuk respons yang sama seperti app.py.
+
+Handler di asgi_routes/ berjalan sebagai coroutine di atas AsyncMongoClient,
+jadi query MongoDB yang lambat tidak menahan satu worker penuh. Deteksi pose
+(CPU-bound) dijalankan di executor.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 8080
+    gunicorn asgi:app -k uvicorn_worker.UvicornWorker --bind 0.0.0.0:8080
+"""
+import asyncio
+import logging
+import os
+
+from dotenv import load_dotenv
+from quart import Quart, jsonify
+from quart_cors import cors
+
+# Sama seperti app.py: .env dibaca sebelum modul proyek yang membaca env saat import
+load_dotenv()
+
+import logging_config
+import startup
+
+logging_config.configure_logging()
+logger = logging.getLogger(__name__)
+
+# Role worker: 'api' (CRUD saja), 'inference' (deteksi pose saja) atau 'all'
+APP_ROLE = os.getenv("APP_ROLE", "all")
+
+
+def register_blueprints(app, role):
+    """Sama seperti app.register_blueprints, dengan blueprint dari asgi_routes."""
+    from asgi_routes.main_routes import main_bp
+    app.register_blueprint(main_bp)
+
+    if role in ('api', 'all'):
+        from asgi_routes.auth_routes import auth_bp
+        from asgi_routes.profile_routes import profile_bp
+        from asgi_routes.article_routes import article_bp
+        from asgi_routes.stretching_routes import stretching_bp
+        from asgi_routes.epds_routes import epds_bp
+
+        app.register_blueprint(auth_bp)
+        app.register_blueprint(profile_bp)
+        app.register_blueprint(article_bp)
+        app.register_blueprint(stretching_bp)
+        app.register_blueprint(epds_bp)
+
+    if role in ('inference', 'all'):
+        from asgi_routes.detect_routes import detect_bp
+        app.register_blueprint(detect_bp)
+
+
+def create_app(role=None):
+    role = role or APP_ROLE
+    if role not in ('api', 'inference', 'all'):
+        raise ValueError(f"APP_ROLE tidak dikenal: {role} (pilihan: api, inference, all)")
+
+    app = Quart(__name__)
+    app.config['APP_ROLE'] = role
+    app.config['MAX_CONTENT_LENGTH'] = int(os.getenv("MAX_CONTENT_LENGTH", str(4 * 1024 * 1024)))
+
+    app = cors(
+        app,
+        allow_origin='*',
+        allow_headers=["Content-Type", "Authorization", "x-api-key"],
+        allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+        expose_headers=["X-Next-Cursor", "ETag"],
+    )
+
+    @app.errorhandler(404)
+    async def not_found(error):
+        return jsonify({'message': 'Endpoint tidak ditemukan'}), 404
+
+    @app.errorhandler(413)
+    async def request_too_large(error):
+        return jsonify({'message': 'Ukuran request terlalu besar'}), 413
+
+    @app.errorhandler(500)
+    async def internal_error(error):
+        logger.error("500 Error: %s", error)
+        return jsonify({'message': 'Terjadi kesalahan server internal'}), 500
+
+    register_blueprints(app, role)
+
+    # Access log, histogram latency, /metrics, ETag/Cache-Control dan kompresi
+    from asgi_routes import common
+    common.init_app(app)
+
+    startup.register_role_dependencies(role, mongodb=False)
+
+    @app.before_serving
+    async def start_worker():
+        # Dijalankan di setiap worker setelah fork, di dalam event loop-nya sendiri
+        if role in ('api', 'all'):
+            import db_async
+            db_async.connect()
+            # Ping lewat client async di event loop ini, bukan client sync db.py
+            startup.register('mongodb', db_async.ping_threadsafe, check=db_async.ping_threadsafe)
+        # Init dependency (blocking) di thread agar event loop tidak tertahan
+        await asyncio.to_thread(startup.start)
+        startup.start_background_tasks(role)
+
+    @app.after_serving
+    async def stop_worker():
+        if role in ('api', 'all'):
+            import db_async
+            await db_async.close()
+
+    logger.info("ASGI app created with role: %s", role)
+    return app
+
+
+app = create_app()
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=int(os.getenv("PORT", "5000")))
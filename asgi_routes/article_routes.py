@@ -0,0 +1,107 @@
+from quart import Blueprint, request, jsonify
+import db_async
+from asgi_routes.common import require_api_key, conditional_json
+from catalog_cache import cached_async, catalog_cache
+from http_cache import NO_STORE
+from routes.article_routes import ARTICLE_DETAIL_PROJECTION, find_articles, format_articles, visualization_sources
+from visualization import SUMMARY_ID
+from bson import ObjectId
+import logging
+
+article_bp = Blueprint('article', __name__)
+logger = logging.getLogger(__name__)
+
+# Endpoint untuk daftar artikel (tanpa content)
+@article_bp.route('/articles', methods=['GET'])
+@require_api_key
+async def get_articles():
+    try:
+        limit = request.args.get('limit', default=None, type=int)
+
+        async def load_articles():
+            return format_articles(await find_articles(db_async.articles_collection, limit).to_list())
+
+        articles, etag = await cached_async('articles', 'articles', limit, load_articles)
+
+        if not articles:
+            return jsonify({'message': 'Tidak ada artikel ditemukan'}), 404
+
+        return conditional_json(articles, etag)
+
+    except Exception as e:
+        logger.exception("Articles error: %s", e)
+        return jsonify({'message': 'Terjadi kesalahan server'}), 500
+
+# Endpoint untuk detail artikel berdasarkan ID
+@article_bp.route('/article/<article_id>', methods=['GET'])
+@require_api_key
+async def get_article_detail(article_id):
+    try:
+        if not ObjectId.is_valid(article_id):
+            logger.warning("Invalid article ID format")
+            return jsonify({'message': 'ID artikel tidak valid'}), 400
+
+        article, etag = await cached_async(
+            'articles', 'article_detail', article_id,
+            lambda: db_async.articles_collection.find_one({'_id': ObjectId(article_id)}, ARTICLE_DETAIL_PROJECTION),
+        )
+
+        if not article:
+            logger.warning("Article not found for ID: %s", article_id)
+            return jsonify({'message': 'Artikel tidak ditemukan'}), 404
+
+        return conditional_json(article, etag)
+
+    except Exception as e:
+        logger.exception("Article detail error: %s", e)
+        return jsonify({'message': 'Terjadi kesalahan server'}), 500
+
+
+#Endpoint untuk Visualisasi
+@article_bp.route("/api/visualization", methods=["GET"])
+@require_api_key
+async def get_visualization_data():
+    try:
+        summary, etag, headers = None, None, {}
+        for summary_id, headers in visualization_sources():
+            summary, etag = await cached_async(
+                'visualization', 'visualization', summary_id,
+                lambda: db_async.visualization_collection.find_one({"_id": summary_id}, {"_id": 0}),
+            )
+            if summary:
+                break
+
+        if not summary:
+            return jsonify({"message": "No summary found"}), 404
+
+        response = conditional_json(summary["data"], etag)
+        response.headers.update(headers)
+        return response
+    except Exception as e:
+        logger.exception("Visualization error: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+
+# Ringkasan yang dikelola backend (visualization.py)
+@article_bp.route("/api/v2/visualization", methods=["GET"])
+@require_api_key
+async def get_visualization_summary():
+    try:
+        summary, etag = await cached_async(
+            'visualization', 'visualization', SUMMARY_ID,
+            lambda: db_async.visualization_collection.find_one({"_id": SUMMARY_ID}, {"_id": 0}),
+        )
+
+        if not summary:
+            return jsonify({"message": "No summary found"}), 404
+
+        return conditional_json(summary["data"], etag)
+    except Exception as e:
+        logger.exception("Visualization error: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+
+@article_bp.route('/api/catalog/stats', methods=['GET'])
+@require_api_key
+async def get_catalog_cache_stats():
+    return jsonify(catalog_cache.stats()), 200, {'Cache-Control': NO_STORE}
@@ -0,0 +1,202 @@
+import asyncio
+import logging
+from quart import Blueprint, request, jsonify, g
+import db_async
+import firebase_verifier
+import mailer
+from asgi_routes.common import require_api_key, require_user, conditional
+from http_cache import PRIVATE_CACHE_CONTROL
+from pagination import find_page_async, parse_page_args, with_next_cursor
+from passwords import PasswordHasherBusy, RETRY_AFTER_SECONDS, password_hasher
+from routes.auth_routes import (
+    VERIFIED_UPDATE, check_login_user, check_otp, format_login_history, login_history_query, login_record,
+    new_oauth_user, new_user, oauth_identity, parse_login, parse_oauth, parse_register, password_upgrade,
+    verify_firebase_token,
+)
+from utils import generate_token
+from write_behind import login_history_writer
+
+auth_bp = Blueprint('auth', __name__)
+logger = logging.getLogger(__name__)
+
+
+def _busy_response():
+    response = jsonify({'message': 'Server sedang sibuk, coba lagi sebentar lagi'})
+    response.headers['Retry-After'] = str(RETRY_AFTER_SECONDS)
+    return response, 503
+
+
+def _error(error):
+    payload, status = error
+    return jsonify(payload), status
+
+
+@auth_bp.route('/register', methods=['POST'])
+@require_api_key
+async def register():
+    try:
+        fields, error = parse_register(await request.get_json())
+        if error:
+            return _error(error)
+        email, password, nama = fields
+
+        if await db_async.users_collection.find_one({'email': email}):
+            logger.warning("Email already exists: %s", email)
+            return jsonify({'message': 'Email sudah terdaftar'}), 400
+
+        # Hashing berjalan di pool password_hasher, bukan di event loop
+        user, otp_email = new_user(email, await password_hasher.hash_async(password), nama)
+        await db_async.users_collection.insert_one(user)
+        await db_async.outbox_collection.insert_one(otp_email)
+        mailer.notify_dispatcher()
+
+        logger.info("User registered successfully: %s", email)
+        return jsonify({'message': 'Kode OTP telah dikirim ke email'}), 201
+
+    except PasswordHasherBusy as e:
+        logger.warning("Register rejected: %s", e)
+        return _busy_response()
+    except Exception as e:
+        logger.exception("❌ Error saat register: %s", e)
+        return jsonify({'message': 'Terjadi kesalahan di server'}), 500
+
+@auth_bp.route('/verify-otp', methods=['POST'])
+@require_api_key
+async def verify_otp():
+    data = await request.get_json()
+    email = data.get('email')
+
+    user = await db_async.users_collection.find_one({'email': email})
+    error = check_otp(user, data.get('otp'))
+    if error:
+        return _error(error)
+
+    await db_async.users_collection.update_one({'email': email}, VERIFIED_UPDATE)
+
+    return jsonify({'message': 'Verifikasi berhasil'}), 200
+
+@auth_bp.route('/login', methods=['POST'])
+@require_api_key
+async def login():
+    try:
+        fields, error = parse_login(await request.get_json())
+        if error:
+            return _error(error)
+        email, password, device_info = fields
+
+        user = await db_async.users_collection.find_one({'email': email})
+        error = check_login_user(user, email)
+        if error:
+            return _error(error)
+
+        matched, upgraded_hash = await password_hasher.verify_async(user['password'], password)
+        if not matched:
+            logger.warning("Wrong password for: %s", email)
+            return jsonify({'message': 'Password salah'}), 401
+
+        if upgraded_hash:
+            await db_async.users_collection.update_one(*password_upgrade(user, upgraded_hash))
+            logger.info("Password hash upgraded for %s", email)
+
+        token = generate_token(user['_id'])
+        logger.info("Login successful for %s", email)
+
+        await login_history_writer.submit_async(login_record(user, device_info, request.remote_addr))
+
+        return jsonify({'token': token, 'nama': user['nama']}), 200
+    except PasswordHasherBusy as e:
+        logger.warning("Login rejected: %s", e)
+        return _busy_response()
+    except Exception as e:
+        logger.exception("Login error: %s", e)
+        return jsonify({'message': 'Terjadi kesalahan server'}), 500
+
+async def find_or_create_oauth_user(email, name, firebase_uid):
+    """Lihat routes.auth_routes.find_or_create_oauth_user."""
+    user = None
+    cached_user_id = firebase_verifier.uid_cache.get(firebase_uid)
+    if cached_user_id is not None:
+        user = await db_async.users_collection.find_one({'_id': cached_user_id}, {'nama': 1})
+        if not user:
+            firebase_verifier.uid_cache.discard(firebase_uid)
+    from_cache = user is not None
+    if not user:
+        user = await db_async.users_collection.find_one({'email': email})
+    if not user:
+        logger.info("Creating new user for %s", email)
+        result = await db_async.users_collection.insert_one(new_oauth_user(email, name, firebase_uid))
+        user = await db_async.users_collection.find_one({'_id': result.inserted_id})
+        logger.info("New user created with ID: %s", result.inserted_id)
+    elif not from_cache and 'firebase_uid' not in user:
+        await db_async.users_collection.update_one({'_id': user['_id']}, {'$set': {'firebase_uid': firebase_uid}})
+        logger.info("Updated user with Firebase UID")
+    firebase_verifier.uid_cache.put(firebase_uid, user['_id'])
+    return user
+
+@auth_bp.route('/login_oauth', methods=['POST', 'OPTIONS'])
+@require_api_key
+async def login_oauth():
+    if request.method == 'OPTIONS':
+        response = jsonify({'status': 'OK'})
+        response.headers.add('Access-Control-Allow-Origin', '*')
+        response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,x-api-key')
+        response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
+        return response
+
+    try:
+        fields, error = parse_oauth(await request.get_json() if request.is_json else None, request.is_json)
+        if error:
+            return _error(error)
+        firebase_token, device_info = fields
+
+        # Refresh sertifikat Google bisa menunggu jaringan, jadi verifikasi di thread
+        decoded, error = await asyncio.to_thread(verify_firebase_token, firebase_token)
+        if error:
+            return _error(error)
+
+        identity, error = oauth_identity(decoded)
+        if error:
+            return _error(error)
+        email = identity[0]
+
+        try:
+            user = await find_or_create_oauth_user(*identity)
+        except Exception as e:
+            logger.exception("Database operation failed: %s", e)
+            return jsonify({'message': 'Terjadi kesalahan database'}), 500
+
+        try:
+            token = generate_token(user['_id'])
+        except Exception as e:
+            logger.exception("Token generation failed: %s", e)
+            return jsonify({'message': 'Gagal membuat token'}), 500
+
+        logger.info("OAuth login successful for %s", email)
+        await login_history_writer.submit_async(login_record(user, device_info, request.remote_addr))
+
+        return jsonify({'token': token, 'nama': user['nama']}), 200
+
+    except Exception as e:
+        logger.exception("CRITICAL ERROR in OAuth login: %s", e)
+        return jsonify({'message': 'Terjadi kesalahan server saat login OAuth'}), 500
+
+@auth_bp.route('/login-history', methods=['GET'])
+@require_api_key
+@require_user
+async def get_login_history():
+    try:
+        try:
+            limit, cursor = parse_page_args(request.args)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+
+        docs, next_cursor = await find_page_async(
+            db_async.history_collection, *login_history_query(g.user_id), limit, cursor,
+        )
+
+        response = with_next_cursor(jsonify(format_login_history(docs)), next_cursor)
+        return await conditional(response, PRIVATE_CACHE_CONTROL)
+
+    except Exception as e:
+        logger.exception("History error: %s", e)
+        return jsonify({'message': 'Terjadi kesalahan server'}), 500
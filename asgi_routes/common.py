@@ -0,0 +1,137 @@
+"""Middleware, conditional GET dan hook app untuk blueprint Quart (mode ASGI).
+
+Adapter tipis di atas middleware.py, http_cache.py, metrics.py dan
+logging_config.py: yang berbeda hanya cara membaca body (await) dan
+pekerjaan berat yang dipindah dari event loop.
+"""
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+
+from bson import ObjectId
+from quart import Response, current_app, g, jsonify, request
+
+import db_async
+import http_cache
+import logging_config
+import metrics
+from middleware import check_api_key, check_bearer_token
+
+logger = logging.getLogger(__name__)
+
+# Executor untuk pekerjaan CPU-bound (decode frame, MediaPipe, model) agar event loop tetap bebas
+DETECT_EXECUTOR_WORKERS = int(os.getenv("ASGI_DETECT_WORKERS", str(os.cpu_count() or 2)))
+
+_detect_executor = None
+_detect_executor_pid = None
+
+
+def detect_executor():
+    """Executor deteksi per proses (dibuat ulang setelah fork)."""
+    global _detect_executor, _detect_executor_pid
+    if _detect_executor_pid != os.getpid():
+        _detect_executor = ThreadPoolExecutor(max_workers=DETECT_EXECUTOR_WORKERS, thread_name_prefix='detect')
+        _detect_executor_pid = os.getpid()
+    return _detect_executor
+
+
+async def offload(fn, *args):
+    """Jalankan fungsi sync CPU-bound di executor deteksi."""
+    return await asyncio.get_running_loop().run_in_executor(detect_executor(), partial(fn, *args))
+
+
+def require_api_key(f):
+    @wraps(f)
+    async def decorated_function(*args, **kwargs):
+        error = check_api_key(request.headers.get('x-api-key'))
+        if error:
+            payload, status = error
+            return jsonify(payload), status
+        return await f(*args, **kwargs)
+    return decorated_function
+
+
+def require_user(f=None, *, error_key='message'):
+    """middleware.require_user untuk Quart; verify_token (di-cache) cukup murah untuk event loop."""
+    def decorator(f):
+        @wraps(f)
+        async def decorated_function(*args, **kwargs):
+            user_id, error = check_bearer_token(request.headers.get('Authorization'), error_key)
+            if error:
+                payload, status = error
+                return jsonify(payload), status
+
+            g.user_id = user_id
+            return await f(*args, **kwargs)
+        return decorated_function
+    return decorator(f) if f is not None else decorator
+
+
+async def current_user():
+    """Dokumen user pemilik token (None jika sudah dihapus), di-load sekali per request."""
+    if '_current_user' not in g:
+        g._current_user = await db_async.users_collection.find_one({'_id': ObjectId(g.user_id)})
+    return g._current_user
+
+
+def conditional_json(payload, etag, cache_control=None):
+    """http_cache.conditional_json untuk Quart."""
+    matched = http_cache.matching_etag(etag, request.if_none_match)
+    if matched:
+        return http_cache.not_modified(current_app.response_class, matched, cache_control)
+    return http_cache.with_etag(jsonify(payload), etag, cache_control)
+
+
+async def conditional(response, cache_control=None):
+    """http_cache.conditional untuk Quart (body respons Quart dibaca secara async)."""
+    return http_cache.revalidate(
+        response, await response.get_data(), request.if_none_match, current_app.response_class, cache_control,
+    )
+
+
+async def compress_response(response):
+    if not http_cache.compressible(response):
+        return response
+    response.vary.add('Accept-Encoding')
+    data = await response.get_data()
+    coding = http_cache.negotiate_coding(request.accept_encodings, len(data))
+    if coding is None:
+        return response
+    # Body besar: kompresi di thread agar tidak menahan request lain
+    compressed = await asyncio.to_thread(http_cache.compress_body, data, coding)
+    http_cache.set_compressed(response, compressed, coding)
+    return response
+
+
+def init_app(app):
+    """Access log, metrics latency, /metrics dan HTTP caching untuk app Quart."""
+    logging_config.configure_logging()
+    logging_config.set_blueprint_levels(app)
+
+    @app.before_request
+    async def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    async def finish_request(response):
+        started = g.get('request_started')
+        metrics.observe_request(request, response.status_code, started)
+
+        request_logger = logging_config.blueprint_logger(app, request.blueprint)
+        if request_logger.isEnabledFor(logging.INFO):
+            fields = logging_config.request_log_fields(request, response.status_code, started)
+            if logging_config.sample_body(request):
+                fields['body'] = logging_config.redact(await request.get_json(silent=True))
+            request_logger.info("%s %s %s", request.method, request.path, response.status_code, extra=fields)
+
+        http_cache.default_cache_control(response, request.method, request.blueprint)
+        return await compress_response(response)
+
+    @app.route('/metrics', endpoint='metrics')
+    async def metrics_endpoint():
+        if not metrics.metrics_allowed(request.headers.get('Authorization')):
+            return Response('Forbidden\n', status=403, mimetype='text/plain')
+        return Response(await asyncio.to_thread(metrics.render_metrics), mimetype=metrics.CONTENT_TYPE_LATEST)
@@ -0,0 +1,146 @@
+"""Endpoint deteksi pose untuk mode ASGI.
+
+Body dibaca secara async, lalu decode frame, MediaPipe dan model dijalankan di
+executor deteksi (`ASGI_DETECT_WORKERS`) sehingga event loop tetap melayani
+request lain. Logika deteksinya sama dengan routes/detect_routes.py.
+"""
+import logging
+from quart import Blueprint, request, jsonify
+from asgi_routes.common import require_api_key, offload
+from inference import pipeline
+from inference.pose_pool import PoolTimeout
+from inference.sessions import session_store
+from routes.detect_routes import (
+    MAX_FRAME_BYTES, RAW_IMAGE_TYPES, client_key_for, close_session, create_session, detect_frame, detect_stats,
+    keypoints_from_buffer, keypoints_from_json, score_keypoints, session_frame,
+)
+
+detect_bp = Blueprint('detect', __name__)
+logger = logging.getLogger(__name__)
+
+
+def frame_too_large():
+    return jsonify({'error': f'Ukuran frame melebihi batas {MAX_FRAME_BYTES} bytes'}), 413
+
+
+async def read_frame_request():
+    """Lihat routes.detect_routes.read_frame_request; return (frame, fields, error_response)."""
+    mimetype = request.mimetype
+
+    if mimetype in RAW_IMAGE_TYPES:
+        if request.content_length is not None and request.content_length > MAX_FRAME_BYTES:
+            return None, None, frame_too_large()
+        buffer = await request.get_data(cache=False)
+        if len(buffer) > MAX_FRAME_BYTES:
+            return None, None, frame_too_large()
+        frame = await offload(pipeline.decode_frame_bytes, buffer) if buffer else None
+        return frame, request.args.to_dict(), None
+
+    if mimetype == 'multipart/form-data':
+        form = await request.form
+        files = await request.files
+        fields = {**request.args.to_dict(), **form.to_dict()}
+        upload = files.get('image')
+        if upload is None:
+            return None, fields, None
+        buffer = upload.read(MAX_FRAME_BYTES + 1)
+        if len(buffer) > MAX_FRAME_BYTES:
+            return None, None, frame_too_large()
+        return await offload(pipeline.decode_frame_bytes, buffer), fields, None
+
+    data = await request.get_json(silent=True) or {}
+    fields = {key: value for key, value in data.items() if key != 'image'}
+    image_b64 = data.get('image')
+    if not image_b64:
+        return None, fields, None
+    if len(image_b64) * 3 // 4 > MAX_FRAME_BYTES:
+        return None, None, frame_too_large()
+    return await offload(pipeline.decode_base64_frame, image_b64), fields, None
+
+
+@detect_bp.route('/api/detect', methods=['POST'])
+@require_api_key
+async def detect_pose_api():
+    try:
+        frame, data, error = await read_frame_request()
+        if error:
+            return error
+        if frame is None or 'target_label' not in data:
+            return jsonify({'error': 'Data tidak lengkap'}), 400
+
+        return jsonify(await offload(detect_frame, frame, data['target_label'], client_key_for(request)))
+
+    except PoolTimeout as e:
+        logger.warning("Pose pool exhausted: %s", e)
+        return jsonify({'error': 'Server sedang sibuk, coba lagi'}), 503
+    except Exception as e:
+        logger.exception("detect_pose_api error: %s", e)
+        return jsonify({'error': f'Terjadi kesalahan di server: {e}'}), 500
+
+
+@detect_bp.route('/api/detect/keypoints', methods=['POST'])
+@require_api_key
+async def detect_keypoints_api():
+    try:
+        if request.mimetype == 'application/octet-stream':
+            fields = request.args.to_dict()
+            sequences, error = keypoints_from_buffer(await request.get_data(cache=False), fields.get('dtype', 'float32'))
+        else:
+            sequences, fields, error = keypoints_from_json(await request.get_json(silent=True) or {})
+        if error:
+            return jsonify(error[0]), error[1]
+
+        payload, status = await offload(score_keypoints, sequences, fields)
+        return jsonify(payload), status
+
+    except Exception as e:
+        logger.exception("detect_keypoints_api error: %s", e)
+        return jsonify({'error': f'Terjadi kesalahan di server: {e}'}), 500
+
+
+@detect_bp.route('/api/detect/session', methods=['POST'])
+@require_api_key
+async def create_detect_session():
+    try:
+        payload, status = create_session(await request.get_json(silent=True) or {})
+        return jsonify(payload), status
+    except Exception as e:
+        logger.exception("create_detect_session error: %s", e)
+        return jsonify({'error': f'Terjadi kesalahan di server: {e}'}), 500
+
+
+@detect_bp.route('/api/detect/session/<session_id>/frame', methods=['POST'])
+@require_api_key
+async def push_detect_frame(session_id):
+    try:
+        session = session_store.get(session_id)
+        if session is None:
+            return jsonify({'error': 'Session tidak ditemukan atau sudah kedaluwarsa'}), 404
+
+        frame, _, error = await read_frame_request()
+        if error:
+            return error
+        if frame is None:
+            return jsonify({'error': 'Data tidak lengkap'}), 400
+
+        return jsonify(await offload(session_frame, session, frame))
+
+    except PoolTimeout as e:
+        logger.warning("Pose pool exhausted: %s", e)
+        return jsonify({'error': 'Server sedang sibuk, coba lagi'}), 503
+    except Exception as e:
+        logger.exception("push_detect_frame error: %s", e)
+        return jsonify({'error': f'Terjadi kesalahan di server: {e}'}), 500
+
+
+@detect_bp.route('/api/detect/session/<session_id>', methods=['DELETE'])
+@require_api_key
+async def close_detect_session(session_id):
+    payload, status = close_session(session_id)
+    return jsonify(payload), status
+
+
+@detect_bp.route('/api/detect/stats', methods=['GET'])
+@require_api_key
+async def get_detect_stats():
+    return jsonify(detect_stats()), 200
@@ -0,0 +1,43 @@
+import logging
+from quart import Blueprint, request, jsonify, g
+import db_async
+from asgi_routes.common import require_api_key, require_user, conditional
+from routes.epds_routes import epds_history_query, epds_record, format_epds_history
+from pagination import find_page_async, parse_page_args, with_next_cursor
+from http_cache import PRIVATE_CACHE_CONTROL
+
+epds_bp = Blueprint('epds', __name__)
+logger = logging.getLogger(__name__)
+
+@epds_bp.route('/api/epds', methods=['POST'])
+@require_api_key
+@require_user
+async def save_epds_result():
+    try:
+        data = await request.get_json()
+        await db_async.epds_collection.insert_one(epds_record(g.user_id, data['score']))
+
+        return jsonify({'message': 'Hasil EPDS berhasil disimpan'}), 201
+    except Exception as e:
+        logger.exception("❌ Error saat menyimpan: %s", e)
+        return jsonify({'message': 'Terjadi kesalahan di server'}), 500
+
+@epds_bp.route('/api/epds/history', methods=['GET'])
+@require_api_key
+@require_user
+async def get_epds_history():
+    try:
+        try:
+            limit, cursor = parse_page_args(request.args)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+
+        records, next_cursor = await find_page_async(
+            db_async.epds_collection, *epds_history_query(g.user_id), limit, cursor,
+        )
+
+        response = with_next_cursor(jsonify(format_epds_history(records)), next_cursor)
+        return await conditional(response, PRIVATE_CACHE_CONTROL)
+    except Exception as e:
+        logger.exception("History error: %s", e)
+        return jsonify({'message': 'Terjadi kesalahan server'}), 500
@@ -0,0 +1,23 @@
+import asyncio
+from quart import Blueprint, jsonify
+from asgi_routes.common import require_api_key
+from routes.main_routes import readiness_payload
+import startup
+
+main_bp = Blueprint('main', __name__)
+
+@main_bp.route('/', methods=['GET'])
+@require_api_key
+async def health_check():
+    return jsonify({'status': 'OK', 'message': 'Server is running'}), 200
+
+# Liveness: proses hidup dan bisa menjawab request (tanpa cek dependency)
+@main_bp.route('/healthz', methods=['GET'])
+async def liveness():
+    return jsonify({'status': 'OK'}), 200
+
+# Readiness: cek dependency memakai client sync, jadi dijalankan di thread
+@main_bp.route('/readyz', methods=['GET'])
+async def readiness():
+    payload, status = readiness_payload(*await asyncio.to_thread(startup.readiness))
+    return jsonify(payload), status
@@ -0,0 +1,92 @@
+from quart import Blueprint, request, jsonify, g
+import db_async
+from asgi_routes.common import require_api_key, require_user, current_user
+from routes.profile_routes import parse_program_update, parse_profile_update, profile_payload
+from utils import token_cache
+from bson import ObjectId
+import logging
+
+profile_bp = Blueprint('profile', __name__)
+logger = logging.getLogger(__name__)
+
+@profile_bp.route('/profile', methods=['GET'])
+@require_api_key
+@require_user
+async def get_profile():
+    try:
+        user = await current_user()
+        if not user:
+            logger.warning("User not found for ID: %s", g.user_id)
+            return jsonify({'message': 'Pengguna tidak ditemukan'}), 404
+
+        return jsonify(profile_payload(user)), 200
+    except Exception as e:
+        logger.exception("Profile error: %s", e)
+        return jsonify({'message': 'Terjadi kesalahan server'}), 500
+
+@profile_bp.route('/profile', methods=['PUT'])
+@require_api_key
+@require_user
+async def update_profile():
+    try:
+        update_fields, error = parse_profile_update(await request.get_json())
+        if error:
+            payload, status = error
+            return jsonify(payload), status
+
+        result = await db_async.users_collection.update_one(
+            {'_id': ObjectId(g.user_id)},
+            {'$set': update_fields}
+        )
+
+        if result.matched_count == 0:
+            return jsonify({'message': 'Pengguna tidak ditemukan'}), 404
+
+        return jsonify({'message': 'Profil berhasil diperbarui'})
+    except Exception as e:
+        logger.exception("Update profile error: %s", e)
+        return jsonify({'message': 'Terjadi kesalahan server'}), 500
+
+@profile_bp.route('/program', methods=['PUT'])
+@require_api_key
+@require_user
+async def update_program():
+    try:
+        update_fields, error = parse_program_update(await request.get_json())
+        if error:
+            payload, status = error
+            return jsonify(payload), status
+
+        result = await db_async.users_collection.update_one(
+            {'_id': ObjectId(g.user_id)},
+            {'$set': update_fields}
+        )
+
+        if result.matched_count == 0:
+            logger.warning("User not found for update: %s", g.user_id)
+            return jsonify({'message': 'Pengguna tidak ditemukan'}), 404
+
+        return jsonify({'message': 'Program berhasil diperbarui'})
+    except Exception as e:
+        logger.exception("Update program error: %s", e)
+        return jsonify({'message': 'Terjadi kesalahan server'}), 500
+
+@profile_bp.route('/profile', methods=['DELETE'])
+@require_api_key
+@require_user
+async def delete_profile():
+    try:
+        user_id = g.user_id
+        result = await db_async.users_collection.delete_one({'_id': ObjectId(user_id)})
+
+        if result.deleted_count == 0:
+            logger.warning("User not found for deletion: %s", user_id)
+            return jsonify({'message': 'Pengguna tidak ditemukan'}), 404
+
+        # Token akun yang sudah dihapus tidak boleh lagi lolos dari cache
+        token_cache.discard_user(user_id)
+        logger.info("Profile deleted successfully for user: %s", user_id)
+        return jsonify({'message': 'Akun berhasil dihapus'}), 200
+    except Exception as e:
+        logger.exception("Delete profile error: %s", e)
+        return jsonify({'message': 'Terjadi kesalahan server'}), 500
@@ -0,0 +1,176 @@
+import logging
+from quart import Blueprint, request, jsonify, g
+import db_async
+from asgi_routes.common import require_api_key, require_user, current_user, conditional, conditional_json
+from catalog_cache import cached_async
+from http_cache import PRIVATE_CACHE_CONTROL
+from pagination import find_page_async, parse_page_args, with_next_cursor
+from routes.stretching_routes import (
+    MOVEMENT_LIST_PROJECTION, STRETCHING_LIST_PROJECTION, build_history_batch, duplicate_keys, existing_keys_query,
+    failed_writes, finish_history_batch, format_history, history_query, new_history, parse_history_batch,
+    stretching_query, with_str_id,
+)
+from bson import ObjectId
+from datetime import datetime
+from pymongo.errors import BulkWriteError
+
+stretching_bp = Blueprint('stretching', __name__)
+logger = logging.getLogger(__name__)
+
+
+@stretching_bp.route('/api/stretching', methods=['GET'])
+@require_api_key
+async def get_stretching():
+    try:
+        program_filter = request.args.get('program')
+
+        async def load_stretchings():
+            cursor = db_async.stretching_collection.find(stretching_query(program_filter), STRETCHING_LIST_PROJECTION)
+            return [with_str_id(doc) for doc in await cursor.to_list()]
+
+        stretchings, etag = await cached_async('stretching', 'stretching', program_filter, load_stretchings)
+
+        return conditional_json(stretchings, etag)
+    except Exception as e:
+        logger.exception("get_stretching error: %s", e)
+        return jsonify({'error': 'Internal Server Error'}), 500
+
+@stretching_bp.route('/api/stretching/<stretching_id>', methods=['GET'])
+@require_api_key
+async def get_stretching_by_id(stretching_id):
+    try:
+        if not ObjectId.is_valid(stretching_id):
+            return jsonify({'error': 'Invalid stretching id'}), 400
+
+        async def load_stretching():
+            return with_str_id(await db_async.stretching_collection.find_one({'_id': ObjectId(stretching_id)}))
+
+        stretching, etag = await cached_async('stretching', 'stretching_detail', stretching_id, load_stretching)
+
+        if not stretching:
+            return jsonify({'error': 'Stretching not found'}), 404
+
+        return conditional_json(stretching, etag)
+
+    except Exception as e:
+        logger.exception("get_stretching_by_id error: %s", e)
+        return jsonify({'message': 'Terjadi kesalahan server'}), 500
+
+@stretching_bp.route('/api/movement', methods=['GET'])
+@require_api_key
+async def get_movement():
+    try:
+        stretching_filter = request.args.get('stretching')
+        if not stretching_filter:
+            return jsonify({'error': 'Parameter "stretching" dibutuhkan'}), 400
+
+        async def load_movements():
+            cursor = db_async.movement_collection.find({'stretching': stretching_filter}, MOVEMENT_LIST_PROJECTION)
+            return [with_str_id(doc) for doc in await cursor.to_list()]
+
+        movements, etag = await cached_async('movement', 'movement', stretching_filter, load_movements)
+
+        return conditional_json(movements, etag)
+    except Exception as e:
+        logger.exception("get_movement error: %s", e)
+        return jsonify({'error': 'Internal Server Error'}), 500
+
+@stretching_bp.route('/api/movement/<movement_id>', methods=['GET'])
+@require_api_key
+async def get_movement_by_id(movement_id):
+    try:
+        if not ObjectId.is_valid(movement_id):
+            return jsonify({'error': 'Invalid movement id'}), 400
+
+        async def load_movement():
+            return with_str_id(await db_async.movement_collection.find_one({'_id': ObjectId(movement_id)}))
+
+        movement, etag = await cached_async('movement', 'movement_detail', movement_id, load_movement)
+
+        if not movement:
+            return jsonify({'error': 'Movement not found'}), 404
+
+        return conditional_json(movement, etag)
+
+    except Exception as e:
+        logger.exception("get_movement_by_id error: %s", e)
+        return jsonify({'message': 'Terjadi kesalahan server'}), 500
+
+@stretching_bp.route('/api/stretch_history', methods=['POST'])
+@require_api_key
+@require_user(error_key='error')
+async def add_history():
+    try:
+        user = await current_user()
+        if not user:
+            return jsonify({'error': 'User tidak ditemukan'}), 404
+
+        history_doc, error = new_history(user, g.user_id, await request.get_json())
+        if error:
+            return jsonify({'error': error}), 400
+
+        await db_async.stretch_history_collection.insert_one(history_doc)
+
+        return jsonify({'message': 'History berhasil disimpan'}), 201
+
+    except Exception as e:
+        logger.exception("add_history error: %s", e)
+        return jsonify({'error': f'Terjadi kesalahan di server: {e}'}), 500
+
+@stretching_bp.route('/api/stretch_history/batch', methods=['POST'])
+@require_api_key
+@require_user(error_key='error')
+async def add_history_batch():
+    """Lihat routes.stretching_routes.add_history_batch."""
+    try:
+        entries, error = parse_history_batch(await request.get_json(silent=True))
+        if error:
+            return jsonify({'error': error}), 400
+
+        user_id = ObjectId(g.user_id)
+        user = await current_user()
+        if not user:
+            return jsonify({'error': 'User tidak ditemukan'}), 404
+        user_name = user.get('name', 'Nama Tidak Ditemukan')
+
+        results, docs, positions = build_history_batch(entries, user_id, user_name, datetime.utcnow())
+
+        failed = {}
+        if docs:
+            try:
+                await db_async.stretch_history_collection.insert_many(docs, ordered=False)
+            except BulkWriteError as e:
+                failed = failed_writes(e)
+
+        keys = duplicate_keys(docs, failed)
+        existing = {}
+        if keys:
+            cursor = db_async.stretch_history_collection.find(*existing_keys_query(user_id, keys))
+            existing = {doc['idempotency_key']: str(doc['_id']) async for doc in cursor}
+
+        return jsonify(finish_history_batch(results, docs, positions, failed, existing)), 200
+
+    except Exception as e:
+        logger.exception("add_history_batch error: %s", e)
+        return jsonify({'error': f'Terjadi kesalahan di server: {e}'}), 500
+
+@stretching_bp.route('/api/stretch_history', methods=['GET'])
+@require_api_key
+@require_user(error_key='error')
+async def get_history():
+    try:
+        try:
+            limit, cursor = parse_page_args(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        docs, next_cursor = await find_page_async(
+            db_async.stretch_history_collection, *history_query(g.user_id), limit, cursor,
+        )
+
+        response = with_next_cursor(jsonify(format_history(docs)), next_cursor)
+        return await conditional(response, PRIVATE_CACHE_CONTROL)
+
+    except Exception as e:
+        logger.exception("get_history error: %s", e)
+        return jsonify({'error': f'Terjadi kesalahan di server: {e}'}), 500
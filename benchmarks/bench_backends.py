@@ -0,0 +1,139 @@
+"""Bandingkan backend inference (predict, keras, xla, tflite, tflite_int8).
+
+Contoh:
+    python convert_tflite.py --int8
+    python -m benchmarks.bench_backends --samples 200 --batch-sizes 1,8 --output backends.json
+
+Setiap backend dijalankan di subprocess terpisah agar angka RSS tidak
+tercampur. Output `predict` (perilaku lama) dipakai sebagai referensi untuk
+menghitung top-1 agreement dan kesamaan verdict (> 0.85).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.common import memory_usage_mb, percentiles_ms, synthetic_sequences
+
+REFERENCE_BACKEND = 'predict'
+DEFAULT_BACKENDS = 'predict,keras,xla,tflite,tflite_int8'
+VERDICT_THRESHOLD = 0.85
+
+
+def run_worker(args):
+    """Dijalankan di subprocess: load satu backend, ukur, simpan output."""
+    from inference.backends import load_backend
+
+    inputs = np.load(args.inputs)
+    rss_before, _ = memory_usage_mb()
+
+    started = time.perf_counter()
+    backend = load_backend(args.worker)
+    load_seconds = time.perf_counter() - started
+
+    # Warm-up untuk semua ukuran batch (tracing / kompilasi XLA / allocate TFLite)
+    batch_sizes = [int(b) for b in args.batch_sizes.split(',')]
+    for batch_size in batch_sizes:
+        for _ in range(args.warmup):
+            backend.predict(inputs[:batch_size])
+
+    results = {'backend': args.worker, 'load_seconds': load_seconds, 'batches': {}}
+    for batch_size in batch_sizes:
+        latencies = []
+        total_started = time.perf_counter()
+        for start in range(0, len(inputs) - batch_size + 1, batch_size):
+            t0 = time.perf_counter()
+            backend.predict(inputs[start:start + batch_size])
+            latencies.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - total_started
+        results['batches'][str(batch_size)] = {
+            'latency_ms': percentiles_ms(latencies),
+            'sequences_per_second': len(latencies) * batch_size / elapsed if elapsed else None,
+        }
+
+    # Output per-sequence (batch 1) untuk perbandingan agreement
+    predictions = np.concatenate([backend.predict(inputs[i:i + 1]) for i in range(len(inputs))])
+    np.save(args.out, predictions)
+
+    rss_after, peak = memory_usage_mb()
+    results['rss_mb'] = rss_after
+    results['rss_delta_mb'] = rss_after - rss_before
+    results['peak_rss_mb'] = peak
+    print(json.dumps(results))
+
+
+def agreement(reference, predictions):
+    return {
+        'top1_agreement': float(np.mean(reference.argmax(axis=1) == predictions.argmax(axis=1))),
+        'verdict_agreement': float(np.mean((reference > VERDICT_THRESHOLD) == (predictions > VERDICT_THRESHOLD))),
+        'max_abs_diff': float(np.max(np.abs(reference - predictions))),
+    }
+
+
+def run_all(args):
+    backends = [b for b in args.backends.split(',') if b]
+    if REFERENCE_BACKEND not in backends:
+        backends.insert(0, REFERENCE_BACKEND)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inputs = np.load(args.data).astype(np.float32) if args.data else synthetic_sequences(args.samples)
+        inputs_path = os.path.join(tmp, 'inputs.npy')
+        np.save(inputs_path, inputs)
+
+        report = {'samples': int(len(inputs)), 'batch_sizes': args.batch_sizes, 'backends': {}}
+        outputs = {}
+        for name in backends:
+            out_path = os.path.join(tmp, f'{name}.npy')
+            cmd = [
+                sys.executable, '-m', 'benchmarks.bench_backends',
+                '--worker', name, '--inputs', inputs_path, '--out', out_path,
+                '--batch-sizes', args.batch_sizes, '--warmup', str(args.warmup),
+            ]
+            proc = subprocess.run(cmd, capture_output=True, text=True)
+            if proc.returncode != 0:
+                report['backends'][name] = {'error': proc.stderr.strip().splitlines()[-1:] or ['unknown error']}
+                print(f"[{name}] gagal: {report['backends'][name]['error'][0]}", file=sys.stderr)
+                continue
+            report['backends'][name] = json.loads(proc.stdout.strip().splitlines()[-1])
+            outputs[name] = np.load(out_path)
+            print(f"[{name}] selesai", file=sys.stderr)
+
+        reference = outputs.get(REFERENCE_BACKEND)
+        if reference is not None:
+            for name, predictions in outputs.items():
+                report['backends'][name].update(agreement(reference, predictions))
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    print(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backends', default=DEFAULT_BACKENDS)
+    parser.add_argument('--samples', type=int, default=200)
+    parser.add_argument('--data', help="File .npy (N, 30, 99) berisi sequence keypoints asli")
+    parser.add_argument('--batch-sizes', default='1,8')
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--output', help="Simpan laporan JSON ke file")
+    # Argumen internal untuk subprocess
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--inputs', help=argparse.SUPPRESS)
+    parser.add_argument('--out', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+    else:
+        run_all(args)
+
+
+if __name__ == '__main__':
+    main()
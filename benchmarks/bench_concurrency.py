@@ -0,0 +1,156 @@
+"""Bandingkan konkurensi koneksi deployment sync (gunicorn app:app) vs async (asgi:app).
+
+Contoh (server sudah jalan):
+    gunicorn app:app --bind 127.0.0.1:8001 --workers 2
+    gunicorn asgi:app -k uvicorn_worker.UvicornWorker --bind 127.0.0.1:8002 --workers 2
+    python -m benchmarks.bench_concurrency --target sync=http://127.0.0.1:8001 \\
+        --target async=http://127.0.0.1:8002 --path /articles --api-key $API_KEY
+
+Atau biarkan script menjalankan kedua server sendiri:
+    python -m benchmarks.bench_concurrency --spawn --workers 2 --path /articles --api-key $API_KEY
+
+Untuk setiap level konkurensi, N koneksi paralel mengirim request berulang
+selama --duration detik. Yang dilaporkan: throughput, latency p50/p95/p99,
+jumlah error, dan jumlah koneksi yang ditolak/timeout.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.common import percentiles_ms
+
+SPAWN_COMMANDS = {
+    'sync': ['gunicorn', 'app:app', '--workers', '{workers}', '--bind', '127.0.0.1:{port}'],
+    'async': [
+        'gunicorn', 'asgi:app', '-k', 'uvicorn_worker.UvicornWorker',
+        '--workers', '{workers}', '--bind', '127.0.0.1:{port}',
+    ],
+}
+
+
+async def connection(client, url, headers, deadline, latencies, errors):
+    """Satu koneksi: kirim request berurutan sampai deadline."""
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            response = await client.get(url, headers=headers)
+        except httpx.HTTPError as e:
+            errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+            continue
+        if response.status_code >= 400:
+            errors[str(response.status_code)] = errors.get(str(response.status_code), 0) + 1
+        else:
+            latencies.append(time.perf_counter() - started)
+
+
+async def run_level(base_url, path, headers, concurrency, duration, timeout):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        latencies, errors = [], {}
+        deadline = time.perf_counter() + duration
+        started = time.perf_counter()
+        await asyncio.gather(*[
+            connection(client, path, headers, deadline, latencies, errors)
+            for _ in range(concurrency)
+        ])
+        elapsed = time.perf_counter() - started
+    return {
+        'concurrency': concurrency,
+        'requests_per_second': len(latencies) / elapsed if elapsed else None,
+        'latency_ms': percentiles_ms(latencies),
+        'errors': errors,
+    }
+
+
+def wait_until_up(base_url, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{base_url}/healthz", timeout=1).status_code == 200:
+                return True
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def spawn_servers(args):
+    """Jalankan deployment sync dan async di port lokal, return (targets, processes)."""
+    targets, processes = {}, []
+    for offset, (name, command) in enumerate(SPAWN_COMMANDS.items()):
+        port = args.base_port + offset
+        argv = [part.format(workers=args.workers, port=port) for part in command]
+        processes.append(subprocess.Popen(argv, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+        targets[name] = f"http://127.0.0.1:{port}"
+    for name, base_url in targets.items():
+        if not wait_until_up(base_url, args.startup_timeout):
+            print(f"[{name}] server tidak merespons /healthz di {base_url}", file=sys.stderr)
+    return targets, processes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', action='append', default=[], help="name=base_url, bisa diulang")
+    parser.add_argument('--spawn', action='store_true', help="Jalankan gunicorn sync dan async sendiri")
+    parser.add_argument('--workers', type=int, default=2, help="Jumlah worker gunicorn untuk --spawn")
+    parser.add_argument('--base-port', type=int, default=8701)
+    parser.add_argument('--startup-timeout', type=float, default=120)
+    parser.add_argument('--path', default='/articles')
+    parser.add_argument('--api-key', default=os.getenv("API_KEY"))
+    parser.add_argument('--token', help="Bearer token untuk endpoint yang butuh login")
+    parser.add_argument('--concurrency', default='1,10,50,200')
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--timeout', type=float, default=30, help="Timeout per request (detik)")
+    parser.add_argument('--output', help="Simpan laporan JSON ke file")
+    args = parser.parse_args()
+
+    headers = {}
+    if args.api_key:
+        headers['x-api-key'] = args.api_key
+    if args.token:
+        headers['Authorization'] = f"Bearer {args.token}"
+
+    targets = dict(target.split('=', 1) for target in args.target)
+    processes = []
+    if args.spawn:
+        spawned, processes = spawn_servers(args)
+        targets = {**spawned, **targets}
+    if not targets:
+        parser.error("isi --target name=url atau pakai --spawn")
+
+    report = {'path': args.path, 'duration_seconds': args.duration, 'targets': {}}
+    try:
+        for name, base_url in targets.items():
+            report['targets'][name] = {'base_url': base_url, 'levels': []}
+            for concurrency in [int(c) for c in args.concurrency.split(',')]:
+                result = asyncio.run(run_level(
+                    base_url, args.path, headers, concurrency, args.duration, args.timeout,
+                ))
+                report['targets'][name]['levels'].append(result)
+                latency = result['latency_ms']
+                print(
+                    f"[{name}] c={concurrency} rps={result['requests_per_second']:.1f} "
+                    f"p50={latency.get('p50', 0):.1f}ms p99={latency.get('p99', 0):.1f}ms "
+                    f"errors={sum(result['errors'].values())}",
+                    file=sys.stderr,
+                )
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+"""Benchmark per tahap pipeline /api/detect.
+
+Tahap yang diukur (sama dengan urutan di inference/pipeline.py):
+    b64decode  -> base64.b64decode body JSON
+    imdecode   -> np.frombuffer + cv2.imdecode
+    cvtColor   -> BGR ke RGB
+    pose       -> Pose.process (MediaPipe)
+    landmarks  -> list comprehension 33 landmark -> 99 float
+    model      -> backend.predict untuk sequence (1, 30, 99)
+
+Contoh:
+    python -m benchmarks.bench_pipeline --output pipeline.json
+    python -m benchmarks.bench_pipeline --compare pipeline.json --threshold 0.15
+
+Gambar yang dipakai: semua file di benchmarks/images/ (atau --images DIR)
+ditambah gambar sintetis, masing-masing di-resize ke setiap --resolutions dan
+di-encode ulang dengan setiap --qualities JPEG. Jika MediaPipe tidak
+menemukan pose (mis. gambar sintetis), tahap landmarks diukur memakai 33
+landmark tiruan dan tahap model tetap dijalankan dengan keypoints tiruan,
+supaya semua tahap selalu punya angka.
+"""
+import argparse
+import base64
+import glob
+import json
+import os
+import platform
+import sys
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from benchmarks.common import cpu_count, memory_usage_mb, percentiles_ms
+
+STAGES = ('b64decode', 'imdecode', 'cvtColor', 'pose', 'landmarks', 'model')
+DEFAULT_IMAGE_DIR = os.path.join(os.path.dirname(__file__), 'images')
+SEQUENCE_LENGTH = 30
+
+# Landmark tiruan untuk frame tanpa pose
+FAKE_LANDMARKS = [SimpleNamespace(x=0.5, y=0.5, z=0.0) for _ in range(33)]
+
+
+def synthetic_image(seed=0, size=(720, 1280)):
+    """Gambar sintetis (gradien + bentuk acak) agar ukuran JPEG realistis."""
+    import cv2
+    rng = np.random.default_rng(seed)
+    height, width = size
+    gradient = np.linspace(0, 255, width, dtype=np.uint8)
+    image = np.dstack([np.tile(gradient, (height, 1))] * 3).copy()
+    for _ in range(25):
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        color = tuple(int(c) for c in rng.integers(0, 255, 3))
+        cv2.circle(image, center, int(rng.integers(10, 120)), color, -1)
+    noise = rng.normal(0, 8, image.shape)
+    return np.clip(image + noise, 0, 255).astype(np.uint8)
+
+
+def load_images(image_dir, synthetic):
+    import cv2
+    images = []
+    for path in sorted(glob.glob(os.path.join(image_dir, '*'))):
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+        if image is not None:
+            images.append((os.path.splitext(os.path.basename(path))[0], image))
+    for index in range(synthetic):
+        images.append((f'synthetic{index}', synthetic_image(seed=index)))
+    return images
+
+
+def run_case(image, width, height, quality, iterations, pose, backend):
+    import cv2
+
+    resized = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+    ok, jpeg = cv2.imencode('.jpg', resized, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise RuntimeError("JPEG encode gagal")
+    payload = base64.b64encode(jpeg.tobytes())
+
+    timings = {stage: [] for stage in STAGES}
+    totals = []
+    detected = 0
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        img_data = base64.b64decode(payload)
+        t1 = time.perf_counter()
+        frame = cv2.imdecode(np.frombuffer(img_data, np.uint8), cv2.IMREAD_COLOR)
+        t2 = time.perf_counter()
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        t3 = time.perf_counter()
+        results = pose.process(rgb)
+        t4 = time.perf_counter()
+        if results.pose_landmarks:
+            detected += 1
+            landmarks = results.pose_landmarks.landmark
+        else:
+            landmarks = FAKE_LANDMARKS
+        keypoints = np.array([[lm.x, lm.y, lm.z] for lm in landmarks]).flatten()
+        t5 = time.perf_counter()
+        sequence = np.array([keypoints] * SEQUENCE_LENGTH, dtype=np.float32)
+        backend.predict(np.expand_dims(sequence, axis=0))
+        t6 = time.perf_counter()
+
+        for stage, start, end in zip(STAGES, (t0, t1, t2, t3, t4, t5), (t1, t2, t3, t4, t5, t6)):
+            timings[stage].append(end - start)
+        totals.append(t6 - t0)
+
+    mean_total = float(np.mean(totals))
+    return {
+        'jpeg_bytes': int(jpeg.size),
+        'base64_bytes': len(payload),
+        'pose_detected_ratio': detected / iterations,
+        'stages': {stage: percentiles_ms(values) for stage, values in timings.items()},
+        'total': percentiles_ms(totals),
+        # Loop berjalan single-thread, jadi throughput ini = frame/detik per core
+        'frames_per_second_per_core': 1.0 / mean_total if mean_total else None,
+    }
+
+
+def run_benchmark(args):
+    import cv2
+    import mediapipe as mp
+    from inference.backends import load_backend
+
+    backend = load_backend(args.backend)
+    pose = mp.solutions.pose.Pose(static_image_mode=not args.tracking, min_detection_confidence=0.5)
+    images = load_images(args.images, args.synthetic)
+    resolutions = [tuple(int(v) for v in r.split('x')) for r in args.resolutions.split(',')]
+    qualities = [int(q) for q in args.qualities.split(',')]
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': cpu_count(),
+            'opencv': cv2.__version__,
+            'mediapipe': getattr(mp, '__version__', None),
+            'backend': backend.name,
+            'tracking': args.tracking,
+            'iterations': args.iterations,
+        },
+        'cases': {},
+    }
+
+    for name, image in images:
+        for width, height in resolutions:
+            for quality in qualities:
+                key = f'{name}_{width}x{height}_q{quality}'
+                # Warm-up: graph MediaPipe/TF dan alokasi pertama tidak ikut diukur
+                run_case(image, width, height, quality, args.warmup, pose, backend)
+                report['cases'][key] = run_case(image, width, height, quality, args.iterations, pose, backend)
+                print(f"[{key}] {report['cases'][key]['total']['p50']:.2f} ms p50", file=sys.stderr)
+
+    rss, peak = memory_usage_mb()
+    report['meta']['rss_mb'] = rss
+    report['meta']['peak_rss_mb'] = peak
+    return report
+
+
+def compare(baseline, current, threshold, metric='p95'):
+    """Bandingkan dua laporan; return daftar regresi (naik lebih dari threshold)."""
+    rows = []
+    for case, result in current['cases'].items():
+        base_case = baseline.get('cases', {}).get(case)
+        if base_case is None:
+            continue
+        entries = [(stage, result['stages'][stage], base_case['stages'].get(stage)) for stage in STAGES]
+        entries.append(('total', result['total'], base_case.get('total')))
+        for stage, now, before in entries:
+            if not before or not before.get(metric):
+                continue
+            change = (now[metric] - before[metric]) / before[metric]
+            rows.append({
+                'case': case,
+                'stage': stage,
+                f'baseline_{metric}_ms': before[metric],
+                f'current_{metric}_ms': now[metric],
+                'change': change,
+                'regression': change > threshold,
+            })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', default=DEFAULT_IMAGE_DIR, help="Folder gambar sampel")
+    parser.add_argument('--synthetic', type=int, default=1, help="Jumlah gambar sintetis tambahan")
+    parser.add_argument('--resolutions', default='320x240,640x480,1280x720')
+    parser.add_argument('--qualities', default='50,75,95')
+    parser.add_argument('--iterations', type=int, default=30)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--backend', default=None, help="Backend model (default: INFERENCE_BACKEND)")
+    parser.add_argument('--tracking', action='store_true', help="Pakai Pose mode tracking (static_image_mode=False)")
+    parser.add_argument('--output', help="Simpan laporan JSON ke file")
+    parser.add_argument('--compare', help="Laporan JSON baseline untuk deteksi regresi")
+    parser.add_argument('--metric', default='p95', choices=('p50', 'p95', 'p99'))
+    parser.add_argument('--threshold', type=float, default=0.10, help="Batas kenaikan latency (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    report = run_benchmark(args)
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        report['comparison'] = compare(baseline, report, args.threshold, args.metric)
+        regressions = [row for row in report['comparison'] if row['regression']]
+        for row in regressions:
+            print(f"REGRESSION {row['case']} {row['stage']}: {row['change']:+.1%}", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    print(text)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+import os
+import resource
+
+import numpy as np
+
+
+def memory_usage_mb():
+    """Return (rss, peak_rss) proses ini dalam MB."""
+    rss = peak = None
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    rss = int(line.split()[1]) / 1024.0
+                elif line.startswith('VmHWM:'):
+                    peak = int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    if peak is None:
+        # ru_maxrss dalam KB di Linux
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    return rss if rss is not None else peak, peak
+
+
+def percentiles_ms(samples):
+    """Ringkasan latency (detik) dalam milidetik."""
+    values = np.asarray(samples, dtype=np.float64) * 1000.0
+    if values.size == 0:
+        return {'count': 0}
+    return {
+        'count': int(values.size),
+        'mean': float(values.mean()),
+        'p50': float(np.percentile(values, 50)),
+        'p95': float(np.percentile(values, 95)),
+        'p99': float(np.percentile(values, 99)),
+        'max': float(values.max()),
+    }
+
+
+def synthetic_sequences(count, seed=0):
+    """Sequence keypoints sintetis (N, 30, 99) dengan rentang koordinat MediaPipe.
+
+    Tiap sequence adalah pose acak yang bergerak perlahan, supaya mirip input
+    kamera sungguhan dan bukan noise murni.
+    """
+    rng = np.random.default_rng(seed)
+    base = rng.uniform(0.2, 0.8, size=(count, 1, 99))
+    base[:, :, 2::3] = rng.uniform(-0.5, 0.5, size=(count, 1, 33))
+    drift = np.cumsum(rng.normal(0, 0.005, size=(count, 30, 99)), axis=1)
+    return (base + drift).astype(np.float32)
+
+
+def cpu_count():
+    return len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
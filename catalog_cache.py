@@ -0,0 +1,359 @@
+"""Cache read-through in-process untuk data katalog (artikel, stretching, movement, visualisasi).
+
+Data katalog hanya berubah ketika editor mempublikasikan konten, jadi hasil
+query disimpan di memori per worker dan hanya dibuang secara eksplisit:
+
+* dokumen versi `catalog_meta` {'_id': 'versions', '<namespace>': n} dicek
+  paling sering sekali per CATALOG_VERSION_CHECK_SECONDS; jika versi sebuah
+  namespace naik, semua entry namespace itu dibuang. Setelah publikasi jalankan
+  `python catalog_cache.py bump articles` (atau panggil `bump_version`).
+* opsional (CATALOG_CHANGE_STREAM=1, butuh replica set/Atlas): change stream
+  pada collection katalog langsung membuang namespace yang berubah.
+
+TTL per entry tetap ada sebagai batas atas umur data jika bump terlupa.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "300"))
+CACHE_MAX_ENTRIES = int(os.getenv("CATALOG_CACHE_MAX_ENTRIES", "1000"))
+CACHE_MAX_BYTES = int(os.getenv("CATALOG_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+VERSION_CHECK_SECONDS = float(os.getenv("CATALOG_VERSION_CHECK_SECONDS", "5"))
+CHANGE_STREAM_ENABLED = os.getenv("CATALOG_CHANGE_STREAM", "0") == "1"
+
+VERSIONS_COLLECTION = 'catalog_meta'
+VERSIONS_ID = 'versions'
+
+# Namespace cache -> collection MongoDB sumbernya
+NAMESPACES = {
+    'articles': 'articles',
+    'stretching': 'stretching',
+    'movement': 'movement',
+    'visualization': 'visualization',
+}
+
+
+class _Flight:
+    """Satu load yang sedang berjalan; request lain dengan key sama menunggu hasilnya."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.etag = None
+        self.error = None
+
+
+def fingerprint(value):
+    """(perkiraan ukuran JSON dalam byte, ETag) dari sebuah nilai katalog."""
+    body = json.dumps(value, sort_keys=True, default=str).encode()
+    return len(body), hashlib.sha1(body).hexdigest()
+
+
+class CatalogCache:
+    def __init__(self, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES,
+                 version_source=None, version_check_interval=VERSION_CHECK_SECONDS):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.version_source = version_source
+        self.version_check_interval = version_check_interval
+        # (namespace, endpoint, key) -> (value, expires_at, size, etag)
+        self._entries = OrderedDict()
+        self._inflight = {}
+        # Load yang sedang berjalan di event loop (mode ASGI): cache_key -> asyncio.Future
+        self._async_inflight = {}
+        self._bytes = 0
+        # Dinaikkan setiap invalidasi, agar hasil load yang dimulai sebelum invalidasi tidak disimpan
+        self._generations = {ns: 0 for ns in NAMESPACES}
+        self._versions = None
+        self._next_version_check = 0.0
+        self._version_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._evictions = 0
+        self._invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def _endpoint_stats(self, endpoint):
+        return self._stats.setdefault(endpoint, {'hits': 0, 'misses': 0, 'coalesced': 0})
+
+    def _record(self, endpoint, result):
+        with self._lock:
+            self._endpoint_stats(endpoint)[result] += 1
+        metrics.CATALOG_CACHE_REQUESTS.labels(endpoint=endpoint, result=result).inc()
+
+    def get_or_load(self, namespace, endpoint, key, loader):
+        """Return nilai dari cache, atau jalankan `loader()` sekali untuk semua request yang menunggu."""
+        return self.get_entry(namespace, endpoint, key, loader)[0]
+
+    def get_entry(self, namespace, endpoint, key, loader):
+        """Seperti get_or_load, tapi return (nilai, ETag); ETag dihitung sekali saat entry diisi."""
+        if not self.enabled:
+            value = loader()
+            return value, fingerprint(value)[1]
+        self.check_versions()
+        cache_key = (namespace, endpoint, key)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(cache_key)
+                self._endpoint_stats(endpoint)['hits'] += 1
+                hit = True
+            else:
+                hit = False
+                flight = self._inflight.get(cache_key)
+                leader = flight is None
+                if leader:
+                    flight = self._inflight[cache_key] = _Flight()
+                generation = self._generations[namespace]
+        if hit:
+            metrics.CATALOG_CACHE_REQUESTS.labels(endpoint=endpoint, result='hits').inc()
+            return entry[0], entry[3]
+
+        if not leader:
+            flight.event.wait()
+            self._record(endpoint, 'coalesced')
+            if flight.error is not None:
+                raise flight.error
+            return flight.value, flight.etag
+
+        self._record(endpoint, 'misses')
+        try:
+            flight.value = loader()
+            size, flight.etag = fingerprint(flight.value)
+        except Exception as e:
+            flight.error = e
+            raise
+        else:
+            self._store(cache_key, flight.value, size, flight.etag, generation)
+        finally:
+            with self._lock:
+                self._inflight.pop(cache_key, None)
+            flight.event.set()
+        return flight.value, flight.etag
+
+    async def get_entry_async(self, namespace, endpoint, key, loader):
+        """get_entry untuk mode ASGI: `loader` adalah coroutine function.
+
+        Request yang datang saat load berjalan menunggu future yang sama di
+        event loop, bukan thread yang diblok.
+        """
+        if not self.enabled:
+            value = await loader()
+            return value, fingerprint(value)[1]
+        if self.version_source is not None and time.monotonic() >= self._next_version_check:
+            # Dokumen versi dibaca lewat client sync; jangan blok event loop
+            await asyncio.to_thread(self.check_versions)
+        cache_key = (namespace, endpoint, key)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(cache_key)
+                self._endpoint_stats(endpoint)['hits'] += 1
+            else:
+                entry = None
+            generation = self._generations[namespace]
+        if entry is not None:
+            metrics.CATALOG_CACHE_REQUESTS.labels(endpoint=endpoint, result='hits').inc()
+            return entry[0], entry[3]
+
+        flight = self._async_inflight.get(cache_key)
+        if flight is not None:
+            value, etag, error = await asyncio.shield(flight)
+            self._record(endpoint, 'coalesced')
+            if error is not None:
+                raise error
+            return value, etag
+
+        flight = self._async_inflight[cache_key] = asyncio.get_running_loop().create_future()
+        self._record(endpoint, 'misses')
+        try:
+            value = await loader()
+            size, etag = fingerprint(value)
+        except BaseException as e:
+            # Termasuk CancelledError (client putus): request yang menunggu ikut gagal, bukan menggantung
+            flight.set_result((None, None, e))
+            raise
+        else:
+            self._store(cache_key, value, size, etag, generation)
+            flight.set_result((value, etag, None))
+        finally:
+            self._async_inflight.pop(cache_key, None)
+        return value, etag
+
+    def _store(self, cache_key, value, size, etag, generation):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if self._generations[cache_key[0]] != generation:
+                return
+            old = self._entries.pop(cache_key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[cache_key] = (value, time.monotonic() + self.ttl, size, etag)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted[2]
+                self._evictions += 1
+
+    def invalidate(self, namespace):
+        with self._lock:
+            self._generations[namespace] += 1
+            for cache_key in [k for k in self._entries if k[0] == namespace]:
+                self._bytes -= self._entries.pop(cache_key)[2]
+            self._invalidations += 1
+        logger.info("Catalog cache invalidated: %s", namespace)
+
+    def clear(self):
+        for namespace in NAMESPACES:
+            self.invalidate(namespace)
+
+    def check_versions(self, force=False):
+        """Bandingkan dokumen versi dengan versi terakhir yang dilihat worker ini."""
+        if self.version_source is None:
+            return
+        now = time.monotonic()
+        if not force and now < self._next_version_check:
+            return
+        # Hanya satu thread yang membaca dokumen versi; yang lain langsung lanjut
+        if not self._version_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_version_check = now + self.version_check_interval
+            try:
+                versions = self.version_source()
+            except Exception as e:
+                # DB bermasalah: tetap layani data cache, coba lagi di interval berikutnya
+                logger.warning("Catalog version check failed: %s", e)
+                return
+            previous, self._versions = self._versions, versions
+            if previous is None:
+                return
+            for namespace in NAMESPACES:
+                if versions.get(namespace, 0) != previous.get(namespace, 0):
+                    self.invalidate(namespace)
+        finally:
+            self._version_lock.release()
+
+    def stats(self):
+        with self._lock:
+            per_endpoint = {}
+            for endpoint, counts in self._stats.items():
+                lookups = counts['hits'] + counts['misses'] + counts['coalesced']
+                per_endpoint[endpoint] = {
+                    **counts,
+                    'hit_ratio': counts['hits'] / lookups if lookups else 0.0,
+                    'entries': 0,
+                    'bytes': 0,
+                }
+            for (_, endpoint, _), (_, _, size, _) in self._entries.items():
+                row = per_endpoint.setdefault(
+                    endpoint, {'hits': 0, 'misses': 0, 'coalesced': 0, 'hit_ratio': 0.0, 'entries': 0, 'bytes': 0}
+                )
+                row['entries'] += 1
+                row['bytes'] += size
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl,
+                'evictions': self._evictions,
+                'invalidations': self._invalidations,
+                'versions': self._versions,
+                'endpoints': per_endpoint,
+            }
+
+
+def read_versions():
+    from db import db
+    doc = db[VERSIONS_COLLECTION].find_one({'_id': VERSIONS_ID}) or {}
+    return {namespace: doc.get(namespace, 0) for namespace in NAMESPACES}
+
+
+def bump_version(*namespaces):
+    """Naikkan versi namespace; semua worker membuang cache-nya dalam VERSION_CHECK_SECONDS."""
+    from db import db
+    db[VERSIONS_COLLECTION].update_one(
+        {'_id': VERSIONS_ID},
+        {'$inc': {namespace: 1 for namespace in namespaces}},
+        upsert=True,
+    )
+
+
+catalog_cache = CatalogCache(version_source=read_versions)
+
+_watcher_pid = None
+_watcher_lock = threading.Lock()
+
+
+def _watch_changes():
+    from db import db
+    collections = {collection: namespace for namespace, collection in NAMESPACES.items()}
+    pipeline = [{'$match': {'ns.coll': {'$in': list(collections)}}}]
+    backoff = 1
+    while True:
+        try:
+            with db.watch(pipeline) as stream:
+                backoff = 1
+                for change in stream:
+                    catalog_cache.invalidate(collections[change['ns']['coll']])
+        except Exception as e:
+            logger.warning("Catalog change stream stopped (%s), retrying in %ss", e, backoff)
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 60)
+
+
+def start_change_stream():
+    """Mulai thread change stream (sekali per proses, aman dipanggil setelah fork)."""
+    global _watcher_pid
+    if not CHANGE_STREAM_ENABLED or _watcher_pid == os.getpid():
+        return
+    with _watcher_lock:
+        if _watcher_pid == os.getpid():
+            return
+        _watcher_pid = os.getpid()
+        threading.Thread(target=_watch_changes, name='catalog-change-stream', daemon=True).start()
+
+
+def cached(namespace, endpoint, key, loader):
+    """Shortcut untuk route: pastikan watcher jalan, lalu baca lewat cache. Return (nilai, ETag)."""
+    start_change_stream()
+    return catalog_cache.get_entry(namespace, endpoint, key, loader)
+
+
+async def cached_async(namespace, endpoint, key, loader):
+    """cached() untuk route async; `loader` adalah coroutine function."""
+    start_change_stream()
+    return await catalog_cache.get_entry_async(namespace, endpoint, key, loader)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Invalidasi cache katalog di semua worker")
+    parser.add_argument('command', choices=('bump',))
+    parser.add_argument('namespaces', nargs='+', choices=sorted(NAMESPACES))
+    args = parser.parse_args()
+    bump_version(*args.namespaces)
+    print(f"Versi dinaikkan: {', '.join(args.namespaces)}")
+
+
+if __name__ == '__main__':
+    main()
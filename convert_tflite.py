@@ -0,0 +1,23 @@
+#one-time usage (jalankan ulang setiap kali model.h5 berubah)
+
+import argparse
+import numpy as np
+from inference.backends import convert_to_tflite, MODEL_PATH, TFLITE_MODEL_PATH, TFLITE_INT8_MODEL_PATH
+
+def main():
+    parser = argparse.ArgumentParser(description="Konversi model.h5 ke TFLite (float dan/atau int8)")
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--int8', action='store_true', help="Buat juga model dengan kuantisasi int8")
+    parser.add_argument('--calibration', help="File .npy berisi sequence (N, 30, 99) untuk kalibrasi int8")
+    args = parser.parse_args()
+
+    path = convert_to_tflite(args.model, TFLITE_MODEL_PATH)
+    print(f"TFLite model saved to {path}")
+
+    if args.int8:
+        calibration_data = np.load(args.calibration) if args.calibration else None
+        path = convert_to_tflite(args.model, TFLITE_INT8_MODEL_PATH, int8=True, calibration_data=calibration_data)
+        print(f"TFLite int8 model saved to {path}")
+
+if __name__ == "__main__":
+    main()
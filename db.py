@@ -1,11 +1,28 @@
 from pymongo.mongo_client import MongoClient
 from pymongo.server_api import ServerApi
 from dotenv import load_dotenv
+import logging
 import os
+import metrics
+
+logger = logging.getLogger(__name__)
 
 uri = os.getenv("DB_URI")
+SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("DB_SERVER_SELECTION_TIMEOUT_MS", "5000"))
 
-client = MongoClient(uri, server_api=ServerApi('1'))
+# MongoClient tidak langsung terkoneksi; koneksi pertama dicek lewat ping() saat startup.
+# connect=False: tanpa pool maupun thread monitor sampai command pertama. Dengan gunicorn
+# --preload modul ini di-import di master; pymongo membuat ulang topology client di setiap
+# proses anak setelah fork, jadi selama master tidak menjalankan command (init startup
+# ditunda ke post_fork, lihat startup.after_fork) setiap worker membuka pool-nya sendiri.
+# Durasi setiap command dicatat per collection untuk /metrics
+client = MongoClient(
+    uri,
+    server_api=ServerApi('1'),
+    serverSelectionTimeoutMS=SERVER_SELECTION_TIMEOUT_MS,
+    event_listeners=[metrics.MongoCommandListener()],
+    connect=False,
+)
 db = client['momstretch']
 
 users_collection = db['users']
@@ -17,8 +34,6 @@ stretching_collection = db['stretching']
 epds_collection = db['epds_records']
 stretch_history_collection = db['stretch_history']
 
-try:
-    client.admin.command('ping')
-    print("Pinged your deployment. You successfully connected to MongoDB!")
-except Exception as e:
-    print(e)
\ No newline at end of file
+def ping():
+    """Ping deployment MongoDB, raise exception jika gagal."""
+    client.admin.command('ping')
\ No newline at end of file
@@ -0,0 +1,72 @@
+"""Client MongoDB async untuk mode ASGI (asgi.py).
+
+Nama collection sama dengan db.py. Thread background (write-behind, mailer,
+scheduler visualisasi) tetap memakai client sync di db.py.
+"""
+import asyncio
+
+from pymongo import AsyncMongoClient
+from pymongo.server_api import ServerApi
+import os
+import metrics
+
+uri = os.getenv("DB_URI")
+SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("DB_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+# Koneksi per worker; satu event loop bisa memakai banyak koneksi sekaligus
+MAX_POOL_SIZE = int(os.getenv("DB_ASYNC_MAX_POOL_SIZE", "100"))
+
+client = None
+db = None
+users_collection = None
+articles_collection = None
+visualization_collection = None
+history_collection = None
+movement_collection = None
+stretching_collection = None
+epds_collection = None
+stretch_history_collection = None
+outbox_collection = None
+# Event loop worker tempat client dibuat (untuk ping dari thread lain)
+_loop = None
+
+
+def connect():
+    """Buat client baru. Dipanggil saat event loop worker mulai, karena
+    AsyncMongoClient terikat ke event loop tempat ia pertama dipakai."""
+    global client, db, users_collection, articles_collection, visualization_collection, history_collection
+    global movement_collection, stretching_collection, epds_collection, stretch_history_collection
+    global outbox_collection, _loop
+    _loop = asyncio.get_running_loop()
+    client = AsyncMongoClient(
+        uri,
+        server_api=ServerApi('1'),
+        serverSelectionTimeoutMS=SERVER_SELECTION_TIMEOUT_MS,
+        maxPoolSize=MAX_POOL_SIZE,
+        event_listeners=[metrics.MongoCommandListener()],
+    )
+    db = client['momstretch']
+
+    users_collection = db['users']
+    articles_collection = db['articles']
+    visualization_collection = db['visualization']
+    history_collection = db['login_history']
+    movement_collection = db['movement']
+    stretching_collection = db['stretching']
+    epds_collection = db['epds_records']
+    stretch_history_collection = db['stretch_history']
+    outbox_collection = db['mail_outbox']
+
+
+async def close():
+    if client is not None:
+        await client.close()
+
+
+async def ping():
+    """Ping deployment MongoDB, raise exception jika gagal."""
+    await client.admin.command('ping')
+
+
+def ping_threadsafe():
+    """ping() untuk dependency startup dan /readyz, yang berjalan di thread di luar event loop."""
+    asyncio.run_coroutine_threadsafe(ping(), _loop).result()
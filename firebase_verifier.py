@@ -0,0 +1,296 @@
+"""Verifikasi Firebase ID token tanpa round trip jaringan di jalur request.
+
+Sertifikat publik Google disimpan di memori sesuai header Cache-Control dari
+endpoint sertifikat dan di-refresh di background sebelum kedaluwarsa. Sumber
+kunci bisa diganti (`StaticKeySource`) agar verifikasi bisa dites offline
+dengan token yang ditandatangani kunci lokal.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+
+import firebase_admin
+import jwt
+from cryptography.x509 import load_pem_x509_certificate
+from firebase_admin import credentials
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+CERTS_URL = os.getenv(
+    "FIREBASE_CERTS_URL",
+    "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com",
+)
+# Refresh dimulai sekian detik sebelum sertifikat kedaluwarsa
+CERTS_REFRESH_MARGIN = float(os.getenv("FIREBASE_CERTS_REFRESH_MARGIN", "300"))
+# Dipakai jika respons tidak punya max-age
+CERTS_DEFAULT_MAX_AGE = float(os.getenv("FIREBASE_CERTS_DEFAULT_MAX_AGE", "3600"))
+CERTS_FETCH_TIMEOUT = float(os.getenv("FIREBASE_CERTS_FETCH_TIMEOUT", "5"))
+# Refresh paksa (token dengan kid yang tidak dikenal) paling sering sekali per interval ini
+CERTS_FORCE_REFRESH_INTERVAL = float(os.getenv("FIREBASE_CERTS_FORCE_REFRESH_INTERVAL", "60"))
+CLOCK_SKEW_SECONDS = int(os.getenv("FIREBASE_CLOCK_SKEW_SECONDS", "60"))
+# Batas panjang claim sub (uid Firebase) menurut dokumentasi verifikasi ID token
+MAX_SUB_LENGTH = 128
+UID_CACHE_SIZE = int(os.getenv("FIREBASE_UID_CACHE_SIZE", "10000"))
+UID_CACHE_TTL = float(os.getenv("FIREBASE_UID_CACHE_TTL", "3600"))
+
+
+class InvalidFirebaseToken(Exception):
+    pass
+
+
+class ExpiredFirebaseToken(InvalidFirebaseToken):
+    pass
+
+
+class FirebaseTokenTooEarly(InvalidFirebaseToken):
+    """iat/auth_time di masa depan: biasanya jam HP atau server tidak sinkron."""
+
+
+def _public_keys(certs):
+    return {kid: load_pem_x509_certificate(pem.encode()).public_key() for kid, pem in certs.items()}
+
+
+class StaticKeySource:
+    """Kunci tetap {kid: public key atau sertifikat PEM}; untuk tes dan development."""
+
+    def __init__(self, keys):
+        self._keys = {
+            kid: _public_keys({kid: key})[kid] if isinstance(key, str) else key
+            for kid, key in keys.items()
+        }
+
+    def get_keys(self, force_refresh=False):
+        return self._keys
+
+
+class GoogleCertKeySource:
+    """Sertifikat x509 Google, di-cache sesuai Cache-Control dan di-refresh di background."""
+
+    def __init__(self, url=CERTS_URL, refresh_margin=CERTS_REFRESH_MARGIN,
+                 force_refresh_interval=CERTS_FORCE_REFRESH_INTERVAL):
+        self.url = url
+        self.refresh_margin = refresh_margin
+        self.force_refresh_interval = force_refresh_interval
+        self._keys = None
+        self._expires_at = 0.0
+        self._forced_at = None
+        self._lock = threading.Lock()
+        self._refresher_pid = None
+
+    def _fetch(self):
+        """Ambil sertifikat dari Google; return (keys, expires_at) tanpa mengubah state."""
+        with metrics.track_external('firebase', 'fetch_certs'):
+            with urllib.request.urlopen(self.url, timeout=CERTS_FETCH_TIMEOUT) as response:
+                certs = json.loads(response.read())
+                cache_control = response.headers.get('Cache-Control', '')
+        match = re.search(r'max-age=(\d+)', cache_control)
+        max_age = float(match.group(1)) if match else CERTS_DEFAULT_MAX_AGE
+        logger.info("Firebase certificates refreshed (%s keys, max-age %ss)", len(certs), int(max_age))
+        return _public_keys(certs), time.monotonic() + max_age
+
+    def _force_allowed(self):
+        return self._forced_at is None or time.monotonic() - self._forced_at >= self.force_refresh_interval
+
+    def get_keys(self, force_refresh=False):
+        """Kunci yang berlaku. `force_refresh` dibatasi satu fetch per interval, supaya token
+        palsu dengan kid acak tidak membuat setiap request menunggu (dan membebani) Google."""
+        self.start_refresher()
+        if self._keys is not None and force_refresh and not self._force_allowed():
+            return self._keys
+        if self._keys is not None and not force_refresh and time.monotonic() < self._expires_at:
+            return self._keys
+        with self._lock:
+            if force_refresh and self._keys is not None:
+                if not self._force_allowed():
+                    return self._keys
+                self._forced_at = time.monotonic()
+            if self._keys is None or force_refresh or time.monotonic() >= self._expires_at:
+                try:
+                    # Fetch di jalur request tetap di dalam lock: request lain menunggu fetch
+                    # yang sama, bukan ikut memanggil Google
+                    self._keys, self._expires_at = self._fetch()
+                except Exception as e:
+                    if self._keys is None:
+                        raise
+                    # Google merotasi kunci dengan overlap; kunci lama masih layak dipakai sementara
+                    logger.warning("Firebase certificate refresh failed, keeping old keys: %s", e)
+            return self._keys
+
+    def _refresh_loop(self):
+        while True:
+            delay = max(1.0, self._expires_at - time.monotonic() - self.refresh_margin)
+            time.sleep(delay)
+            try:
+                # Fetch di luar lock, supaya get_keys() tidak tertahan selama jaringan lambat;
+                # hanya penggantian kunci yang dilakukan di bawah lock
+                keys, expires_at = self._fetch()
+                with self._lock:
+                    self._keys, self._expires_at = keys, expires_at
+            except Exception as e:
+                logger.warning("Background Firebase certificate refresh failed: %s", e)
+                time.sleep(30)
+
+    def start_refresher(self):
+        """Thread refresh (sekali per proses, aman dipanggil lagi setelah fork)."""
+        if self._refresher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._refresher_pid == os.getpid():
+                return
+            self._refresher_pid = os.getpid()
+            threading.Thread(target=self._refresh_loop, name='firebase-certs', daemon=True).start()
+
+
+def init_firebase():
+    """Inisialisasi Firebase Admin. Hanya dibutuhkan oleh role yang melayani login."""
+    if firebase_admin._apps:
+        return
+
+    # Cek nama variable, bisa FIREBASE_KEY atau FIREBASE_CREDENTIALS
+    raw_cred = os.getenv('FIREBASE_KEY') or os.getenv('FIREBASE_CREDENTIALS')
+
+    if not raw_cred:
+        logger.critical("❌ FATAL: Environment Variable Firebase tidak ditemukan!")
+        raise ValueError("Firebase Environment Variable Missing")
+
+    try:
+        # 1. Parsing Pertama
+        cred_dict = json.loads(raw_cred)
+
+        # 2. FIX CRITICAL ERROR: DOUBLE PARSING
+        # Jika hasil parsing masih berupa string (karena ada kutip dobel di env var),
+        # kita parse sekali lagi agar menjadi Dictionary.
+        if isinstance(cred_dict, str):
+            logger.warning("⚠️ Mendeteksi double-encoded JSON, melakukan parsing ulang...")
+            cred_dict = json.loads(cred_dict)
+
+        # 3. FIX BUG PRIVATE KEY
+        # Pastikan ini sudah berupa dictionary sebelum mengakses key
+        if isinstance(cred_dict, dict) and 'private_key' in cred_dict:
+            cred_dict['private_key'] = cred_dict['private_key'].replace('\\n', '\n')
+    
+        # 4. Initialize App
+        cred = credentials.Certificate(cred_dict)
+        firebase_admin.initialize_app(cred)
+        logger.info("✅ SUCCESS: Firebase Admin initialized successfully!")
+        
+    except Exception as e:
+        logger.critical("❌ CRITICAL ERROR initializing Firebase: %s", e, exc_info=True)
+        # Paksa berhenti agar kita bisa lihat lognya di deployment
+        raise e
+
+
+def _default_project_id():
+    project_id = os.getenv("FIREBASE_PROJECT_ID")
+    if project_id:
+        return project_id
+    return firebase_admin.get_app().project_id
+
+
+class FirebaseVerifier:
+    def __init__(self, key_source, project_id=None, clock_skew=CLOCK_SKEW_SECONDS):
+        self.key_source = key_source
+        self._project_id = project_id
+        self.clock_skew = clock_skew
+
+    @property
+    def project_id(self):
+        if self._project_id is None:
+            self._project_id = _default_project_id()
+        return self._project_id
+
+    def _key_for(self, kid):
+        keys = self.key_source.get_keys()
+        if kid not in keys:
+            # Kunci baru yang belum ada di cache (rotasi): ambil ulang sekali
+            keys = self.key_source.get_keys(force_refresh=True)
+        if kid not in keys:
+            raise InvalidFirebaseToken(f"Kunci tidak dikenal: {kid}")
+        return keys[kid]
+
+    def verify(self, token, clock_skew=None):
+        """Return claims token (ditambah 'uid') atau raise InvalidFirebaseToken."""
+        leeway = self.clock_skew if clock_skew is None else clock_skew
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.InvalidTokenError as e:
+            raise InvalidFirebaseToken(str(e)) from e
+        if header.get('alg') != 'RS256':
+            raise InvalidFirebaseToken("Algoritma token harus RS256")
+
+        try:
+            claims = jwt.decode(
+                token,
+                self._key_for(header.get('kid')),
+                algorithms=['RS256'],
+                audience=self.project_id,
+                issuer=f'https://securetoken.google.com/{self.project_id}',
+                leeway=leeway,
+                options={'require': ['exp', 'iat', 'sub']},
+            )
+        except jwt.ExpiredSignatureError as e:
+            raise ExpiredFirebaseToken(str(e)) from e
+        except jwt.ImmatureSignatureError as e:
+            raise FirebaseTokenTooEarly(str(e)) from e
+        except jwt.InvalidTokenError as e:
+            raise InvalidFirebaseToken(str(e)) from e
+
+        sub = claims['sub']
+        if not isinstance(sub, str) or not sub:
+            raise InvalidFirebaseToken("Claim sub kosong")
+        if len(sub) > MAX_SUB_LENGTH:
+            raise InvalidFirebaseToken(f"Claim sub lebih dari {MAX_SUB_LENGTH} karakter")
+        if claims.get('auth_time', 0) > time.time() + leeway:
+            raise FirebaseTokenTooEarly("auth_time di masa depan")
+        claims['uid'] = claims['sub']
+        return claims
+
+
+class UidCache:
+    """firebase_uid -> _id user lokal, agar login OAuth berulang cukup satu lookup _id."""
+
+    def __init__(self, max_entries=UID_CACHE_SIZE, ttl=UID_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, firebase_uid):
+        with self._lock:
+            entry = self._entries.get(firebase_uid)
+            if entry is None:
+                return None
+            if entry[1] < time.monotonic():
+                del self._entries[firebase_uid]
+                return None
+            self._entries.move_to_end(firebase_uid)
+            return entry[0]
+
+    def put(self, firebase_uid, user_id):
+        if self.max_entries <= 0 or not firebase_uid:
+            return
+        with self._lock:
+            self._entries[firebase_uid] = (user_id, time.monotonic() + self.ttl)
+            self._entries.move_to_end(firebase_uid)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, firebase_uid):
+        with self._lock:
+            self._entries.pop(firebase_uid, None)
+
+
+verifier = FirebaseVerifier(GoogleCertKeySource())
+uid_cache = UidCache()
+
+
+def warm_up():
+    """Ambil sertifikat saat startup agar login OAuth pertama tidak menunggu jaringan."""
+    verifier.key_source.get_keys()
@@ -0,0 +1,130 @@
+"""Konfigurasi gunicorn untuk production (dibaca otomatis dari direktori kerja).
+
+    gunicorn -c gunicorn.conf.py
+
+Dengan preload, app dibuat sekali di master lalu di-fork: modul besar (TensorFlow,
+MediaPipe, OpenCV) dan model TFLite dibagi ke semua worker lewat copy-on-write.
+Init yang tidak aman di-fork (koneksi MongoDB, graph MediaPipe, runtime TensorFlow,
+thread background) ditunda ke post_fork di setiap worker.
+"""
+import gc
+import os
+import random
+import signal
+import sys
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 'sync', 'gthread' atau 'uvicorn_worker.UvicornWorker' (mode ASGI, lihat asgi.py)
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+wsgi_app = os.getenv("GUNICORN_APP", "asgi:app" if 'uvicorn' in worker_class.lower() else "app:app")
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '8080')}")
+workers = int(os.getenv("GUNICORN_WORKERS", os.getenv("WEB_CONCURRENCY", "2")))
+# Hanya dipakai worker gthread
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+# Cukup untuk warm-up model di post_fork (STARTUP_TIMEOUT)
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+
+# Session /api/detect/session (window frame + tracker MediaPipe) hanya ada di memori worker
+# yang membuatnya, dan gunicorn tidak bisa mengarahkan request ke worker tertentu. Client
+# session butuh sticky routing sampai ke worker: satu worker per instance
+# (DETECT_SESSION_SINGLE_WORKER=1, opt-in) dengan sticky routing per session di load balancer.
+APP_ROLE = os.getenv("APP_ROLE", "all")
+SESSION_ROLES = ('inference', 'all')
+SESSION_SINGLE_WORKER = os.getenv("DETECT_SESSION_SINGLE_WORKER", "0") == "1"
+
+# Daur ulang worker setelah sekian request; jitter agar tidak restart bersamaan. Role yang
+# menyimpan session tidak didaur ulang secara default, karena restart membuang session aktif
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0" if APP_ROLE in SESSION_ROLES else "1000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "100"))
+# Batas memori privat per worker (MB, 0 = nonaktif); worker di atas batas di-restart dengan graceful
+MAX_WORKER_MEMORY_MB = int(os.getenv("GUNICORN_MAX_WORKER_MEMORY_MB", "0"))
+MEMORY_CHECK_SECONDS = float(os.getenv("GUNICORN_MEMORY_CHECK_SECONDS", "30"))
+
+if SESSION_SINGLE_WORKER and APP_ROLE in SESSION_ROLES:
+    workers = 1
+
+# File heartbeat worker di tmpfs (disk overlay container bisa membuat worker dianggap hang)
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+if preload_app:
+    import startup
+    startup.defer_until_fork()
+
+
+def private_memory_mb():
+    """Memori privat proses ini (MB). Halaman yang masih dibagi dengan master tidak dihitung."""
+    try:
+        total_kb = 0
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                if line.startswith(('Private_Clean:', 'Private_Dirty:')):
+                    total_kb += int(line.split()[1])
+        return total_kb / 1024.0
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _watch_memory(worker):
+    while True:
+        time.sleep(MEMORY_CHECK_SECONDS)
+        used = private_memory_mb()
+        if used > MAX_WORKER_MEMORY_MB:
+            worker.log.warning("Worker %s memakai %.0f MB (batas %s MB), restart", worker.pid, used, MAX_WORKER_MEMORY_MB)
+            # SIGTERM = shutdown graceful untuk semua worker class; master lalu membuat worker baru
+            os.kill(worker.pid, signal.SIGTERM)
+            return
+
+
+def on_starting(server):
+    # Folder metrics multiprocess dibuat dan dikosongkan setiap start, supaya file .db
+    # milik PID dari deploy sebelumnya tidak ikut dijumlahkan di /metrics
+    import metrics
+    metrics.reset_multiproc_dir()
+    if APP_ROLE in SESSION_ROLES and workers > 1:
+        server.log.warning(
+            "APP_ROLE=%s dengan %s worker: session /api/detect/session hanya berlaku di worker "
+            "yang membuatnya. Client session butuh DETECT_SESSION_SINGLE_WORKER=1 dan sticky routing",
+            APP_ROLE, workers,
+        )
+
+
+def pre_fork(server, worker):
+    # Objek yang dibuat saat preload dipindah ke generasi permanen, supaya GC di worker
+    # tidak menulis header objek itu dan memecah halaman copy-on-write
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    import logging_config
+    logging_config.configure_logging()
+    # Setiap worker butuh state random sendiri (OTP, sampling log)
+    random.seed()
+    # Init MongoDB, Firebase, model dan pose, lalu thread background, di proses worker ini
+    import startup
+    startup.after_fork()
+    if MAX_WORKER_MEMORY_MB > 0:
+        threading.Thread(target=_watch_memory, args=(worker,), name='memory-watchdog', daemon=True).start()
+
+
+def worker_exit(server, worker):
+    # Sisa login history yang masih di antrian ditulis sebelum worker berhenti (role api/all)
+    write_behind = sys.modules.get('write_behind')
+    if write_behind is not None:
+        write_behind.login_history_writer.close()
+    import logging_config
+    logging_config.stop_logging()
+
+
+def child_exit(server, worker):
+    # Dijalankan di master: bersihkan file metrics multiprocess milik worker yang mati
+    import metrics
+    metrics.mark_process_dead(worker.pid)
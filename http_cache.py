@@ -0,0 +1,151 @@
+"""ETag / conditional GET, Cache-Control per blueprint dan kompresi respons JSON.
+
+Fungsi tanpa `request` Flask (matching_etag, revalidate, negotiate_coding, ...)
+dipakai juga oleh padanan Quart di asgi_routes/common.py.
+"""
+import gzip
+import hashlib
+import os
+
+from flask import current_app, jsonify, request
+
+from pagination import NEXT_CURSOR_HEADER
+
+try:
+    import brotli
+except ImportError:  # brotli opsional; tanpa library ini hanya gzip yang dipakai
+    brotli = None
+
+# Cache-Control default per blueprint untuk respons GET yang belum menyetelnya sendiri.
+# Katalog butuh x-api-key, jadi default-nya private: shared cache (CDN/proxy) tidak
+# boleh menyajikan respons itu ke klien yang tidak membawa key
+CATALOG_CACHE_CONTROL = os.getenv("CACHE_CONTROL_CATALOG", "private, max-age=60, must-revalidate")
+PRIVATE_CACHE_CONTROL = os.getenv("CACHE_CONTROL_PRIVATE", "private, no-cache")
+NO_STORE = 'no-store'
+BLUEPRINT_CACHE_CONTROL = {
+    'article': CATALOG_CACHE_CONTROL,
+    'stretching': CATALOG_CACHE_CONTROL,
+    'epds': PRIVATE_CACHE_CONTROL,
+    'auth': NO_STORE,
+    'profile': NO_STORE,
+}
+
+# Body JSON yang lebih kecil dari ini tidak dikompresi (overhead header > hemat)
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "5"))
+
+# Setiap content-coding punya ETag strong sendiri: "<etag>-gzip", "<etag>-br"
+CODINGS = ('br', 'gzip')
+
+
+def matching_etag(etag, if_none_match):
+    """ETag varian (identity/gzip/br) yang cocok dengan If-None-Match, atau None."""
+    if not if_none_match:
+        return None
+    for candidate in (etag, *(f'{etag}-{coding}' for coding in CODINGS)):
+        if if_none_match.contains_weak(candidate):
+            return candidate
+    return None
+
+
+def not_modified(response_class, etag, cache_control=None):
+    response = response_class(status=304)
+    response.set_etag(etag)
+    if cache_control:
+        response.headers['Cache-Control'] = cache_control
+    return response
+
+
+def with_etag(response, etag, cache_control=None):
+    response.set_etag(etag)
+    if cache_control:
+        response.headers['Cache-Control'] = cache_control
+    return response
+
+
+def revalidate(response, body, if_none_match, response_class, cache_control=None):
+    """ETag dari body respons yang sudah jadi; 304 jika klien sudah punya versi ini."""
+    etag = hashlib.sha1(body).hexdigest()
+    matched = matching_etag(etag, if_none_match)
+    if matched:
+        unchanged = not_modified(response_class, matched, cache_control)
+        if NEXT_CURSOR_HEADER in response.headers:
+            unchanged.headers[NEXT_CURSOR_HEADER] = response.headers[NEXT_CURSOR_HEADER]
+        return unchanged
+    return with_etag(response, etag, cache_control)
+
+
+def conditional_json(payload, etag, cache_control=None):
+    """Respons JSON dengan ETag; 304 tanpa serialisasi body jika klien sudah punya versi ini."""
+    matched = matching_etag(etag, request.if_none_match)
+    if matched:
+        return not_modified(current_app.response_class, matched, cache_control)
+    return with_etag(jsonify(payload), etag, cache_control)
+
+
+def conditional(response, cache_control=None):
+    """ETag dari isi respons yang sudah jadi (untuk data per user yang tidak di-cache)."""
+    return revalidate(response, response.get_data(), request.if_none_match, current_app.response_class, cache_control)
+
+
+def negotiate_coding(accept, size):
+    """Content-coding untuk body sebesar `size` byte, atau None jika tidak dikompresi."""
+    if size < COMPRESS_MIN_BYTES:
+        return None
+    if brotli is not None and accept['br']:
+        return 'br'
+    if accept['gzip']:
+        return 'gzip'
+    return None
+
+
+def compressible(response):
+    return not (
+        response.status_code != 200
+        or response.mimetype != 'application/json'
+        or 'Content-Encoding' in response.headers
+    )
+
+
+def compress_body(data, coding):
+    if coding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+
+def set_compressed(response, compressed, coding):
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = coding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f'{etag}-{coding}', weak)
+
+
+def compress_response(response):
+    if response.direct_passthrough or not compressible(response):
+        return response
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    coding = negotiate_coding(request.accept_encodings, len(data))
+    if coding is None:
+        return response
+    set_compressed(response, compress_body(data, coding), coding)
+    return response
+
+
+def default_cache_control(response, method, blueprint):
+    if 'Cache-Control' not in response.headers:
+        if method == 'GET' and response.status_code in (200, 304):
+            cache_control = BLUEPRINT_CACHE_CONTROL.get(blueprint)
+        else:
+            cache_control = NO_STORE
+        if cache_control:
+            response.headers['Cache-Control'] = cache_control
+
+
+def init_app(app):
+    @app.after_request
+    def apply_http_caching(response):
+        default_cache_control(response, request.method, request.blueprint)
+        return compress_response(response)
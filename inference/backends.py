@@ -0,0 +1,173 @@
+import os
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+import tensorflow as tf
+
+MODEL_PATH = os.getenv("MODEL_PATH", "model.h5")
+TFLITE_MODEL_PATH = os.getenv("TFLITE_MODEL_PATH", "model.tflite")
+TFLITE_INT8_MODEL_PATH = os.getenv("TFLITE_INT8_MODEL_PATH", "model_int8.tflite")
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "keras")
+
+SEQUENCE_SHAPE = (30, 99)
+
+
+class PredictBackend:
+    """Referensi: perilaku lama, `model.predict` untuk setiap batch."""
+
+    name = 'predict'
+    # Runtime TensorFlow yang sudah menjalankan op tidak aman di-fork (proses anak hang)
+    fork_safe = False
+
+    def __init__(self, model_path=MODEL_PATH):
+        self.model = tf.keras.models.load_model(model_path)
+
+    def predict(self, batch):
+        return self.model.predict(batch, verbose=0)
+
+
+class KerasBackend(PredictBackend):
+    """Model dipanggil langsung lewat graph `tf.function`, tanpa overhead loop `predict`."""
+
+    name = 'keras'
+    jit_compile = False
+
+    def __init__(self, model_path=MODEL_PATH):
+        super().__init__(model_path)
+        self._fn = tf.function(
+            lambda x: self.model(x, training=False),
+            jit_compile=self.jit_compile,
+            reduce_retracing=True,
+        )
+
+    def predict(self, batch):
+        return self._fn(tf.constant(batch, dtype=tf.float32)).numpy()
+
+
+class XlaBackend(KerasBackend):
+    """Sama seperti `keras`, tetapi graph di-compile dengan XLA.
+
+    Ukuran batch dibulatkan ke pangkat dua berikutnya supaya XLA hanya
+    meng-compile beberapa bentuk input, bukan satu graph per ukuran batch.
+    """
+
+    name = 'xla'
+    jit_compile = True
+
+    def predict(self, batch):
+        size = len(batch)
+        padded_size = 1 << (size - 1).bit_length()
+        if padded_size != size:
+            padding = np.zeros((padded_size - size,) + batch.shape[1:], dtype=batch.dtype)
+            batch = np.concatenate([batch, padding])
+        return super().predict(batch)[:size]
+
+
+class TFLiteBackend:
+    """Model TFLite hasil konversi offline (lihat convert_tflite.py)."""
+
+    name = 'tflite'
+    # Interpreter TFLite tetap jalan di proses anak, bobotnya dibagi lewat copy-on-write
+    fork_safe = True
+
+    def __init__(self, model_path=TFLITE_MODEL_PATH):
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(
+                f"{model_path} tidak ditemukan, jalankan `python convert_tflite.py` terlebih dahulu"
+            )
+        self.interpreter = tf.lite.Interpreter(model_path=model_path)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = int(self._input['shape'][0])
+        # Interpreter TFLite tidak thread-safe
+        self._lock = threading.Lock()
+
+    def _resize(self, batch_size):
+        if batch_size == self._batch_size:
+            return
+        self.interpreter.resize_tensor_input(self._input['index'], (batch_size,) + SEQUENCE_SHAPE)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = batch_size
+
+    def predict(self, batch):
+        with self._lock:
+            self._resize(len(batch))
+
+            scale, zero_point = self._input['quantization']
+            if self._input['dtype'] != np.float32 and scale:
+                batch = np.round(batch / scale + zero_point).astype(self._input['dtype'])
+            else:
+                batch = batch.astype(np.float32)
+
+            self.interpreter.set_tensor(self._input['index'], batch)
+            self.interpreter.invoke()
+            output = self.interpreter.get_tensor(self._output['index'])
+
+            scale, zero_point = self._output['quantization']
+            if self._output['dtype'] != np.float32 and scale:
+                output = (output.astype(np.float32) - zero_point) * scale
+            return output
+
+
+class TFLiteInt8Backend(TFLiteBackend):
+    name = 'tflite_int8'
+
+    def __init__(self, model_path=TFLITE_INT8_MODEL_PATH):
+        super().__init__(model_path)
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (PredictBackend, KerasBackend, XlaBackend, TFLiteBackend, TFLiteInt8Backend)
+}
+
+
+def load_backend(name=None):
+    """Pilih backend berdasarkan argumen atau env INFERENCE_BACKEND."""
+    name = name or INFERENCE_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"INFERENCE_BACKEND tidak dikenal: {name} (pilihan: {', '.join(BACKENDS)})")
+    return BACKENDS[name]()
+
+
+def convert_to_tflite(model_path=MODEL_PATH, output_path=TFLITE_MODEL_PATH, int8=False, calibration_data=None):
+    """Konversi model Keras ke TFLite, opsional dengan kuantisasi int8.
+
+    `calibration_data` adalah array (N, 30, 99) berisi sequence keypoints asli;
+    jika tidak ada, dipakai data sintetis dengan rentang koordinat MediaPipe.
+    """
+    model = tf.keras.models.load_model(model_path)
+    # Konversi lewat SavedModel; from_keras_model gagal untuk model Keras 3 di TF 2.16
+    saved_model_dir = tempfile.mkdtemp(prefix='momstretch_savedmodel_')
+    model.export(saved_model_dir)
+    converter = tf.lite.TFLiteConverter.from_saved_model(saved_model_dir)
+    # LSTM kadang butuh op TF bawaan jika tidak bisa di-lower ke builtin TFLite
+    converter.target_spec.supported_ops = [
+        tf.lite.OpsSet.TFLITE_BUILTINS,
+        tf.lite.OpsSet.SELECT_TF_OPS,
+    ]
+
+    if int8:
+        if calibration_data is None:
+            rng = np.random.default_rng(0)
+            calibration_data = rng.uniform(-0.5, 1.0, size=(200,) + SEQUENCE_SHAPE).astype(np.float32)
+
+        def representative_dataset():
+            for sequence in calibration_data:
+                yield [np.expand_dims(sequence, axis=0).astype(np.float32)]
+
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset
+
+    try:
+        tflite_model = converter.convert()
+    finally:
+        shutil.rmtree(saved_model_dir, ignore_errors=True)
+    with open(output_path, 'wb') as f:
+        f.write(tflite_model)
+    return output_path
@@ -0,0 +1,103 @@
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+import numpy as np
+
+MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH", "16"))
+MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "5"))
+
+
+class BatchScheduler:
+    """Mengumpulkan request deteksi yang datang bersamaan menjadi satu batch model.
+
+    Setiap request memasukkan satu sequence (30, 99) ke antrian, lalu satu
+    thread worker memanggil `predict_fn` sekali untuk seluruh batch dan
+    mengembalikan tiap baris hasil ke request asalnya lewat Future.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._requests = 0
+        self._batch_sizes = Counter()
+        self._total_wait = 0.0
+        self._max_wait_seen = 0.0
+
+    def _ensure_started(self):
+        # Thread dibuat saat request pertama (bukan saat import) agar aman di-fork gunicorn
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="inference-batcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, sequence):
+        future = Future()
+        self._ensure_started()
+        self._queue.put((np.asarray(sequence, dtype=np.float32), future, time.monotonic()))
+        return future
+
+    def predict(self, sequence, timeout=None):
+        """Jalankan satu sequence lewat batch, return satu baris prediksi."""
+        return self.submit(sequence).result(timeout=timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.monotonic()
+            try:
+                predictions = self.predict_fn(np.stack([item[0] for item in batch]))
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            for row, (_, future, _) in zip(predictions, batch):
+                future.set_result(row)
+
+            waits = [started - enqueued for _, _, enqueued in batch]
+            with self._stats_lock:
+                self._batches += 1
+                self._requests += len(batch)
+                self._batch_sizes[len(batch)] += 1
+                self._total_wait += sum(waits)
+                self._max_wait_seen = max(self._max_wait_seen, max(waits))
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'batches': self._batches,
+                'requests': self._requests,
+                'avg_batch_size': self._requests / self._batches if self._batches else 0.0,
+                'batch_size_histogram': {str(size): count for size, count in sorted(self._batch_sizes.items())},
+                'avg_queue_wait_ms': self._total_wait / self._requests * 1000.0 if self._requests else 0.0,
+                'max_queue_wait_ms': self._max_wait_seen * 1000.0,
+            }
@@ -0,0 +1,226 @@
+import base64
+import logging
+import threading
+
+import numpy as np
+
+import metrics
+
+# Modul ini sengaja tidak meng-import TensorFlow, MediaPipe atau OpenCV di level
+# modul. Semuanya di-load saat pertama kali dipakai, sehingga worker yang hanya
+# melayani endpoint CRUD tidak pernah membayar biaya memori dan startup-nya.
+
+labels = [
+    "resistance_fight", "slide_out", "pelvic_tilts", "heel_slides",
+    "vacuum_abs_standing", "Pelvic Tilts (Posisi Merangkak)", "Abdominal Brace (Posisi Berbaring Miring)", "Heel Slides",
+    "Knee Taps to Kickbacks", "Leg Lifts with Brace", "Arm Lifts with Brace", "Double Leg Lifts (Tumit Bersama)",
+    "Top Leg Lifts", "Tabletop Leg Lifts(progresi)", "Knee Drops (Kaki & Lutut Bersama)", "curl to side raises", "push and pull", "twist and pull", "single lat and oblique pulls", "single arm tricep extention", "6. Squats", "5. March with Arm Raises", "1. Warm-up running in place", "3. Step and Kick Back", "2. Marching Arm & Leg Lifts", "8. Standing Abdominal Crunch", "10. Calf Raises with Arm Swings", "9. Mini Squat with Step Backs", "7. Squat Taps", "4. Knee Lifts", "teeter_totter", "Deadbug", "calf stretches", "Bridge", "bridge and feet up", "modified side plank", "pillow_pelvic","slide_dumbbell", "plank_4_leg_dog", "toe_tap", "toe_slide", "leg_pillow_plank", "leg_pillow_tap", "pillow_vacuum_abs", "vacuum_abs_dog"
+]
+
+logger = logging.getLogger(__name__)
+
+# Skor minimal label target agar gerakan dianggap tepat
+VERDICT_THRESHOLD = 0.85
+
+_lock = threading.Lock()
+_backend = None
+_batcher = None
+_pose_pool = None
+_tracking_pool = None
+
+
+def get_backend():
+    """Load backend model (TensorFlow) saat pertama kali dibutuhkan."""
+    global _backend
+    if _backend is None:
+        with _lock:
+            if _backend is None:
+                from inference.backends import load_backend
+                # Backend dipilih lewat env INFERENCE_BACKEND (predict, keras, xla, tflite, tflite_int8)
+                _backend = load_backend()
+    return _backend
+
+
+def get_batcher():
+    """Request deteksi yang datang bersamaan digabung menjadi satu panggilan model."""
+    global _batcher
+    if _batcher is None:
+        backend = get_backend()
+        with _lock:
+            if _batcher is None:
+                from inference.batcher import BatchScheduler
+                _batcher = BatchScheduler(lambda batch: _predict_timed(backend, batch))
+    return _batcher
+
+
+def _predict_timed(backend, batch):
+    with metrics.time_stage('model'):
+        predictions = backend.predict(batch)
+    metrics.observe_batch(len(batch))
+    return predictions
+
+
+def get_pose_pool():
+    """Pool Pose `static_image_mode=True` untuk request satu frame."""
+    global _pose_pool
+    if _pose_pool is None:
+        with _lock:
+            if _pose_pool is None:
+                from inference.pose_pool import PosePool, POSE_POOL_SIZE
+                _pose_pool = PosePool(POSE_POOL_SIZE, static_image_mode=True)
+    return _pose_pool
+
+
+def get_tracking_pool():
+    """Pool Pose `static_image_mode=False`; satu instance dipegang satu session."""
+    global _tracking_pool
+    if _tracking_pool is None:
+        with _lock:
+            if _tracking_pool is None:
+                from inference.pose_pool import PosePool, POSE_TRACKING_POOL_SIZE
+                _tracking_pool = PosePool(POSE_TRACKING_POOL_SIZE, static_image_mode=False)
+    return _tracking_pool
+
+
+def lease_tracker():
+    """Pinjam Pose mode tracking untuk satu session, None jika pool habis."""
+    from inference.pose_pool import PoolTimeout
+    try:
+        return get_tracking_pool().get(block=False)
+    except PoolTimeout:
+        return None
+
+
+def release_tracker(pose):
+    get_tracking_pool().put(pose)
+
+
+def warm_up_model():
+    """Load backend dan jalankan input dummy agar tracing/kompilasi graph selesai sebelum traffic."""
+    from inference.batcher import MAX_BATCH_SIZE
+    backend = get_backend()
+    get_batcher()
+    # Setiap ukuran batch pangkat dua sampai batas batcher (XLA compile per bentuk input)
+    batch_size = 1
+    while True:
+        backend.predict(np.zeros((batch_size, 30, 99), dtype=np.float32))
+        if batch_size >= MAX_BATCH_SIZE:
+            break
+        batch_size = min(batch_size * 2, MAX_BATCH_SIZE)
+
+
+def preload_model():
+    """Bagian warm_up_model yang aman dijalankan di master gunicorn sebelum fork.
+
+    Backend TFLite di-load di sini sekali untuk semua worker. Backend berbasis
+    TensorFlow (predict, keras, xla) hanya di-import; modelnya di-load di tiap worker.
+    """
+    from inference.backends import BACKENDS, INFERENCE_BACKEND
+    backend = BACKENDS.get(INFERENCE_BACKEND)
+    if backend is not None and backend.fork_safe:
+        get_backend()
+    elif backend is not None:
+        logger.warning(
+            "INFERENCE_BACKEND=%s tidak aman di-fork: hanya modul TensorFlow yang di-preload, "
+            "model di-load terpisah di setiap worker. Pakai tflite atau tflite_int8 agar model ikut dibagi",
+            INFERENCE_BACKEND,
+        )
+
+
+def preload_pose():
+    """Import MediaPipe dan OpenCV saja; graph Pose yang sudah jalan tidak aman di-fork."""
+    import cv2
+    import mediapipe
+
+
+def warm_up_pose():
+    """Buat satu Pose di tiap pool dan proses frame kosong (graph MediaPipe di-load saat process pertama)."""
+    blank = np.zeros((480, 640, 3), dtype=np.uint8)
+    for pool in (get_pose_pool(), get_tracking_pool()):
+        pose = pool.get()
+        try:
+            pose.process(blank)
+        finally:
+            pool.put(pose)
+
+
+def is_loaded():
+    return _backend is not None
+
+
+def backend_name():
+    return _backend.name if _backend is not None else None
+
+
+def batcher_stats():
+    return _batcher.stats() if _batcher is not None else None
+
+
+def pose_pool_stats():
+    return {
+        'single_frame': _pose_pool.stats() if _pose_pool is not None else None,
+        'tracking': _tracking_pool.stats() if _tracking_pool is not None else None,
+    }
+
+
+def decode_frame_bytes(buffer):
+    """Decode bytes JPEG/PNG langsung (tanpa copy) menjadi frame BGR OpenCV."""
+    import cv2
+    with metrics.time_stage('imdecode'):
+        np_arr = np.frombuffer(buffer, np.uint8)
+        return cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
+
+
+def decode_base64_frame(image_b64):
+    """Decode gambar base64 menjadi frame BGR OpenCV."""
+    with metrics.time_stage('b64decode'):
+        buffer = base64.b64decode(image_b64)
+    return decode_frame_bytes(buffer)
+
+
+def extract_keypoints_from_image(image, detector=None):
+    """Mengekstrak 99 keypoints (x, y, z) dari satu gambar.
+
+    `detector` adalah Pose milik session (mode tracking). Jika None, satu
+    instance dipinjam dari pool selama `process` saja.
+    """
+    import cv2
+    with metrics.time_stage('cvtColor'):
+        rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    if detector is None:
+        with get_pose_pool().acquire() as pooled, metrics.time_stage('pose'):
+            results = pooled.process(rgb)
+    else:
+        with metrics.time_stage('pose'):
+            results = detector.process(rgb)
+    if results.pose_landmarks:
+        with metrics.time_stage('landmarks'):
+            return np.array([[lm.x, lm.y, lm.z] for lm in results.pose_landmarks.landmark]).flatten()
+    else:
+        return None
+
+
+def predict(sequence):
+    """Jalankan satu sequence (30, 99) lewat batcher, return skor per label."""
+    return get_batcher().predict(sequence)
+
+
+def predict_batch(sequences):
+    """Skor untuk banyak sequence (N, 30, 99) dalam satu panggilan model."""
+    return _predict_timed(get_backend(), np.asarray(sequences, dtype=np.float32))
+
+
+def build_verdict(prediction, target_label):
+    """Ubah output model menjadi status yang dikirim ke client."""
+    if target_label not in labels:
+        return {'status': 'Error: Label tidak ditemukan'}
+
+    target_index = labels.index(target_label)
+    accuracy = float(prediction[target_index]) # Konversi ke float standar Python
+
+    logger.debug("Target: %s, Akurasi: %.2f", target_label, accuracy)
+
+    if accuracy > VERDICT_THRESHOLD:
+        return {'status': '✅ Gerakan Sudah Tepat', 'accuracy': accuracy}
+    else:
+        return {'status': '❌ Gerakan Belum Sesuai', 'accuracy': accuracy}
@@ -0,0 +1,124 @@
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+POSE_POOL_SIZE = int(os.getenv("POSE_POOL_SIZE", str(os.cpu_count() or 1)))
+POSE_TRACKING_POOL_SIZE = int(os.getenv("POSE_TRACKING_POOL_SIZE", "16"))
+POSE_POOL_TIMEOUT = float(os.getenv("POSE_POOL_TIMEOUT", "5"))
+
+
+class PoolTimeout(Exception):
+    """Tidak ada instance Pose yang bebas dalam batas waktu."""
+
+
+class PosePool:
+    """Pool berukuran tetap berisi instance `mediapipe Pose`.
+
+    Satu instance `Pose` tidak thread-safe, jadi setiap request (atau session)
+    meminjam instance sendiri. Instance dibuat saat dibutuhkan sampai `size`.
+    """
+
+    def __init__(self, size, static_image_mode=True, min_detection_confidence=0.5,
+                 min_tracking_confidence=0.5, factory=None):
+        self.size = max(1, int(size))
+        self.static_image_mode = static_image_mode
+        self._factory = factory or self._create_pose
+        self._options = {
+            'static_image_mode': static_image_mode,
+            'min_detection_confidence': min_detection_confidence,
+            'min_tracking_confidence': min_tracking_confidence,
+        }
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self._leased_at = {}
+        self._started = time.monotonic()
+        self._acquired = 0
+        self._timeouts = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._busy_time = 0.0
+
+    def _create_pose(self):
+        import mediapipe as mp
+        return mp.solutions.pose.Pose(**self._options)
+
+    def get(self, timeout=POSE_POOL_TIMEOUT, block=True):
+        """Pinjam satu instance. Raise PoolTimeout jika pool penuh."""
+        started = time.monotonic()
+        create_time = 0.0
+        pose = None
+        try:
+            pose = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.size
+                if create:
+                    self._created += 1
+            if create:
+                try:
+                    pose = self._factory()
+                    # Waktu pembuatan instance tidak dihitung sebagai waktu tunggu
+                    create_time = time.monotonic() - started
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            elif block:
+                try:
+                    pose = self._idle.get(timeout=timeout)
+                except queue.Empty:
+                    pass
+
+        now = time.monotonic()
+        with self._lock:
+            if pose is None:
+                self._timeouts += 1
+                raise PoolTimeout(f"Tidak ada Pose detector yang bebas (pool size {self.size})")
+            wait = now - started - create_time
+            self._acquired += 1
+            self._in_use += 1
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+            self._leased_at[id(pose)] = now
+        return pose
+
+    def put(self, pose):
+        # Instance mode tracking menyimpan state frame sebelumnya, reset sebelum dipakai session lain
+        if not self.static_image_mode and hasattr(pose, 'reset'):
+            pose.reset()
+        with self._lock:
+            self._in_use -= 1
+            leased_at = self._leased_at.pop(id(pose), None)
+            if leased_at is not None:
+                self._busy_time += time.monotonic() - leased_at
+        self._idle.put(pose)
+
+    @contextmanager
+    def acquire(self, timeout=POSE_POOL_TIMEOUT):
+        pose = self.get(timeout=timeout)
+        try:
+            yield pose
+        finally:
+            self.put(pose)
+
+    def stats(self):
+        with self._lock:
+            now = time.monotonic()
+            # Waktu pinjam yang masih berjalan ikut dihitung
+            busy = self._busy_time + sum(now - leased_at for leased_at in self._leased_at.values())
+            elapsed = now - self._started
+            return {
+                'size': self.size,
+                'static_image_mode': self.static_image_mode,
+                'created': self._created,
+                'in_use': self._in_use,
+                'acquired': self._acquired,
+                'timeouts': self._timeouts,
+                'avg_wait_ms': self._total_wait / self._acquired * 1000.0 if self._acquired else 0.0,
+                'max_wait_ms': self._max_wait * 1000.0,
+                'utilisation': busy / (elapsed * self.size) if elapsed > 0 else 0.0,
+            }
@@ -0,0 +1,101 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# Jarak maksimal (koordinat ternormalisasi MediaPipe) satu landmark agar pose dianggap sama
+CACHE_THRESHOLD = float(os.getenv("DETECT_CACHE_THRESHOLD", "0.01"))
+CACHE_TTL = float(os.getenv("DETECT_CACHE_TTL", "2"))
+CACHE_MAX_ENTRIES = int(os.getenv("DETECT_CACHE_MAX", "10000"))
+CACHE_QUANTUM = float(os.getenv("DETECT_CACHE_QUANTUM", "0.002"))
+
+
+class FrameResultCache:
+    """Cache hasil model per client untuk frame yang hampir identik.
+
+    Setiap client menyimpan keypoints (terkuantisasi) dari frame terakhir yang
+    benar-benar dijalankan lewat model beserta hasilnya. Frame berikutnya
+    dianggap sama jika tidak ada landmark yang bergeser lebih dari `threshold`.
+    Saat hit, keypoints acuan tidak diganti, jadi gerakan lambat tetap
+    terakumulasi sampai melewati threshold dan model dijalankan lagi.
+    """
+
+    def __init__(self, threshold=CACHE_THRESHOLD, ttl=CACHE_TTL,
+                 max_entries=CACHE_MAX_ENTRIES, quantum=CACHE_QUANTUM):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.quantum = quantum
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def _quantize(self, keypoints):
+        return np.round(np.asarray(keypoints, dtype=np.float32) / self.quantum).astype(np.int32)
+
+    def _distance(self, a, b):
+        # Jarak Euclidean per landmark pada bidang gambar (x, y), ambil yang terbesar.
+        # z tidak dipakai karena estimasi kedalaman MediaPipe jauh lebih noisy.
+        delta = (a - b).reshape(-1, 3)[:, :2].astype(np.float32) * self.quantum
+        return float(np.sqrt((delta ** 2).sum(axis=1)).max())
+
+    def lookup(self, client_key, keypoints):
+        """Return hasil tersimpan jika pose belum berubah, selain itu None."""
+        if not self.enabled:
+            return None
+        quantized = self._quantize(keypoints)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(client_key)
+            if entry is not None and entry[2] < now:
+                del self._entries[client_key]
+                self._expirations += 1
+                entry = None
+            if entry is None or self._distance(entry[0], quantized) > self.threshold:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(client_key)
+            self._hits += 1
+            return entry[1]
+
+    def store(self, client_key, keypoints, result):
+        if not self.enabled:
+            return
+        entry = (self._quantize(keypoints), result, time.monotonic() + self.ttl)
+        with self._lock:
+            self._entries[client_key] = entry
+            self._entries.move_to_end(client_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def discard(self, client_key):
+        with self._lock:
+            self._entries.pop(client_key, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': self._hits / lookups if lookups else 0.0,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'threshold': self.threshold,
+                'ttl_seconds': self.ttl,
+            }
+
+
+result_cache = FrameResultCache()
@@ -0,0 +1,131 @@
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+import numpy as np
+
+# Panjang sequence yang dipakai saat training model
+SEQUENCE_LENGTH = 30
+
+DEFAULT_STRIDE = int(os.getenv("DETECT_SESSION_STRIDE", "5"))
+SESSION_TTL = float(os.getenv("DETECT_SESSION_TTL", "300"))
+MAX_SESSIONS = int(os.getenv("DETECT_SESSION_MAX", "200"))
+
+
+class PoseSession:
+    """Ring buffer 30 frame keypoints terakhir milik satu client."""
+
+    def __init__(self, target_label, stride=DEFAULT_STRIDE):
+        self.id = uuid.uuid4().hex
+        self.target_label = target_label
+        self.stride = max(1, int(stride))
+        self.frames = deque(maxlen=SEQUENCE_LENGTH)
+        self.frames_since_inference = 0
+        self.total_frames = 0
+        self.last_verdict = None
+        self.last_seen = time.monotonic()
+        self.lock = threading.Lock()
+        # Pose detector mode tracking milik session ini (lihat inference/pose_pool.py)
+        self.tracker = None
+        self.tracker_lock = threading.Lock()
+        self.on_close = None
+        # Diset close(); frame yang datang sesudahnya tidak boleh menyewa tracker baru
+        self.closed = False
+
+    @property
+    def ready(self):
+        return len(self.frames) == SEQUENCE_LENGTH
+
+    def push(self, keypoints):
+        """Tambah satu frame, return True jika model perlu dijalankan."""
+        self.frames.append(keypoints)
+        self.total_frames += 1
+        self.frames_since_inference += 1
+        self.last_seen = time.monotonic()
+
+        if not self.ready:
+            return False
+        # Inference pertama langsung saat buffer penuh, selanjutnya tiap `stride` frame
+        if self.last_verdict is None or self.frames_since_inference >= self.stride:
+            self.frames_since_inference = 0
+            return True
+        return False
+
+    def sequence(self):
+        return np.array(self.frames)
+
+    def expired(self, now):
+        return now - self.last_seen > SESSION_TTL
+
+    def close(self):
+        """Lepaskan resource session (mis. tracker kembali ke pool)."""
+        with self.tracker_lock:
+            self.closed = True
+            if self.on_close is not None and self.tracker is not None:
+                self.on_close(self.tracker)
+            self.tracker = None
+
+
+class SessionStore:
+    """Penyimpanan session in-process (per worker), thread-safe.
+
+    Session tidak bisa dipindah antar proses (tracker MediaPipe ikut di dalamnya), jadi
+    semua frame satu session harus sampai ke worker yang sama: satu worker per instance
+    (DETECT_SESSION_SINGLE_WORKER=1 di gunicorn.conf.py) dan sticky routing antar instance.
+    """
+
+    def __init__(self, max_sessions=MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        expired = [sid for sid, s in self._sessions.items() if s.expired(now)]
+        return [self._sessions.pop(session_id) for session_id in expired]
+
+    def evict_expired(self):
+        with self._lock:
+            expired = self._evict_expired()
+        for session in expired:
+            session.close()
+        return len(expired)
+
+    def create(self, target_label, stride=DEFAULT_STRIDE):
+        self.evict_expired()
+        with self._lock:
+            if len(self._sessions) >= self.max_sessions:
+                return None
+            session = PoseSession(target_label, stride)
+            self._sessions[session.id] = session
+            return session
+
+    def get(self, session_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            now = time.monotonic()
+            if not session.expired(now):
+                session.last_seen = now
+                return session
+            del self._sessions[session_id]
+        session.close()
+        return None
+
+    def close(self, session_id):
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        session.close()
+        return True
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+
+session_store = SessionStore()
@@ -0,0 +1,179 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+from datetime import datetime, timezone
+
+from flask import g, request
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# Level per blueprint/logger, contoh: "detect=WARNING,auth=DEBUG,pymongo=WARNING"
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+# Persentase request yang body-nya ikut dicatat (0.0 - 1.0)
+LOG_BODY_SAMPLE_RATE = float(os.getenv("LOG_BODY_SAMPLE_RATE", "0.0"))
+LOG_BODY_MAX_CHARS = int(os.getenv("LOG_BODY_MAX_CHARS", "512"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# Field yang tidak boleh pernah muncul di log
+REDACTED_KEYS = {
+    'password', 'token', 'firebase_token', 'otp', 'otp_code',
+    'authorization', 'x-api-key', 'api_key', 'secret',
+}
+# Field berisi payload gambar, diganti ringkasan ukurannya saja
+IMAGE_KEYS = {'image', 'images', 'frame', 'frames'}
+
+# Atribut bawaan LogRecord, sisanya dianggap field tambahan (extra=...)
+_RESERVED_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+_listener = None
+_listener_pid = None
+
+
+def redact(value, max_chars=LOG_BODY_MAX_CHARS):
+    """Salin data request dengan secret disembunyikan dan string panjang dipotong."""
+    if isinstance(value, dict):
+        result = {}
+        for key, item in value.items():
+            lowered = str(key).lower()
+            if lowered in REDACTED_KEYS:
+                result[key] = '[REDACTED]'
+            elif lowered in IMAGE_KEYS:
+                result[key] = f'[IMAGE {len(item) if hasattr(item, "__len__") else "?"} chars]'
+            else:
+                result[key] = redact(item, max_chars)
+        return result
+    if isinstance(value, list):
+        return [redact(item, max_chars) for item in value[:20]]
+    if isinstance(value, str) and len(value) > max_chars:
+        return value[:max_chars] + f'...[+{len(value) - max_chars} chars]'
+    return value
+
+
+class JsonFormatter(logging.Formatter):
+    """Satu baris JSON per log record."""
+
+    def format(self, record):
+        payload = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info:
+            payload['exc'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler yang membuang record saat antrian penuh, bukan memblokir worker."""
+
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+
+def parse_levels(spec):
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, level = item.partition('=')
+        if name and level:
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging():
+    """Pasang handler antrian di root logger; I/O ke stdout dilakukan thread listener.
+
+    Thread listener tidak ikut ter-fork, jadi worker gunicorn (--preload) yang memanggil
+    ini lagi setelah fork mendapat antrian dan listener sendiri.
+    """
+    global _listener, _listener_pid
+    if _listener is not None and _listener_pid == os.getpid():
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(DroppingQueueHandler(log_queue))
+    root.setLevel(LOG_LEVEL.upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    if _listener_pid is None:
+        atexit.register(stop_logging)
+    _listener_pid = os.getpid()
+
+
+def stop_logging():
+    """Flush sisa antrian log (dipanggil saat proses berhenti)."""
+    global _listener
+    if _listener is not None and _listener_pid == os.getpid():
+        _listener.stop()
+        _listener = None
+
+
+def blueprint_logger(app, name=None):
+    """Logger milik blueprint (nama modul route-nya), atau logger app jika tidak ada."""
+    blueprint = app.blueprints.get(name) if name else None
+    return logging.getLogger(blueprint.import_name if blueprint else app.import_name)
+
+
+def set_blueprint_levels(app):
+    """Level dari LOG_LEVELS; nama boleh nama blueprint ('auth') atau nama logger ('pymongo')."""
+    for name, level in parse_levels(LOG_LEVELS).items():
+        blueprint = app.blueprints.get(name)
+        logging.getLogger(blueprint.import_name if blueprint else name).setLevel(level)
+
+
+def request_log_fields(request, status, started):
+    """Field access log satu request (dipakai juga oleh hook Quart di asgi_routes/common.py)."""
+    return {
+        'method': request.method,
+        'path': request.path,
+        'status': status,
+        'duration_ms': round((time.perf_counter() - started) * 1000, 2) if started else None,
+        'remote_addr': request.remote_addr,
+    }
+
+
+def sample_body(request):
+    """True jika body JSON request ini ikut dicatat (LOG_BODY_SAMPLE_RATE)."""
+    return bool(LOG_BODY_SAMPLE_RATE and request.is_json and random.random() < LOG_BODY_SAMPLE_RATE)
+
+
+def init_app(app):
+    """Pasang level per blueprint dan access log request di app Flask."""
+    configure_logging()
+    set_blueprint_levels(app)
+
+    @app.before_request
+    def start_request_log():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def write_request_log(response):
+        logger = blueprint_logger(app, request.blueprint)
+        if not logger.isEnabledFor(logging.INFO):
+            return response
+
+        fields = request_log_fields(request, response.status_code, g.get('request_started'))
+        if sample_body(request):
+            fields['body'] = redact(request.get_json(silent=True))
+        logger.info("%s %s %s", request.method, request.path, response.status_code, extra=fields)
+        return response
@@ -0,0 +1,331 @@
+"""Pengiriman email OTP lewat outbox MongoDB dan dispatcher di background.
+
+`/register` cukup menulis satu dokumen ke collection `mail_outbox`
+(`enqueue_otp_email`). Thread dispatcher di setiap worker API mengklaim email
+yang jatuh tempo secara atomik, mengirimnya dalam batch lewat koneksi SMTP
+yang tetap terbuka, dan menjadwalkan ulang yang gagal dengan backoff
+eksponensial. Email yang sedang dikirim saat proses mati diklaim ulang setelah
+MAIL_CLAIM_TIMEOUT, jadi OTP tidak hilang ketika restart.
+
+Untuk development/tes, jalankan SMTP pengganti lokal yang hanya menampung email
+(`--verbose` mencetak isinya, termasuk kode OTP, ke log debug):
+
+    python mailer.py serve --port 1025 --verbose
+    MAIL_SMTP_HOST=localhost MAIL_SMTP_PORT=1025 MAIL_SMTP_SSL=0 python app.py
+"""
+import argparse
+import logging
+import os
+import smtplib
+import socketserver
+import threading
+import time
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+
+from pymongo import ReturnDocument
+
+import metrics
+from db import db
+
+logger = logging.getLogger(__name__)
+
+EMAIL_ADDRESS = os.getenv("EMAIL_ADDRESS")  # verif email
+EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
+SMTP_HOST = os.getenv("MAIL_SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("MAIL_SMTP_PORT", "465"))
+SMTP_SSL = os.getenv("MAIL_SMTP_SSL", "1") == "1"
+SMTP_TIMEOUT = float(os.getenv("MAIL_SMTP_TIMEOUT", "10"))
+# Koneksi yang menganggur lebih lama dari ini ditutup
+SMTP_IDLE_TIMEOUT = float(os.getenv("MAIL_SMTP_IDLE_TIMEOUT", "60"))
+# Jumlah thread dispatcher per worker; masing-masing memegang satu koneksi SMTP
+POOL_SIZE = int(os.getenv("MAIL_SMTP_POOL_SIZE", "1"))
+BATCH_SIZE = int(os.getenv("MAIL_BATCH_SIZE", "20"))
+POLL_INTERVAL = float(os.getenv("MAIL_POLL_INTERVAL", "2"))
+MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", "5"))
+RETRY_BASE_SECONDS = float(os.getenv("MAIL_RETRY_BASE_SECONDS", "5"))
+RETRY_MAX_SECONDS = float(os.getenv("MAIL_RETRY_MAX_SECONDS", "120"))
+CLAIM_TIMEOUT = float(os.getenv("MAIL_CLAIM_TIMEOUT", "60"))
+
+outbox_collection = db['mail_outbox']
+
+OTP_SUBJECT = 'Kode OTP Verifikasi MomStretch+'
+OTP_TEMPLATE = '''
+Hai!
+
+Kode OTP kamu adalah: {otp_code}
+
+Kode ini hanya berlaku selama 10 menit.
+Jangan bagikan kode ini ke siapa pun.
+
+Salam hangat,
+Tim MomStretch+
+'''
+
+
+def otp_email_record(to_email, otp_code, expires_at=None):
+    now = datetime.utcnow()
+    return {
+        'to': to_email,
+        'subject': OTP_SUBJECT,
+        'body': OTP_TEMPLATE.format(otp_code=otp_code),
+        'status': 'pending',
+        'attempts': 0,
+        'created_at': now,
+        'next_attempt_at': now,
+        # OTP yang sudah kedaluwarsa tidak perlu dikirim lagi
+        'expires_at': expires_at,
+    }
+
+
+def notify_dispatcher():
+    """Bangunkan dispatcher setelah email baru masuk outbox."""
+    start_dispatcher()
+    _wakeup.set()
+
+
+def enqueue_otp_email(to_email, otp_code, expires_at=None):
+    """Tulis email OTP ke outbox; pengiriman dilakukan dispatcher di background."""
+    outbox_collection.insert_one(otp_email_record(to_email, otp_code, expires_at))
+    notify_dispatcher()
+
+
+def _claim(now):
+    """Ambil satu email yang jatuh tempo (atau yang klaimnya basi) secara atomik."""
+    return outbox_collection.find_one_and_update(
+        {'$or': [
+            {'status': 'pending', 'next_attempt_at': {'$lte': now}},
+            {'status': 'sending', 'claimed_until': {'$lt': now}},
+        ]},
+        {
+            '$set': {'status': 'sending', 'claimed_until': now + timedelta(seconds=CLAIM_TIMEOUT)},
+            '$inc': {'attempts': 1},
+        },
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def _build_message(record):
+    msg = EmailMessage()
+    msg['Subject'] = record['subject']
+    msg['From'] = EMAIL_ADDRESS
+    msg['To'] = record['to']
+    msg.set_content(record['body'])
+    return msg
+
+
+class SmtpConnection:
+    """Satu koneksi SMTP yang dipakai ulang antar email dan antar batch."""
+
+    def __init__(self):
+        self._smtp = None
+        self._last_used = 0.0
+
+    def _connect(self):
+        with metrics.track_external('smtp', 'connect'):
+            if SMTP_SSL:
+                smtp = smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+            else:
+                smtp = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+            if EMAIL_ADDRESS and EMAIL_PASSWORD:
+                smtp.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
+        self._smtp = smtp
+
+    def send(self, msg):
+        if self._smtp is None:
+            self._connect()
+        try:
+            with metrics.track_external('smtp', 'send_otp_email'):
+                self._smtp.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            # Server menutup koneksi yang menganggur: sambung ulang sekali
+            self._smtp = None
+            self._connect()
+            with metrics.track_external('smtp', 'send_otp_email'):
+                self._smtp.send_message(msg)
+        self._last_used = time.monotonic()
+
+    def close_if_idle(self):
+        if self._smtp is not None and time.monotonic() - self._last_used > SMTP_IDLE_TIMEOUT:
+            self.close()
+
+    def close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
+
+
+def _retry_delay(attempts):
+    return min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+
+
+# Body berisi OTP dalam plaintext: dihapus begitu email mencapai status akhir
+# (sent/failed/expired). Dokumennya sendiri dihapus TTL index di migrations.py.
+_FINAL_UNSET = {'body': '', 'claimed_until': ''}
+
+
+def _deliver(connection, record, now):
+    if record.get('expires_at') and record['expires_at'] < now:
+        outbox_collection.update_one(
+            {'_id': record['_id']},
+            {'$set': {'status': 'expired'}, '$unset': _FINAL_UNSET},
+        )
+        return
+    try:
+        connection.send(_build_message(record))
+    except Exception as e:
+        # Alamat ditolak tidak akan berhasil dengan retry
+        permanent = isinstance(e, smtplib.SMTPRecipientsRefused)
+        if permanent or record['attempts'] >= MAX_ATTEMPTS:
+            update = {'$set': {'status': 'failed', 'last_error': str(e)[:200]},
+                      '$unset': _FINAL_UNSET}
+            logger.error("OTP email to %s failed permanently: %s", record['to'], e)
+        else:
+            update = {'$set': {
+                'status': 'pending',
+                'last_error': str(e)[:200],
+                'next_attempt_at': now + timedelta(seconds=_retry_delay(record['attempts'])),
+            }}
+            logger.warning("OTP email to %s failed (attempt %s): %s", record['to'], record['attempts'], e)
+        if not permanent:
+            # Koneksi mungkin rusak; batch berikutnya membuka koneksi baru
+            connection.close()
+        outbox_collection.update_one({'_id': record['_id']}, update)
+    else:
+        outbox_collection.update_one(
+            {'_id': record['_id']},
+            {'$set': {'status': 'sent', 'sent_at': datetime.utcnow()}, '$unset': _FINAL_UNSET},
+        )
+
+
+def dispatch_once(connection):
+    """Kirim satu batch email yang jatuh tempo; return jumlah yang diproses."""
+    processed = 0
+    while processed < BATCH_SIZE:
+        now = datetime.utcnow()
+        record = _claim(now)
+        if record is None:
+            break
+        _deliver(connection, record, now)
+        processed += 1
+    return processed
+
+
+_wakeup = threading.Event()
+_dispatcher_pid = None
+_dispatcher_lock = threading.Lock()
+
+
+def _run_dispatcher():
+    connection = SmtpConnection()
+    while True:
+        try:
+            processed = dispatch_once(connection)
+        except Exception as e:
+            logger.exception("Mail dispatcher error: %s", e)
+            processed = 0
+        if processed < BATCH_SIZE:
+            connection.close_if_idle()
+            _wakeup.wait(POLL_INTERVAL)
+            _wakeup.clear()
+
+
+def start_dispatcher():
+    """Mulai thread dispatcher (sekali per proses, aman dipanggil lagi setelah fork)."""
+    global _dispatcher_pid
+    if _dispatcher_pid == os.getpid():
+        return
+    with _dispatcher_lock:
+        if _dispatcher_pid == os.getpid():
+            return
+        _dispatcher_pid = os.getpid()
+        for index in range(POOL_SIZE):
+            threading.Thread(target=_run_dispatcher, name=f'mail-dispatcher-{index}', daemon=True).start()
+
+
+class _StandInSmtpHandler(socketserver.StreamRequestHandler):
+    """SMTP minimal (tanpa TLS) yang menerima semua email dan menyimpannya di `server.messages`."""
+
+    def _reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        self._reply('220 momstretch-smtp-standin ready')
+        recipients = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip()
+            verb = command.split(' ', 1)[0].upper()
+            if verb in ('EHLO', 'HELO'):
+                self._reply('250-localhost')
+                self._reply('250 AUTH PLAIN LOGIN')
+            elif verb == 'AUTH':
+                self._reply('235 Authentication successful')
+            elif verb == 'MAIL':
+                recipients = []
+                self._reply('250 OK')
+            elif verb == 'RCPT':
+                recipients.append(command.split(':', 1)[-1].strip())
+                self._reply('250 OK')
+            elif verb == 'DATA':
+                self._reply('354 End data with <CR><LF>.<CR><LF>')
+                lines = []
+                while True:
+                    data = self.rfile.readline()
+                    if not data or data in (b'.\r\n', b'.\n'):
+                        break
+                    lines.append(data.decode(errors='replace'))
+                self.server.messages.append((recipients, ''.join(lines)))
+                # Isi email memuat OTP: hanya ditulis ke log di level debug
+                logger.debug("--- mail to %s ---\n%s", ', '.join(recipients), ''.join(lines))
+                self._reply('250 OK: queued')
+            elif verb in ('RSET', 'NOOP'):
+                self._reply('250 OK')
+            elif verb == 'QUIT':
+                self._reply('221 Bye')
+                return
+            else:
+                self._reply('502 Command not implemented')
+
+
+class StandInSmtpServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address):
+        super().__init__(address, _StandInSmtpHandler)
+        self.messages = []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    serve = subparsers.add_parser('serve', help="Jalankan SMTP pengganti lokal")
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=1025)
+    serve.add_argument('--verbose', action='store_true', help="Cetak isi setiap email (termasuk OTP)")
+    subparsers.add_parser('dispatch', help="Kirim semua email yang jatuh tempo lalu keluar")
+    args = parser.parse_args()
+
+    verbose = args.command == 'serve' and args.verbose
+    logging.basicConfig(level=logging.DEBUG if verbose else logging.INFO, format='%(levelname)s %(message)s')
+    if args.command == 'serve':
+        with StandInSmtpServer((args.host, args.port)) as server:
+            print(f"SMTP stand-in listening on {args.host}:{args.port}", flush=True)
+            server.serve_forever()
+    else:
+        connection = SmtpConnection()
+        try:
+            while dispatch_once(connection) == BATCH_SIZE:
+                pass
+        finally:
+            connection.close()
+
+
+if __name__ == '__main__':
+    main()
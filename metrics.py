@@ -0,0 +1,213 @@
+import os
+import time
+from contextlib import contextmanager
+
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+from pymongo import monitoring
+
+# Jika PROMETHEUS_MULTIPROC_DIR diset (wajib untuk gunicorn multi-worker), setiap
+# worker menulis metriknya ke file di folder itu dan /metrics menggabungkan semuanya.
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+if MULTIPROC_DIR:
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_LATENCY = Histogram(
+    'momstretch_http_request_duration_seconds',
+    'Latency request HTTP per route',
+    ['blueprint', 'endpoint', 'method', 'status'],
+    buckets=LATENCY_BUCKETS,
+)
+DETECT_STAGE_LATENCY = Histogram(
+    'momstretch_detect_stage_duration_seconds',
+    'Latency per tahap pipeline deteksi pose',
+    ['stage'],
+    buckets=LATENCY_BUCKETS,
+)
+MODEL_BATCH_SIZE = Histogram(
+    'momstretch_model_batch_size',
+    'Jumlah sequence per panggilan model',
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+MONGO_COMMAND_LATENCY = Histogram(
+    'momstretch_mongo_command_duration_seconds',
+    'Latency command MongoDB per collection',
+    ['collection', 'command', 'outcome'],
+    buckets=LATENCY_BUCKETS,
+)
+EXTERNAL_CALL_LATENCY = Histogram(
+    'momstretch_external_call_duration_seconds',
+    'Latency panggilan ke layanan eksternal (Firebase, SMTP)',
+    ['service', 'operation', 'outcome'],
+    buckets=LATENCY_BUCKETS,
+)
+CATALOG_CACHE_REQUESTS = Counter(
+    'momstretch_catalog_cache_requests_total',
+    'Lookup cache katalog per endpoint (hits, misses, coalesced)',
+    ['endpoint', 'result'],
+)
+WRITE_BEHIND_QUEUE_DEPTH = Gauge(
+    'momstretch_write_behind_queue_depth',
+    'Jumlah record yang menunggu ditulis oleh write-behind writer',
+    ['queue'],
+    multiprocess_mode='livesum',
+)
+WRITE_BEHIND_FLUSH_LATENCY = Histogram(
+    'momstretch_write_behind_flush_duration_seconds',
+    'Latency insert_many per flush write-behind',
+    ['queue', 'outcome'],
+    buckets=LATENCY_BUCKETS,
+)
+WRITE_BEHIND_RECORDS = Counter(
+    'momstretch_write_behind_records_total',
+    'Record write-behind per hasil (written, sync, dropped)',
+    ['queue', 'outcome'],
+)
+
+PASSWORD_HASH_QUEUE_TIME = Histogram(
+    'momstretch_password_hash_queue_seconds',
+    'Waktu tunggu job hashing password sebelum dikerjakan executor',
+    ['operation'],
+    buckets=LATENCY_BUCKETS,
+)
+PASSWORD_HASH_DURATION = Histogram(
+    'momstretch_password_hash_duration_seconds',
+    'Durasi hashing/verifikasi password di executor',
+    ['operation'],
+    buckets=LATENCY_BUCKETS,
+)
+PASSWORD_HASH_REJECTED = Counter(
+    'momstretch_password_hash_rejected_total',
+    'Job hashing password yang ditolak karena executor penuh atau timeout',
+    ['operation', 'reason'],
+)
+PASSWORD_HASH_PENDING = Gauge(
+    'momstretch_password_hash_pending',
+    'Job hashing password yang sedang antri atau dikerjakan',
+    multiprocess_mode='livesum',
+)
+
+
+@contextmanager
+def time_stage(stage):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        DETECT_STAGE_LATENCY.labels(stage=stage).observe(time.perf_counter() - started)
+
+
+def observe_batch(size):
+    MODEL_BATCH_SIZE.observe(size)
+
+
+@contextmanager
+def track_external(service, operation):
+    """Ukur latency panggilan eksternal; outcome 'error' jika terjadi exception."""
+    started = time.perf_counter()
+    outcome = 'ok'
+    try:
+        yield
+    except Exception:
+        outcome = 'error'
+        raise
+    finally:
+        EXTERNAL_CALL_LATENCY.labels(service=service, operation=operation, outcome=outcome).observe(
+            time.perf_counter() - started
+        )
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Catat durasi setiap command MongoDB, dikelompokkan per collection."""
+
+    # Command yang nama collection-nya ada di field lain, bukan di nilai command
+    _COLLECTION_FIELDS = {'getMore': 'collection'}
+
+    def __init__(self):
+        self._collections = {}
+
+    def _key(self, event):
+        return (event.request_id, event.connection_id)
+
+    def started(self, event):
+        command = event.command
+        field = self._COLLECTION_FIELDS.get(event.command_name, event.command_name)
+        collection = command.get(field)
+        if not isinstance(collection, str):
+            collection = '-'
+        self._collections[self._key(event)] = collection
+
+    def _observe(self, event, outcome):
+        collection = self._collections.pop(self._key(event), '-')
+        MONGO_COMMAND_LATENCY.labels(
+            collection=collection, command=event.command_name, outcome=outcome,
+        ).observe(event.duration_micros / 1e6)
+
+    def succeeded(self, event):
+        self._observe(event, 'ok')
+
+    def failed(self, event):
+        self._observe(event, 'error')
+
+
+def render_metrics():
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
+
+
+def observe_request(request, status, started):
+    """Catat latency satu request ke REQUEST_LATENCY (kecuali /metrics sendiri)."""
+    if started is not None and request.endpoint != 'metrics':
+        REQUEST_LATENCY.labels(
+            blueprint=request.blueprint or '-',
+            endpoint=request.url_rule.rule if request.url_rule else 'unmatched',
+            method=request.method,
+            status=status,
+        ).observe(time.perf_counter() - started)
+
+
+def metrics_allowed(authorization):
+    return not METRICS_TOKEN or authorization == f'Bearer {METRICS_TOKEN}'
+
+
+def init_app(app):
+    """Pasang pengukuran latency per route dan endpoint /metrics."""
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def record_request_latency(response):
+        observe_request(request, response.status_code, g.get('metrics_started'))
+        return response
+
+    @app.route('/metrics', endpoint='metrics')
+    def metrics_endpoint():
+        if not metrics_allowed(request.headers.get('Authorization')):
+            return Response('Forbidden\n', status=403, mimetype='text/plain')
+        return Response(render_metrics(), mimetype=CONTENT_TYPE_LATEST)
+
+
+def reset_multiproc_dir():
+    """Hapus file metrics dari proses deploy sebelumnya (hook `on_starting` gunicorn)."""
+    if not MULTIPROC_DIR:
+        return
+    for name in os.listdir(MULTIPROC_DIR):
+        if name.endswith('.db'):
+            os.remove(os.path.join(MULTIPROC_DIR, name))
+
+
+def mark_process_dead(pid):
+    """Dipanggil dari hook `child_exit` gunicorn agar gauge worker mati dibersihkan."""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
@@ -1,21 +1,81 @@
-from flask import request, jsonify
+from flask import request, jsonify, g
 from functools import wraps
+import logging
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 API_KEY = os.getenv("API_KEY")
+logger = logging.getLogger(__name__)
+
+def check_api_key(client_key):
+    """Validasi header x-api-key; return (payload, status) error atau None.
+
+    Dipakai juga oleh decorator Quart di asgi_routes/common.py.
+    """
+    if not client_key:
+        logger.warning("No API Key provided")
+        return {'message': 'API Key diperlukan'}, 403
+    if client_key != API_KEY:
+        logger.warning("Invalid API Key provided")
+        return {'message': 'API Key tidak valid'}, 403
+    logger.debug("API Key validation successful")
+    return None
 
 def require_api_key(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        client_key = request.headers.get('x-api-key')
-        if not client_key:
-            print("ERROR: No API Key provided")
-            return jsonify({'message': 'API Key diperlukan'}), 403
-        if client_key != API_KEY:
-            print(f"ERROR: Invalid API Key provided: {client_key}")
-            return jsonify({'message': 'API Key tidak valid'}), 403
-        print("API Key validation successful")
+        error = check_api_key(request.headers.get('x-api-key'))
+        if error:
+            payload, status = error
+            return jsonify(payload), status
         return f(*args, **kwargs)
-    return decorated_function
\ No newline at end of file
+    return decorated_function
+
+# Pesan 401 mengikuti gaya masing-masing blueprint ('message' atau 'error')
+_TOKEN_ERRORS = {
+    'message': ('Token tidak ditemukan', 'Token tidak valid'),
+    'error': ('Token tidak ada atau format salah', 'Token tidak valid atau kedaluwarsa'),
+}
+
+def check_bearer_token(auth_header, error_key='message'):
+    """Header Authorization -> (user_id, None) atau (None, (payload, 401))."""
+    from utils import verify_token
+
+    missing, invalid = _TOKEN_ERRORS[error_key]
+    if not auth_header or not auth_header.startswith('Bearer '):
+        logger.warning("No valid Authorization header")
+        return None, ({error_key: missing}, 401)
+
+    user_id = verify_token(auth_header.split(' ', 1)[1])
+    if not user_id:
+        logger.warning("Token verification failed")
+        return None, ({error_key: invalid}, 401)
+    return user_id, None
+
+def require_user(f=None, *, error_key='message'):
+    """Verifikasi Bearer token dan simpan id user di `g.user_id`.
+
+    Pakai setelah @require_api_key. Dokumen user diambil lewat current_user()
+    hanya jika route membutuhkannya.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            user_id, error = check_bearer_token(request.headers.get('Authorization'), error_key)
+            if error:
+                payload, status = error
+                return jsonify(payload), status
+
+            g.user_id = user_id
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator(f) if f is not None else decorator
+
+def current_user():
+    """Dokumen user pemilik token (None jika sudah dihapus), di-load sekali per request."""
+    if '_current_user' not in g:
+        from bson import ObjectId
+        from db import users_collection
+        g._current_user = users_collection.find_one({'_id': ObjectId(g.user_id)})
+    return g._current_user
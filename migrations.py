@@ -0,0 +1,209 @@
+"""Migrasi index MongoDB MomStretch+ (dijalankan saat deploy).
+
+    python migrations.py migrate          # buat index yang belum ada (idempotent)
+    python migrations.py verify           # cek semua query shape memakai index
+    python migrations.py migrate --verify # keduanya, dipakai di fase release
+    python migrations.py status           # versi yang sudah diterapkan
+
+Setiap migrasi punya nomor versi; versi yang sudah diterapkan dicatat di
+collection `schema_migrations`. create_index sendiri idempotent, jadi
+migrasi yang gagal di tengah jalan aman dijalankan ulang.
+"""
+import argparse
+import logging
+import sys
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_COLLECTION = 'schema_migrations'
+
+
+class Index:
+    def __init__(self, collection, keys, name, **options):
+        self.collection = collection
+        self.keys = keys
+        self.name = name
+        self.options = options
+
+
+class Migration:
+    def __init__(self, version, description, indexes):
+        self.version = version
+        self.description = description
+        self.indexes = indexes
+
+
+class QueryShape:
+    """Bentuk query yang dipakai route; harus dilayani index (bukan COLLSCAN)."""
+
+    def __init__(self, name, collection, filter, sort=None):
+        self.name = name
+        self.collection = collection
+        self.filter = filter
+        self.sort = sort
+
+
+MIGRATIONS = [
+    Migration(1, 'Index awal untuk semua query route', [
+        # /register, /login, /verify-otp, /login_oauth
+        Index('users', [('email', ASCENDING)], 'email_unique', unique=True),
+        # GET /api/stretch_history: filter user_id, urut timestamp terbaru
+        Index('stretch_history', [('user_id', ASCENDING), ('timestamp', DESCENDING), ('_id', DESCENDING)],
+              'user_id_timestamp_id'),
+        # GET /login-history
+        Index('login_history', [('user_id', ASCENDING), ('timestamp', DESCENDING), ('_id', DESCENDING)],
+              'user_id_timestamp_id'),
+        # GET /api/epds/history: filter userId, urut date lama ke baru
+        Index('epds_records', [('userId', ASCENDING), ('date', ASCENDING), ('_id', ASCENDING)],
+              'userId_date_id'),
+        # GET /articles: urut published_date, _id terbaru
+        Index('articles', [('published_date', DESCENDING), ('_id', DESCENDING)], 'published_date_id'),
+        # GET /api/stretching?program=...
+        Index('stretching', [('program', ASCENDING)], 'program'),
+        # GET /api/movement?stretching=...
+        Index('movement', [('stretching', ASCENDING)], 'stretching'),
+    ]),
+    Migration(2, 'Index rollup ringkasan visualisasi', [
+        # visualization.build_summary: top movement dan data harian per metric
+        Index('visualization_rollups', [('metric', ASCENDING), ('count', DESCENDING)], 'metric_count'),
+        Index('visualization_rollups', [('metric', ASCENDING), ('key', DESCENDING)], 'metric_key'),
+    ]),
+    Migration(3, 'Idempotency key sinkronisasi offline stretch history', [
+        # POST /api/stretch_history/batch: retry dengan key yang sama ditolak sebagai duplikat.
+        # Partial agar riwayat lama tanpa key tidak bentrok satu sama lain.
+        Index('stretch_history', [('user_id', ASCENDING), ('idempotency_key', ASCENDING)],
+              'user_id_idempotency_key_unique', unique=True,
+              partialFilterExpression={'idempotency_key': {'$exists': True}}),
+    ]),
+    Migration(4, 'Outbox email OTP', [
+        # mailer._claim: email pending yang jatuh tempo dan klaim yang basi
+        Index('mail_outbox', [('status', ASCENDING), ('next_attempt_at', ASCENDING)], 'status_next_attempt_at'),
+        Index('mail_outbox', [('status', ASCENDING), ('claimed_until', ASCENDING)], 'status_claimed_until'),
+    ]),
+    Migration(5, 'Hapus outbox email lama', [
+        # Body OTP sudah di-$unset di status akhir; sisa dokumen (status, attempts,
+        # last_error) disimpan 7 hari untuk investigasi lalu dihapus MongoDB
+        Index('mail_outbox', [('created_at', ASCENDING)], 'created_at_ttl', expireAfterSeconds=7 * 24 * 3600),
+    ]),
+]
+
+_SAMPLE_ID = ObjectId()
+_SAMPLE_TIME = datetime(2000, 1, 1)
+
+QUERY_SHAPES = [
+    QueryShape('users by email', 'users', {'email': 'probe@example.com'}),
+    # Endpoint riwayat memakai keyset pagination (lihat pagination.find_page)
+    QueryShape('stretch history by user', 'stretch_history', {'user_id': _SAMPLE_ID},
+               [('timestamp', DESCENDING), ('_id', DESCENDING)]),
+    QueryShape('login history by user', 'login_history', {'user_id': str(_SAMPLE_ID)},
+               [('timestamp', DESCENDING), ('_id', DESCENDING)]),
+    QueryShape('epds history by user', 'epds_records', {'userId': str(_SAMPLE_ID)},
+               [('date', DESCENDING), ('_id', DESCENDING)]),
+    QueryShape('articles list', 'articles', {}, [('published_date', DESCENDING), ('_id', DESCENDING)]),
+    QueryShape('stretching by program', 'stretching', {'program': 'probe'}),
+    QueryShape('movement by stretching', 'movement', {'stretching': 'probe'}),
+    QueryShape('visualization top movements', 'visualization_rollups', {'metric': 'stretch_by_movement'},
+               [('count', DESCENDING)]),
+    QueryShape('visualization daily', 'visualization_rollups', {'metric': 'stretch_by_day'},
+               [('key', DESCENDING)]),
+    QueryShape('mail outbox due', 'mail_outbox',
+               {'status': 'pending', 'next_attempt_at': {'$lte': _SAMPLE_TIME}}),
+    QueryShape('mail outbox stale claims', 'mail_outbox',
+               {'status': 'sending', 'claimed_until': {'$lt': _SAMPLE_TIME}}),
+]
+
+
+def applied_versions(db):
+    return {doc['_id'] for doc in db[MIGRATIONS_COLLECTION].find({}, {'_id': 1})}
+
+
+def apply_migrations(db):
+    """Terapkan migrasi yang belum tercatat, return daftar versi yang diterapkan."""
+    done = applied_versions(db)
+    applied = []
+    for migration in sorted(MIGRATIONS, key=lambda m: m.version):
+        if migration.version in done:
+            continue
+        logger.info("Applying migration %s: %s", migration.version, migration.description)
+        for index in migration.indexes:
+            try:
+                db[index.collection].create_index(index.keys, name=index.name, **index.options)
+            except OperationFailure as e:
+                # Mis. data duplikat saat membuat index unique: harus dibereskan manual
+                raise RuntimeError(
+                    f"Migration {migration.version} gagal membuat index {index.collection}.{index.name}: {e}"
+                ) from e
+            logger.info("Index ready: %s.%s", index.collection, index.name)
+        db[MIGRATIONS_COLLECTION].update_one(
+            {'_id': migration.version},
+            {'$set': {'description': migration.description, 'applied_at': datetime.utcnow()}},
+            upsert=True,
+        )
+        applied.append(migration.version)
+    return applied
+
+
+def _plan_stages(plan):
+    """Semua nama stage di dalam plan explain (rekursif)."""
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            yield plan['stage']
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from _plan_stages(value)
+
+
+def verify_query_shapes(db):
+    """Return daftar (nama query, stages) yang jatuh ke COLLSCAN."""
+    failures = []
+    for shape in QUERY_SHAPES:
+        cursor = db[shape.collection].find(shape.filter)
+        if shape.sort:
+            cursor = cursor.sort(shape.sort)
+        explain = cursor.explain()
+        winning_plan = explain.get('queryPlanner', {}).get('winningPlan', {})
+        stages = list(_plan_stages(winning_plan))
+        if 'COLLSCAN' in stages:
+            failures.append((shape.name, stages))
+            logger.error("COLLSCAN: %s (%s) -> %s", shape.name, shape.collection, stages)
+        else:
+            logger.info("Index OK: %s -> %s", shape.name, stages)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=('migrate', 'verify', 'status'))
+    parser.add_argument('--verify', action='store_true', help="Setelah migrate, jalankan verify")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s %(message)s')
+    from db import db
+
+    if args.command == 'status':
+        done = applied_versions(db)
+        for migration in MIGRATIONS:
+            mark = 'x' if migration.version in done else ' '
+            print(f"[{mark}] {migration.version}: {migration.description}")
+        return
+
+    if args.command == 'migrate':
+        applied = apply_migrations(db)
+        logger.info("Applied migrations: %s", applied or 'none (up to date)')
+
+    if args.command == 'verify' or args.verify:
+        failures = verify_query_shapes(db)
+        if failures:
+            logger.error("%s query shape(s) tidak memakai index", len(failures))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+import base64
+import os
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+# Jumlah item default dan maksimal per halaman untuk endpoint riwayat
+DEFAULT_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.getenv("HISTORY_MAX_PAGE_SIZE", "200"))
+
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def encode_cursor(value, doc_id):
+    """Cursor opaque dari (datetime, _id) item terakhir di halaman."""
+    millis = (value - _EPOCH) // timedelta(milliseconds=1)
+    raw = f'{millis}:{doc_id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Kebalikan encode_cursor; ValueError jika cursor rusak."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        millis, doc_id = base64.urlsafe_b64decode(padded).decode().split(':')
+        return _EPOCH + timedelta(milliseconds=int(millis)), ObjectId(doc_id)
+    except (ValueError, InvalidId, UnicodeDecodeError) as e:
+        raise ValueError('Cursor tidak valid') from e
+
+
+def parse_page_args(args):
+    """Ambil (limit, cursor) dari query string; ValueError jika tidak valid."""
+    limit = args.get('limit', DEFAULT_PAGE_SIZE)
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError) as e:
+        raise ValueError('Parameter limit harus berupa angka') from e
+    if limit < 1:
+        raise ValueError('Parameter limit minimal 1')
+    limit = min(limit, MAX_PAGE_SIZE)
+
+    cursor = args.get('cursor')
+    return limit, decode_cursor(cursor) if cursor else None
+
+
+def _page_query(query, field, cursor, direction):
+    if cursor is None:
+        return query
+    value, doc_id = cursor
+    op = '$lt' if direction < 0 else '$gt'
+    return {**query, '$or': [
+        {field: {op: value}},
+        {field: value, '_id': {op: doc_id}},
+    ]}
+
+
+def _split_page(docs, field, limit):
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        next_cursor = encode_cursor(last[field], last['_id'])
+    return docs, next_cursor
+
+
+def find_page(collection, query, field, projection, limit, cursor=None, direction=-1):
+    """Keyset pagination pada (field, _id).
+
+    Halaman berikutnya dimulai tepat setelah (field, _id) item terakhir, jadi
+    biaya query tidak bergantung pada berapa banyak halaman sebelumnya dan
+    dilayani index (filter, field, _id) dari migrations.py. Return
+    (docs, next_cursor); next_cursor None jika sudah halaman terakhir.
+    """
+    # Ambil satu item ekstra untuk tahu apakah masih ada halaman berikutnya
+    docs = list(
+        collection.find(_page_query(query, field, cursor, direction), {**projection, field: 1})
+        .sort([(field, direction), ('_id', direction)])
+        .limit(limit + 1)
+    )
+    return _split_page(docs, field, limit)
+
+
+async def find_page_async(collection, query, field, projection, limit, cursor=None, direction=-1):
+    """find_page untuk collection AsyncMongoClient (mode ASGI)."""
+    docs = await (
+        collection.find(_page_query(query, field, cursor, direction), {**projection, field: 1})
+        .sort([(field, direction), ('_id', direction)])
+        .limit(limit + 1)
+        .to_list()
+    )
+    return _split_page(docs, field, limit)
+
+
+def with_next_cursor(response, next_cursor):
+    """Tambahkan header X-Next-Cursor; body tetap array agar client lama tidak rusak."""
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return response
@@ -0,0 +1,125 @@
+"""Hashing dan verifikasi password lewat executor terbatas.
+
+scrypt/pbkdf2 sengaja mahal. Kalau dijalankan langsung di thread request, lonjakan
+login bisa menghabiskan semua worker dan request katalog yang murah ikut antri.
+Di sini jumlah job yang jalan bersamaan dibatasi PASSWORD_HASH_WORKERS, dan antrian
+dibatasi PASSWORD_HASH_QUEUE_SIZE. Job di luar batas itu langsung ditolak
+(`PasswordHasherBusy`, dijawab 503 oleh route) supaya tidak menahan thread.
+hashlib melepas GIL selama KDF berjalan, jadi thread pool cukup.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import metrics
+from utils import hash_password, password_needs_rehash, verify_password
+
+logger = logging.getLogger(__name__)
+
+WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+# Job yang boleh menunggu di luar yang sedang dikerjakan
+QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", "32"))
+# Batas tunggu request untuk hasil hashing (detik)
+TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "5"))
+RETRY_AFTER_SECONDS = 1
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    def __init__(self, workers=WORKERS, queue_size=QUEUE_SIZE, timeout=TIMEOUT):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self._pid = None
+        self._executor = None
+        self._slots = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        # Thread executor tidak ikut ter-fork: setiap worker gunicorn membuat sendiri
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+            self._slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+            self._pid = os.getpid()
+
+    def _submit(self, operation, fn, *args):
+        self._ensure_started()
+        if not self._slots.acquire(blocking=False):
+            metrics.PASSWORD_HASH_REJECTED.labels(operation=operation, reason='full').inc()
+            raise PasswordHasherBusy("Executor hashing password penuh")
+        metrics.PASSWORD_HASH_PENDING.inc()
+        submitted = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            metrics.PASSWORD_HASH_QUEUE_TIME.labels(operation=operation).observe(started - submitted)
+            try:
+                return fn(*args)
+            finally:
+                metrics.PASSWORD_HASH_DURATION.labels(operation=operation).observe(time.perf_counter() - started)
+                metrics.PASSWORD_HASH_PENDING.dec()
+                self._slots.release()
+
+        return self._executor.submit(job)
+
+    def _timed_out(self, operation):
+        # Job tetap selesai di background dan melepas slot-nya sendiri
+        metrics.PASSWORD_HASH_REJECTED.labels(operation=operation, reason='timeout').inc()
+        return PasswordHasherBusy("Hashing password melewati batas waktu")
+
+    def _run(self, operation, fn, *args):
+        future = self._submit(operation, fn, *args)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise self._timed_out(operation)
+
+    async def _run_async(self, operation, fn, *args):
+        future = self._submit(operation, fn, *args)
+        try:
+            # shield: request yang dibatalkan tidak membatalkan job yang sudah memegang slot
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), self.timeout)
+        except asyncio.TimeoutError:
+            raise self._timed_out(operation)
+
+    def hash(self, password):
+        return self._run('hash', hash_password, password)
+
+    def verify(self, stored_hash, password):
+        """Return (cocok, hash_baru). hash_baru diisi jika parameter hash tersimpan sudah usang."""
+        return self._run('verify', _verify_and_upgrade, stored_hash, password)
+
+    async def hash_async(self, password):
+        return await self._run_async('hash', hash_password, password)
+
+    async def verify_async(self, stored_hash, password):
+        return await self._run_async('verify', _verify_and_upgrade, stored_hash, password)
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'queue_size': self.queue_size,
+            'timeout_seconds': self.timeout,
+        }
+
+
+def _verify_and_upgrade(stored_hash, password):
+    if not verify_password(stored_hash, password):
+        return False, None
+    if password_needs_rehash(stored_hash):
+        # Password asli hanya tersedia saat login, jadi upgrade dilakukan di sini
+        return True, hash_password(password)
+    return True, None
+
+
+password_hasher = PasswordHasher()
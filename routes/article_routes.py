@@ -1,59 +1,89 @@
 from flask import Blueprint, request, jsonify
 from db import articles_collection, visualization_collection
 from middleware import require_api_key
+from catalog_cache import cached, catalog_cache
+from http_cache import NO_STORE, conditional_json
+from visualization import LEGACY_SUMMARY_ID, SUMMARY_ID, legacy_headers, legacy_summary_active
 from bson import ObjectId
-import traceback
+import logging
 
 article_bp = Blueprint('article', __name__)
+logger = logging.getLogger(__name__)
+
+# Projection dan query di bawah dipakai juga oleh asgi_routes/article_routes.py
+
+# Ambil hanya kolom untuk list, exclude content
+ARTICLE_LIST_PROJECTION = {
+    '_id': 1,  # Include _id untuk reference
+    'title': 1,
+    'image_url': 1,
+    'month_year': 1,
+    'published_date': 1
+}
+
+# Ambil semua kolom kecuali _id
+ARTICLE_DETAIL_PROJECTION = {
+    '_id': 0,
+    'title': 1,
+    'content': 1,
+    'image_url': 1,
+    'month_year': 1
+}
+
+def find_articles(collection, limit):
+    """Cursor daftar artikel (collection sync atau async, builder cursor-nya sama)."""
+    query = collection.find({}, ARTICLE_LIST_PROJECTION)
+
+    # Sort berdasarkan published_date descending (artikel terbaru = published_date terbaru)
+    # Fallback ke _id jika published_date sama atau tidak ada
+    query = query.sort([('published_date', -1), ('_id', -1)])
+
+    # Apply limit jika ada
+    if limit:
+        query = query.limit(limit)
+    return query
+
+def format_articles(articles):
+    # Convert ObjectId to string
+    for article in articles:
+        article['_id'] = str(article['_id'])
+    return articles
+
+def visualization_sources():
+    """(id dokumen, header) yang dicoba /api/visualization secara berurutan.
+
+    Format lama selama dokumen 'summary' masih ditulis (sampai LEGACY_SUNSET),
+    selain itu ringkasan milik backend yang sama dengan /api/v2/visualization.
+    """
+    if legacy_summary_active():
+        yield LEGACY_SUMMARY_ID, legacy_headers()
+    yield SUMMARY_ID, {}
 
 # Endpoint untuk daftar artikel (tanpa content)
 @article_bp.route('/articles', methods=['GET'])
 @require_api_key
 def get_articles():
     try:
-        print("Processing articles list request...")
+        logger.debug("Processing articles list request...")
 
         # Parameter untuk limit
         limit = request.args.get('limit', default=None, type=int)
         
-        # Ambil hanya kolom untuk list, exclude content
-        projection = {
-            '_id': 1,  # Include _id untuk reference
-            'title': 1,
-            'image_url': 1,
-            'month_year': 1,
-            'published_date': 1
-        }
-        
-        # Query dengan sorting berdasarkan _id descending (terbaru dulu)
-        # Jika ada field created_at, gunakan itu. Jika tidak, _id sudah cukup karena ObjectId berisi timestamp
-        query = articles_collection.find({}, projection)
-        
-        # Sort berdasarkan published_date descending (artikel terbaru = published_date terbaru)
-        # Fallback ke _id jika published_date sama atau tidak ada
-        query = query.sort([('published_date', -1), ('_id', -1)])
-        
-        # Apply limit jika ada
-        if limit:
-            query = query.limit(limit)
-            
-        articles = list(query)
-        print(f"Found {len(articles)} articles")
+        def load_articles():
+            return format_articles(list(find_articles(articles_collection, limit)))
+
+        articles, etag = cached('articles', 'articles', limit, load_articles)
+        logger.debug("Found %s articles", len(articles))
         
         if not articles:
-            print("No articles found in database")
+            logger.debug("No articles found in database")
             return jsonify({'message': 'Tidak ada artikel ditemukan'}), 404
         
-        # Convert ObjectId to string
-        for article in articles:
-            article['_id'] = str(article['_id'])
-        
-        print("Articles list request successful")
-        return jsonify(articles), 200
+        logger.debug("Articles list request successful")
+        return conditional_json(articles, etag)
         
     except Exception as e:
-        print(f"Articles error: {e}")
-        traceback.print_exc()
+        logger.exception("Articles error: %s", e)
         return jsonify({'message': 'Terjadi kesalahan server'}), 500
 
 # Endpoint untuk detail artikel berdasarkan ID
@@ -61,34 +91,27 @@ def get_articles():
 @require_api_key
 def get_article_detail(article_id):
     try:
-        print(f"Processing article detail request for ID: {article_id}")
+        logger.debug("Processing article detail request for ID: %s", article_id)
         
         # Validasi ObjectId
         if not ObjectId.is_valid(article_id):
-            print("ERROR: Invalid article ID format")
+            logger.warning("Invalid article ID format")
             return jsonify({'message': 'ID artikel tidak valid'}), 400
         
-        # Ambil semua kolom kecuali _id
-        projection = {
-            '_id': 0,
-            'title': 1,
-            'content': 1,
-            'image_url': 1,
-            'month_year': 1
-        }
-        
-        article = articles_collection.find_one({'_id': ObjectId(article_id)}, projection)
+        article, etag = cached(
+            'articles', 'article_detail', article_id,
+            lambda: articles_collection.find_one({'_id': ObjectId(article_id)}, ARTICLE_DETAIL_PROJECTION),
+        )
         
         if not article:
-            print(f"ERROR: Article not found for ID: {article_id}")
+            logger.warning("Article not found for ID: %s", article_id)
             return jsonify({'message': 'Artikel tidak ditemukan'}), 404
         
-        print("Article detail request successful")
-        return jsonify(article), 200
+        logger.debug("Article detail request successful")
+        return conditional_json(article, etag)
         
     except Exception as e:
-        print(f"Article detail error: {e}")
-        traceback.print_exc()
+        logger.exception("Article detail error: %s", e)
         return jsonify({'message': 'Terjadi kesalahan server'}), 500
     
 
@@ -97,12 +120,47 @@ def get_article_detail(article_id):
 @require_api_key
 def get_visualization_data():
     try:
-        summary = visualization_collection.find_one({"_id": "summary"}, {"_id": 0})
-        
+        summary, etag, headers = None, None, {}
+        for summary_id, headers in visualization_sources():
+            summary, etag = cached(
+                'visualization', 'visualization', summary_id,
+                lambda: visualization_collection.find_one({"_id": summary_id}, {"_id": 0}),
+            )
+            if summary:
+                break
+
         if not summary:
             return jsonify({"message": "No summary found"}), 404
-        
-        print(summary["data"])
-        return jsonify(summary["data"])
+
+        response = conditional_json(summary["data"], etag)
+        response.headers.update(headers)
+        return response
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        logger.exception("Visualization error: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+
+# Ringkasan yang dikelola backend (visualization.py)
+@article_bp.route("/api/v2/visualization", methods=["GET"])
+@require_api_key
+def get_visualization_summary():
+    try:
+        summary, etag = cached(
+            'visualization', 'visualization', SUMMARY_ID,
+            lambda: visualization_collection.find_one({"_id": SUMMARY_ID}, {"_id": 0}),
+        )
+
+        if not summary:
+            return jsonify({"message": "No summary found"}), 404
+
+        return conditional_json(summary["data"], etag)
+    except Exception as e:
+        logger.exception("Visualization error: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+
+@article_bp.route('/api/catalog/stats', methods=['GET'])
+@require_api_key
+def get_catalog_cache_stats():
+    # Hit ratio dan perkiraan memori cache katalog di worker ini (berbeda per worker, jangan di-cache)
+    return jsonify(catalog_cache.stats()), 200, {'Cache-Control': NO_STORE}
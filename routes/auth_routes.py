@@ -1,9 +1,15 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, g
 from db import users_collection, history_collection
-from utils import hash_password, verify_password, generate_token, send_otp_email, generate_otp, verify_token
-from middleware import require_api_key
-from firebase_admin import auth as firebase_auth
-import traceback
+from utils import generate_token, generate_otp
+from passwords import PasswordHasherBusy, RETRY_AFTER_SECONDS, password_hasher
+from middleware import require_api_key, require_user
+from pagination import find_page, parse_page_args, with_next_cursor
+from http_cache import PRIVATE_CACHE_CONTROL, conditional
+from write_behind import login_history_writer
+import firebase_verifier
+from firebase_verifier import ExpiredFirebaseToken, FirebaseTokenTooEarly, InvalidFirebaseToken
+import mailer
+import logging
 from datetime import datetime, timedelta
 from pytz import timezone
 import pytz
@@ -11,51 +17,216 @@ from bson import ObjectId
 
 
 auth_bp = Blueprint('auth', __name__)
+logger = logging.getLogger(__name__)
+
+# Zona waktu tampilan riwayat login
+WIB = timezone('Asia/Jakarta')
+OTP_VALID_MINUTES = 10
+
+# Validasi dan dokumen untuk register/login. Fungsi di bawah tidak melakukan I/O,
+# jadi dipakai juga oleh route async di asgi_routes/auth_routes.py.
+# Error dikembalikan sebagai (payload, status), seperti keypoints_from_json.
+
+def parse_register(data):
+    """Body /register -> ((email, password, nama), None) atau (None, error)."""
+    if not data:
+        logger.warning("No JSON data received")
+        return None, ({'message': 'Data tidak valid'}, 400)
+
+    email = data.get('email')
+    password = data.get('password')
+    nama = data.get('nama')
+
+    if not all([email, password, nama]):
+        logger.warning("Missing required fields")
+        return None, ({'message': 'Semua field harus diisi'}, 400)
+    return (email, password, nama), None
+
+def new_user(email, hashed, nama):
+    """Dokumen user baru dan record email OTP-nya untuk outbox."""
+    otp_code = generate_otp()
+    otp_expired = datetime.utcnow() + timedelta(minutes=OTP_VALID_MINUTES)
+    user = {
+        'email': email,
+        'password': hashed,
+        'nama': nama,
+        'program': '',
+        'is_verified': False,
+        'otp_code': otp_code,
+        'otp_expired': otp_expired
+    }
+    return user, mailer.otp_email_record(email, otp_code, otp_expired)
+
+def check_otp(user, otp):
+    """Error (payload, status) jika OTP tidak bisa dipakai untuk user ini, selain itu None."""
+    if not user:
+        return {'message': 'Email tidak ditemukan'}, 404
+
+    if user.get('is_verified'):
+        return {'message': 'Akun sudah terverifikasi'}, 400
+
+    if user.get('otp_code') != otp:
+        return {'message': 'Kode OTP salah'}, 400
+
+    if datetime.utcnow() > user.get('otp_expired'):
+        return {'message': 'Kode OTP sudah kedaluwarsa'}, 400
+    return None
+
+VERIFIED_UPDATE = {
+    '$set': {'is_verified': True},
+    '$unset': {'otp_code': "", 'otp_expired': ""}
+}
+
+def parse_login(data):
+    """Body /login -> ((email, password, device), None) atau (None, error)."""
+    if not data:
+        logger.warning("No JSON data received")
+        return None, ({'message': 'Data tidak valid'}, 400)
+
+    email = data.get('email')
+    password = data.get('password')
+    device_info = data.get('device', 'Unknown Device')
+
+    if not email or not password:
+        logger.warning("Missing email or password")
+        return None, ({'message': 'Email dan password harus diisi'}, 400)
+    return (email, password, device_info), None
+
+def check_login_user(user, email):
+    """Error (payload, status) jika akun ini tidak boleh login, selain itu None."""
+    if not user:
+        logger.warning("Email not found: %s", email)
+        return {'message': 'Email tidak ditemukan'}, 404
+
+    if not user.get('is_verified'):
+        return {'message': 'Email belum diverifikasi'}, 403
+    return None
+
+def password_upgrade(user, upgraded_hash):
+    """(filter, update) untuk menyimpan hash dengan parameter baru.
+
+    Filter hash lama mencegah menimpa password yang baru saja diganti di request lain.
+    """
+    return {'_id': user['_id'], 'password': user['password']}, {'$set': {'password': upgraded_hash}}
+
+def login_record(user, device_info, remote_addr):
+    """Dokumen riwayat login (ditulis batch di background oleh login_history_writer)."""
+    return {
+        'user_id': str(user['_id']),
+        'timestamp': datetime.utcnow(),
+        'device': device_info,
+        'ip': remote_addr,
+    }
+
+def parse_oauth(data, is_json):
+    """Body /login_oauth -> ((firebase_token, device), None) atau (None, error)."""
+    # Validate content type
+    if not is_json:
+        logger.warning("Request is not JSON")
+        return None, ({'message': 'Content-Type harus application/json'}, 400)
+
+    if not data:
+        logger.warning("No JSON data received")
+        return None, ({'message': 'Data tidak valid'}, 400)
+
+    device_info = data.get('device', 'Unknown Device')
+    firebase_token = data.get('firebase_token')
+    if not firebase_token:
+        logger.warning("No firebase_token in request")
+        return None, ({'message': 'Firebase token diperlukan'}, 400)
+
+    logger.debug("Received firebase token (length: %s)", len(firebase_token))
+    return (firebase_token, device_info), None
+
+def verify_firebase_token(firebase_token):
+    """Verifikasi token Firebase; return (decoded, None) atau (None, error).
+
+    Bisa menunggu refresh sertifikat Google, jadi route async menjalankannya di thread.
+    """
+    try:
+        logger.debug("Verifying Firebase token...")
+        decoded = firebase_verifier.verifier.verify(firebase_token)
+        logger.info("Firebase token verified successfully for UID: %s", decoded.get('uid'))
+        logger.debug("Token contains email: %s", decoded.get('email'))
+    except FirebaseTokenTooEarly as e:
+        # Handle specific clock skew errors
+        logger.info("Clock skew detected (%s), retrying with more tolerance...", e)
+        try:
+            # Retry with more generous clock skew tolerance
+            decoded = firebase_verifier.verifier.verify(firebase_token, 300)
+            logger.info("Token verified successfully with clock skew tolerance")
+        except Exception as retry_e:
+            logger.warning("Retry failed: %s", retry_e)
+            return None, ({'message': 'Sinkronisasi waktu bermasalah. Coba lagi dalam beberapa detik.'}, 401)
+    except ExpiredFirebaseToken as e:
+        logger.warning("Expired Firebase token: %s", e)
+        return None, ({'message': 'Token Firebase sudah kadaluarsa'}, 401)
+    except InvalidFirebaseToken as e:
+        logger.warning("Invalid Firebase token: %s", e)
+        return None, ({'message': 'Token Firebase tidak valid'}, 401)
+    except Exception as e:
+        logger.exception("Firebase token verification error: %s", e)
+        return None, ({'message': 'Gagal memverifikasi token Firebase'}, 401)
+    return decoded, None
+
+def oauth_identity(decoded):
+    """(email, name, firebase_uid) dari token Firebase, atau (None, error) tanpa email."""
+    email = decoded.get('email')
+    name = decoded.get('name', decoded.get('email', 'Pengguna Google'))
+    firebase_uid = decoded.get('uid')
+
+    if not email:
+        logger.warning("No email in Firebase token")
+        return None, ({'message': 'Email tidak ditemukan dalam token'}, 400)
+    logger.debug("Processing OAuth login for email: %s", email)
+    return (email, name, firebase_uid), None
+
+def new_oauth_user(email, name, firebase_uid):
+    return {
+        'email': email,
+        'nama': name,
+        'program': '',
+        'provider': 'google',
+        'firebase_uid': firebase_uid
+    }
+
+def _busy_response():
+    response = jsonify({'message': 'Server sedang sibuk, coba lagi sebentar lagi'})
+    response.headers['Retry-After'] = str(RETRY_AFTER_SECONDS)
+    return response, 503
+
+def _error(error):
+    payload, status = error
+    return jsonify(payload), status
 
 @auth_bp.route('/register', methods=['POST'])
 @require_api_key
 def register():
     try:
-        print("Processing registration request...")
-        data = request.get_json()
-        if not data:
-            print("ERROR: No JSON data received")
-            return jsonify({'message': 'Data tidak valid'}), 400
-            
-        email = data.get('email')
-        password = data.get('password')
-        nama = data.get('nama')
-
-        if not all([email, password, nama]):
-            print("ERROR: Missing required fields")
-            return jsonify({'message': 'Semua field harus diisi'}), 400
+        logger.debug("Processing registration request...")
+        fields, error = parse_register(request.get_json())
+        if error:
+            return _error(error)
+        email, password, nama = fields
 
         if users_collection.find_one({'email': email}):
-            print(f"ERROR: Email already exists: {email}")
+            logger.warning("Email already exists: %s", email)
             return jsonify({'message': 'Email sudah terdaftar'}), 400
 
-        hashed = hash_password(password)
-        otp_code = generate_otp()
-        otp_expired = datetime.utcnow() + timedelta(minutes=10)
-
-        user = {
-            'email': email,
-            'password': hashed,
-            'nama': nama,
-            'program': '',
-            'is_verified': False,
-            'otp_code': otp_code,
-            'otp_expired': otp_expired
-        }
-
+        user, otp_email = new_user(email, password_hasher.hash(password), nama)
         users_collection.insert_one(user)
-        send_otp_email(email, otp_code)
+        # Email dikirim dispatcher di background; cukup tulis ke outbox
+        mailer.outbox_collection.insert_one(otp_email)
+        mailer.notify_dispatcher()
 
-        print(f"User registered successfully: {email}")
+        logger.info("User registered successfully: %s", email)
         return jsonify({'message': 'Kode OTP telah dikirim ke email'}), 201
-        
+
+    except PasswordHasherBusy as e:
+        logger.warning("Register rejected: %s", e)
+        return _busy_response()
     except Exception as e:
-        print(f"❌ Error saat register: {e}")
+        logger.exception("❌ Error saat register: %s", e)
         return jsonify({'message': 'Terjadi kesalahan di server'}), 500
 
 @auth_bp.route('/verify-otp', methods=['POST'])
@@ -63,25 +234,13 @@ def register():
 def verify_otp():
     data = request.get_json()
     email = data.get('email')
-    otp = data.get('otp')
 
     user = users_collection.find_one({'email': email})
-    if not user:
-        return jsonify({'message': 'Email tidak ditemukan'}), 404
+    error = check_otp(user, data.get('otp'))
+    if error:
+        return _error(error)
 
-    if user.get('is_verified'):
-        return jsonify({'message': 'Akun sudah terverifikasi'}), 400
-
-    if user.get('otp_code') != otp:
-        return jsonify({'message': 'Kode OTP salah'}), 400
-
-    if datetime.utcnow() > user.get('otp_expired'):
-        return jsonify({'message': 'Kode OTP sudah kedaluwarsa'}), 400
-
-    users_collection.update_one({'email': email}, {
-        '$set': {'is_verified': True},
-        '$unset': {'otp_code': "", 'otp_expired': ""}
-    })
+    users_collection.update_one({'email': email}, VERIFIED_UPDATE)
 
     return jsonify({'message': 'Verifikasi berhasil'}), 200
 
@@ -89,55 +248,72 @@ def verify_otp():
 @require_api_key
 def login():
     try:
-        print("Processing login request...")
-        data = request.get_json()
-        if not data:
-            print("ERROR: No JSON data received")
-            return jsonify({'message': 'Data tidak valid'}), 400
-            
-        email = data.get('email')
-        password = data.get('password')
-        device_info = data.get('device', 'Unknown Device')
-
-        if not email or not password:
-            print("ERROR: Missing email or password")
-            return jsonify({'message': 'Email dan password harus diisi'}), 400
+        logger.debug("Processing login request...")
+        fields, error = parse_login(request.get_json())
+        if error:
+            return _error(error)
+        email, password, device_info = fields
 
         user = users_collection.find_one({'email': email})
-        if not user:
-            print(f"ERROR: Email not found: {email}")
-            return jsonify({'message': 'Email tidak ditemukan'}), 404
-        
-        if not user.get('is_verified'):
-            return jsonify({'message': 'Email belum diverifikasi'}), 403
+        error = check_login_user(user, email)
+        if error:
+            return _error(error)
 
-        if not verify_password(user['password'], password):
-            print(f"ERROR: Wrong password for: {email}")
+        matched, upgraded_hash = password_hasher.verify(user['password'], password)
+        if not matched:
+            logger.warning("Wrong password for: %s", email)
             return jsonify({'message': 'Password salah'}), 401
 
+        if upgraded_hash:
+            users_collection.update_one(*password_upgrade(user, upgraded_hash))
+            logger.info("Password hash upgraded for %s", email)
+
         token = generate_token(user['_id'])
-        print(f"Login successful for {email}, token: {token[:20]}...")
-
-        # Simpan riwayat login
-        history_collection.insert_one({
-            'user_id': str(user['_id']),
-            'timestamp': datetime.utcnow(),
-            'device': device_info,
-            'ip': request.remote_addr,
-        })
+        logger.info("Login successful for %s", email)
+
+        # Simpan riwayat login (ditulis batch di background)
+        login_history_writer.submit(login_record(user, device_info, request.remote_addr))
 
         return jsonify({'token': token, 'nama': user['nama']}), 200
+    except PasswordHasherBusy as e:
+        logger.warning("Login rejected: %s", e)
+        return _busy_response()
     except Exception as e:
-        print(f"Login error: {e}")
-        traceback.print_exc()
+        logger.exception("Login error: %s", e)
         return jsonify({'message': 'Terjadi kesalahan server'}), 500
 
+def find_or_create_oauth_user(email, name, firebase_uid):
+    user = None
+    cached_user_id = firebase_verifier.uid_cache.get(firebase_uid)
+    if cached_user_id is not None:
+        # Login ulang: cukup satu lookup lewat _id
+        user = users_collection.find_one({'_id': cached_user_id}, {'nama': 1})
+        if not user:
+            # Akun sudah dihapus; lanjut ke jalur email di bawah
+            firebase_verifier.uid_cache.discard(firebase_uid)
+    from_cache = user is not None
+    if not user:
+        user = users_collection.find_one({'email': email})
+    if not user:
+        logger.info("Creating new user for %s", email)
+        result = users_collection.insert_one(new_oauth_user(email, name, firebase_uid))
+        user = users_collection.find_one({'_id': result.inserted_id})
+        logger.info("New user created with ID: %s", result.inserted_id)
+    elif not from_cache:
+        logger.info("Existing user found: %s", email)
+        # Update firebase_uid if not present
+        if 'firebase_uid' not in user:
+            users_collection.update_one({'_id': user['_id']}, {'$set': {'firebase_uid': firebase_uid}})
+            logger.info("Updated user with Firebase UID")
+    firebase_verifier.uid_cache.put(firebase_uid, user['_id'])
+    return user
+
 @auth_bp.route('/login_oauth', methods=['POST', 'OPTIONS'])
 @require_api_key
 def login_oauth():
     # Handle preflight OPTIONS request
     if request.method == 'OPTIONS':
-        print("Handling OPTIONS preflight request")
+        logger.debug("Handling OPTIONS preflight request")
         response = jsonify({'status': 'OK'})
         response.headers.add('Access-Control-Allow-Origin', '*')
         response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,x-api-key')
@@ -145,167 +321,85 @@ def login_oauth():
         return response
     
     try:
-        print("=== Processing OAuth login request ===")
-        
-        # Validate content type
-        if not request.is_json:
-            print("ERROR: Request is not JSON")
-            return jsonify({'message': 'Content-Type harus application/json'}), 400
-        
-        data = request.get_json()
-        
-        if not data:
-            print("ERROR: No JSON data received")
-            return jsonify({'message': 'Data tidak valid'}), 400
-        
-        device_info = data.get('device', 'Unknown Device')
-        firebase_token = data.get('firebase_token')
-        if not firebase_token:
-            print("ERROR: No firebase_token in request")
-            return jsonify({'message': 'Firebase token diperlukan'}), 400
-
-        print(f"Received firebase token (length: {len(firebase_token)})")
-
-        # Verify Firebase token
-        try:
-            print("Verifying Firebase token...")
-            decoded = firebase_auth.verify_id_token(firebase_token, check_revoked=False, clock_skew_seconds=60)
-            print(f"Firebase token verified successfully for UID: {decoded.get('uid')}")
-            print(f"Token contains email: {decoded.get('email')}")
-        except firebase_auth.InvalidIdTokenError as e:
-            error_msg = str(e)
-            print(f"ERROR: Invalid Firebase token: {error_msg}")
-            
-            # Handle specific clock skew errors
-            if "used too early" in error_msg or "clock" in error_msg.lower():
-                print("Clock skew detected, retrying with more tolerance...")
-                try:
-                    # Retry with more generous clock skew tolerance
-                    decoded = firebase_auth.verify_id_token(firebase_token, check_revoked=False, clock_skew_seconds=300)
-                    print("Token verified successfully with clock skew tolerance")
-                except Exception as retry_e:
-                    print(f"Retry failed: {retry_e}")
-                    return jsonify({'message': 'Sinkronisasi waktu bermasalah. Coba lagi dalam beberapa detik.'}), 401
-            else:
-                return jsonify({'message': 'Token Firebase tidak valid'}), 401
-        except firebase_auth.ExpiredIdTokenError as e:
-            print(f"ERROR: Expired Firebase token: {e}")
-            return jsonify({'message': 'Token Firebase sudah kadaluarsa'}), 401
-        except Exception as e:
-            print(f"ERROR: Firebase token verification error: {e}")
-            traceback.print_exc()
-            return jsonify({'message': 'Gagal memverifikasi token Firebase'}), 401
-
-        email = decoded.get('email')
-        name = decoded.get('name', decoded.get('email', 'Pengguna Google'))
-        firebase_uid = decoded.get('uid')
+        logger.debug("=== Processing OAuth login request ===")
+        fields, error = parse_oauth(request.get_json() if request.is_json else None, request.is_json)
+        if error:
+            return _error(error)
+        firebase_token, device_info = fields
 
-        if not email:
-            print("ERROR: No email in Firebase token")
-            return jsonify({'message': 'Email tidak ditemukan dalam token'}), 400
+        decoded, error = verify_firebase_token(firebase_token)
+        if error:
+            return _error(error)
 
-        print(f"Processing OAuth login for email: {email}")
+        identity, error = oauth_identity(decoded)
+        if error:
+            return _error(error)
+        email = identity[0]
 
         # Find or create user
         try:
-            user = users_collection.find_one({'email': email})
-            if not user:
-                print(f"Creating new user for {email}")
-                user_data = {
-                    'email': email,
-                    'nama': name,
-                    'program': '',
-                    'provider': 'google',
-                    'firebase_uid': firebase_uid
-                }
-                result = users_collection.insert_one(user_data)
-                user = users_collection.find_one({'_id': result.inserted_id})
-                print(f"New user created with ID: {result.inserted_id}")
-            else:
-                print(f"Existing user found: {email}")
-                # Update firebase_uid if not present
-                if 'firebase_uid' not in user:
-                    users_collection.update_one(
-                        {'_id': user['_id']},
-                        {'$set': {'firebase_uid': firebase_uid}}
-                    )
-                    print("Updated user with Firebase UID")
+            user = find_or_create_oauth_user(*identity)
         except Exception as e:
-            print(f"ERROR: Database operation failed: {e}")
-            traceback.print_exc()
+            logger.exception("Database operation failed: %s", e)
             return jsonify({'message': 'Terjadi kesalahan database'}), 500
 
         # Generate local token
         try:
             token = generate_token(user['_id'])
-            print(f"Generated token for user: {email}")
+            logger.info("Generated token for user: %s", email)
         except Exception as e:
-            print(f"ERROR: Token generation failed: {e}")
-            traceback.print_exc()
+            logger.exception("Token generation failed: %s", e)
             return jsonify({'message': 'Gagal membuat token'}), 500
-        
-        response_data = {
-            'token': token, 
-            'nama': user['nama']
-        }
-        
-        print(f"OAuth login successful for {email}")
-        print(f"Response data: {response_data}")
-
-        # Simpan riwayat login
-        history_collection.insert_one({
-            'user_id': str(user['_id']),
-            'timestamp': datetime.utcnow(),
-            'device': device_info,
-            'ip': request.remote_addr,
-        })
-        
-        return jsonify(response_data), 200
+
+        logger.info("OAuth login successful for %s", email)
+
+        # Simpan riwayat login (ditulis batch di background)
+        login_history_writer.submit(login_record(user, device_info, request.remote_addr))
+
+        return jsonify({'token': token, 'nama': user['nama']}), 200
 
     except Exception as e:
-        print(f"CRITICAL ERROR in OAuth login: {e}")
-        traceback.print_exc()
+        logger.exception("CRITICAL ERROR in OAuth login: %s", e)
         return jsonify({'message': 'Terjadi kesalahan server saat login OAuth'}), 500
 
+def format_login_history(docs):
+    history_list = []
+    for doc in docs:
+        # Konversi timestamp ke format WIB
+        local_time = doc['timestamp'].replace(tzinfo=pytz.utc).astimezone(WIB)
+        formatted_time = local_time.strftime('%d %B %Y, %H:%M WIB')
+
+        # Tambahkan semua data yang relevan ke dalam list
+        history_list.append({
+            'id': str(doc['_id']),
+            'timestamp': formatted_time,
+            'device': doc.get('device', 'N/A'), # Gunakan .get() untuk keamanan
+            'ip': doc.get('ip', 'N/A')         # jika field tidak ada
+        })
+    return history_list
+
+def login_history_query(user_id):
+    """(filter, field urut, projection) halaman riwayat login untuk find_page/find_page_async."""
+    return {'user_id': user_id}, 'timestamp', {'device': 1, 'ip': 1}
+
 @auth_bp.route('/login-history', methods=['GET'])
 @require_api_key
+@require_user
 def get_login_history():
     try:
-        auth_header = request.headers.get('Authorization')
-
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({'message': 'Token tidak ditemukan'}), 401
-
-        token = auth_header.split(' ')[1]
-        user_id = verify_token(token)
-
-        if not user_id:
-            return jsonify({'message': 'Token tidak valid'}), 401
+        user_id = g.user_id
         
-        # Ambil data riwayat login, urutkan dari yang terbaru
-        login_history_cursor = history_collection.find(
-            {'user_id': user_id}
-        ).sort('timestamp', -1)
-
-        history_list = []
-        wib = timezone('Asia/Jakarta')
-
-        for doc in login_history_cursor:
-            # Konversi timestamp ke format WIB
-            local_time = doc['timestamp'].replace(tzinfo=pytz.utc).astimezone(wib)
-            formatted_time = local_time.strftime('%d %B %Y, %H:%M WIB')
+        try:
+            limit, cursor = parse_page_args(request.args)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
 
-            # Tambahkan semua data yang relevan ke dalam list
-            history_list.append({
-                'id': str(doc['_id']),
-                'timestamp': formatted_time,
-                'device': doc.get('device', 'N/A'), # Gunakan .get() untuk keamanan
-                'ip': doc.get('ip', 'N/A')         # jika field tidak ada
-            })
+        # Ambil satu halaman riwayat login, urutkan dari yang terbaru
+        docs, next_cursor = find_page(history_collection, *login_history_query(user_id), limit, cursor)
 
-        return jsonify(history_list), 200
+        response = with_next_cursor(jsonify(format_login_history(docs)), next_cursor)
+        return conditional(response, PRIVATE_CACHE_CONTROL)
 
     except Exception as e:
-        print(f"History error: {e}")
-        traceback.print_exc()
+        logger.exception("History error: %s", e)
         return jsonify({'message': 'Terjadi kesalahan server'}), 500
\ No newline at end of file
@@ -0,0 +1,347 @@
+import os
+import logging
+from flask import Blueprint, request, jsonify
+import numpy as np
+from middleware import require_api_key
+from inference import pipeline
+from inference.sessions import session_store, SEQUENCE_LENGTH, DEFAULT_STRIDE
+from inference.pose_pool import PoolTimeout
+from inference.result_cache import result_cache
+
+# Endpoint deteksi pose. TensorFlow, MediaPipe dan model.h5 baru di-load saat
+# request deteksi pertama (lihat inference/pipeline.py).
+detect_bp = Blueprint('detect', __name__)
+logger = logging.getLogger(__name__)
+
+# Batas ukuran satu frame (bytes gambar setelah decode base64)
+MAX_FRAME_BYTES = int(os.getenv("DETECT_MAX_FRAME_BYTES", str(2 * 1024 * 1024)))
+
+# Content-Type yang dibaca sebagai body gambar mentah
+RAW_IMAGE_TYPES = ('image/jpeg', 'image/png', 'application/octet-stream')
+
+def frame_too_large():
+    return jsonify({'error': f'Ukuran frame melebihi batas {MAX_FRAME_BYTES} bytes'}), 413
+
+def read_frame_request():
+    """Ambil frame dan field lain dari request.
+
+    Mendukung tiga format:
+    - `image/jpeg` (atau png/octet-stream) mentah, field lain di query string
+    - `multipart/form-data` dengan file `image`, field lain di form atau query string
+    - JSON `{"image": "<base64>", ...}` (format lama)
+
+    Return (frame, fields, error_response). `frame` None jika gambar tidak ada.
+    """
+    mimetype = request.mimetype
+
+    if mimetype in RAW_IMAGE_TYPES:
+        if request.content_length is not None and request.content_length > MAX_FRAME_BYTES:
+            return None, None, frame_too_large()
+        # Baca langsung dari stream tanpa parsing body
+        buffer = request.stream.read(MAX_FRAME_BYTES + 1)
+        if len(buffer) > MAX_FRAME_BYTES:
+            return None, None, frame_too_large()
+        frame = pipeline.decode_frame_bytes(buffer) if buffer else None
+        return frame, request.args.to_dict(), None
+
+    if mimetype == 'multipart/form-data':
+        fields = {**request.args.to_dict(), **request.form.to_dict()}
+        upload = request.files.get('image')
+        if upload is None:
+            return None, fields, None
+        buffer = upload.stream.read(MAX_FRAME_BYTES + 1)
+        if len(buffer) > MAX_FRAME_BYTES:
+            return None, None, frame_too_large()
+        return pipeline.decode_frame_bytes(buffer), fields, None
+
+    data = request.get_json(silent=True) or {}
+    fields = {key: value for key, value in data.items() if key != 'image'}
+    image_b64 = data.get('image')
+    if not image_b64:
+        return None, fields, None
+    # Ukuran hasil decode base64 kira-kira 3/4 panjang string
+    if len(image_b64) * 3 // 4 > MAX_FRAME_BYTES:
+        return None, None, frame_too_large()
+    return pipeline.decode_base64_frame(image_b64), fields, None
+
+def client_key_for(req):
+    return f"client:{req.headers.get('X-Client-Id') or req.remote_addr}"
+
+def detect_frame(frame, target_label, client_key):
+    """Deteksi pose satu frame (CPU-bound); return payload respons."""
+    keypoints = pipeline.extract_keypoints_from_image(frame)
+    if keypoints is None:
+        return {'status': '❌ Gagal mendeteksi pose'}
+
+    # Frame yang hampir sama dengan frame terakhir client ini memakai hasil sebelumnya
+    prediction = result_cache.lookup(client_key, keypoints)
+    if prediction is None:
+        sequence = np.array([keypoints] * SEQUENCE_LENGTH)
+        prediction = pipeline.predict(sequence)
+        result_cache.store(client_key, keypoints, prediction)
+
+    verdict = pipeline.build_verdict(prediction, target_label)
+    return {'status': verdict['status']}
+
+# TAMBAHKAN ENDPOINT BARU INI
+@detect_bp.route('/api/detect', methods=['POST'])
+@require_api_key
+def detect_pose_api():
+    try:
+        frame, data, error = read_frame_request()
+        if error:
+            return error
+        if frame is None or 'target_label' not in data:
+            return jsonify({'error': 'Data tidak lengkap'}), 400
+
+        return jsonify(detect_frame(frame, data['target_label'], client_key_for(request)))
+
+    except PoolTimeout as e:
+        logger.warning("Pose pool exhausted: %s", e)
+        return jsonify({'error': 'Server sedang sibuk, coba lagi'}), 503
+    except Exception as e:
+        logger.exception("detect_pose_api error: %s", e)
+        return jsonify({'error': f'Terjadi kesalahan di server: {e}'}), 500
+
+# ==========================================
+# KEYPOINT DETECTION (LANDMARK DARI DEVICE)
+# ==========================================
+
+# Jumlah sequence maksimal per request /api/detect/keypoints
+MAX_KEYPOINT_SEQUENCES = int(os.getenv("DETECT_MAX_SEQUENCES", "256"))
+
+KEYPOINT_BINARY_DTYPES = {'float32': '<f4', 'float16': '<f2'}
+SEQUENCE_VALUES = SEQUENCE_LENGTH * 99
+
+def keypoints_from_buffer(buffer, dtype_name):
+    """Sequence dari body biner; return (array (N, 30, 99), (payload, status) error)."""
+    dtype = KEYPOINT_BINARY_DTYPES.get(dtype_name)
+    if dtype is None:
+        return None, ({'error': 'dtype harus float32 atau float16'}, 400)
+    item_bytes = SEQUENCE_VALUES * np.dtype(dtype).itemsize
+    if len(buffer) > MAX_KEYPOINT_SEQUENCES * item_bytes:
+        return None, ({'error': f'Maksimal {MAX_KEYPOINT_SEQUENCES} sequence per request'}, 413)
+    if not buffer or len(buffer) % item_bytes:
+        return None, ({'error': f'Ukuran body harus kelipatan {item_bytes} bytes'}, 400)
+    sequences = np.frombuffer(buffer, dtype=dtype).reshape(-1, SEQUENCE_LENGTH, 99)
+    return sequences.astype(np.float32), None
+
+def max_keypoint_body(dtype_name):
+    dtype = KEYPOINT_BINARY_DTYPES.get(dtype_name, '<f4')
+    return MAX_KEYPOINT_SEQUENCES * SEQUENCE_VALUES * np.dtype(dtype).itemsize
+
+def keypoints_from_json(data):
+    """Sequence dari body JSON; return (array, fields, (payload, status) error)."""
+    fields = {key: value for key, value in data.items() if key not in ('sequences', 'sequence')}
+    raw = data['sequences'] if 'sequences' in data else [data['sequence']] if 'sequence' in data else None
+    if not raw:
+        return None, fields, ({'error': 'Data tidak lengkap'}, 400)
+    if len(raw) > MAX_KEYPOINT_SEQUENCES:
+        return None, fields, ({'error': f'Maksimal {MAX_KEYPOINT_SEQUENCES} sequence per request'}, 413)
+    try:
+        sequences = np.asarray(raw, dtype=np.float32)
+    except (TypeError, ValueError):
+        return None, fields, ({'error': 'Format sequence tidak valid'}, 400)
+    if sequences.shape[1:] != (SEQUENCE_LENGTH, 99):
+        return None, fields, ({'error': f'Setiap sequence harus berukuran {SEQUENCE_LENGTH}x99'}, 400)
+    return sequences, fields, None
+
+def read_keypoint_request():
+    """Ambil sequence keypoints dari request, return (array (N, 30, 99), fields, error).
+
+    Format biner: body `application/octet-stream` berisi float little-endian
+    (`?dtype=float32` default, atau `float16`), N x 30 x 99 nilai berurutan.
+    Format JSON: `{"sequences": [[[99 float] x 30], ...]}` atau `{"sequence": [...]}`.
+    """
+    if request.mimetype == 'application/octet-stream':
+        dtype_name = request.args.get('dtype', 'float32')
+        buffer = request.stream.read(max_keypoint_body(dtype_name) + 1)
+        sequences, error = keypoints_from_buffer(buffer, dtype_name)
+        if error:
+            return None, None, (jsonify(error[0]), error[1])
+        return sequences, request.args.to_dict(), None
+
+    sequences, fields, error = keypoints_from_json(request.get_json(silent=True) or {})
+    if error:
+        return None, fields, (jsonify(error[0]), error[1])
+    return sequences, fields, None
+
+def score_keypoints(sequences, fields):
+    """Nilai semua sequence dalam satu panggilan model; return (payload, status)."""
+    if not np.isfinite(sequences).all():
+        return {'error': 'Sequence berisi NaN atau Infinity'}, 400
+
+    target_label = fields.get('target_label')
+    if target_label is not None and target_label not in pipeline.labels:
+        return {'error': 'Label tidak ditemukan'}, 400
+
+    predictions = pipeline.predict_batch(sequences)
+
+    top_indices = predictions.argmax(axis=1)
+    response = {
+        'labels': pipeline.labels,
+        'scores': np.round(predictions, 6).tolist(),
+        'top': [
+            {'label': pipeline.labels[index], 'score': float(predictions[row, index])}
+            for row, index in enumerate(top_indices)
+        ],
+    }
+    if target_label is not None:
+        response['verdicts'] = [pipeline.build_verdict(prediction, target_label) for prediction in predictions]
+    return response, 200
+
+@detect_bp.route('/api/detect/keypoints', methods=['POST'])
+@require_api_key
+def detect_keypoints_api():
+    try:
+        sequences, fields, error = read_keypoint_request()
+        if error:
+            return error
+
+        payload, status = score_keypoints(sequences, fields)
+        return jsonify(payload), status
+
+    except Exception as e:
+        logger.exception("detect_keypoints_api error: %s", e)
+        return jsonify({'error': f'Terjadi kesalahan di server: {e}'}), 500
+
+# ==========================================
+# SESSION DETECTION (SLIDING WINDOW 30 FRAME)
+# ==========================================
+
+def extract_session_keypoints(session, frame):
+    """Ekstrak keypoints memakai Pose mode tracking milik session.
+
+    MediaPipe melacak ROI dari frame sebelumnya sehingga tahap deteksi orang
+    bisa dilewati. Jika pool tracking habis, session memakai pool biasa.
+    """
+    with session.tracker_lock:
+        # Session yang sudah ditutup (DELETE/expired) memakai detector pool bersama,
+        # karena tracker yang disewa sesudah close() tidak akan pernah dikembalikan
+        if session.tracker is None and not session.closed:
+            session.tracker = pipeline.lease_tracker()
+            if session.tracker is None and session_store.evict_expired():
+                session.tracker = pipeline.lease_tracker()
+            session.on_close = pipeline.release_tracker
+        if session.tracker is not None:
+            # Frame satu session diproses berurutan (tracker menyimpan state)
+            return pipeline.extract_keypoints_from_image(frame, detector=session.tracker)
+    return pipeline.extract_keypoints_from_image(frame)
+
+def session_frame(session, frame):
+    """Tambahkan satu frame ke window session (CPU-bound); return payload respons."""
+    keypoints = extract_session_keypoints(session, frame)
+    if keypoints is None:
+        return {'status': '❌ Gagal mendeteksi pose', 'frames': len(session.frames)}
+
+    # Keputusan diambil dari nilai yang dibaca di bawah lock: frame lain dari session yang
+    # sama bisa masuk di antaranya dan mengubah frames/last_verdict
+    with session.lock:
+        run_inference = session.push(keypoints)
+        sequence = session.sequence() if run_inference else None
+        frames = len(session.frames)
+        last_verdict = session.last_verdict
+
+    if run_inference:
+        # Saat pose ditahan, window hampir tidak berubah dan model tidak perlu dijalankan.
+        # Cache dicocokkan dengan seluruh window, bukan hanya frame terbaru.
+        cache_key = f'session:{session.id}'
+        prediction = result_cache.lookup(cache_key, sequence)
+        cached = prediction is not None
+        if not cached:
+            prediction = pipeline.predict(sequence)
+            result_cache.store(cache_key, sequence, prediction)
+        verdict = pipeline.build_verdict(prediction, session.target_label)
+        with session.lock:
+            session.last_verdict = verdict
+        return {**verdict, 'frames': frames, 'fresh': not cached}
+
+    if last_verdict is None:
+        return {'status': 'Mengumpulkan gerakan...', 'frames': frames}
+
+    # Di antara stride, kirim ulang verdict terakhir tanpa memanggil model
+    return {**last_verdict, 'frames': frames, 'fresh': False}
+
+def create_session(data):
+    """Buat session deteksi; return (payload, status)."""
+    target_label = data.get('target_label')
+    if not target_label:
+        return {'error': 'Data tidak lengkap'}, 400
+    if target_label not in pipeline.labels:
+        return {'error': 'Label tidak ditemukan'}, 400
+
+    stride = data.get('stride', DEFAULT_STRIDE)
+    if not isinstance(stride, int) or stride < 1:
+        return {'error': 'Stride harus bilangan bulat positif'}, 400
+
+    session = session_store.create(target_label, stride)
+    if session is None:
+        return {'error': 'Server sedang penuh, coba lagi nanti'}, 503
+
+    logger.info("Detect session created: %s (%s, stride=%s)", session.id, target_label, session.stride)
+    return {
+        'session_id': session.id,
+        'sequence_length': SEQUENCE_LENGTH,
+        'stride': session.stride
+    }, 201
+
+@detect_bp.route('/api/detect/session', methods=['POST'])
+@require_api_key
+def create_detect_session():
+    try:
+        payload, status = create_session(request.get_json(silent=True) or {})
+        return jsonify(payload), status
+
+    except Exception as e:
+        logger.exception("create_detect_session error: %s", e)
+        return jsonify({'error': f'Terjadi kesalahan di server: {e}'}), 500
+
+@detect_bp.route('/api/detect/session/<session_id>/frame', methods=['POST'])
+@require_api_key
+def push_detect_frame(session_id):
+    try:
+        session = session_store.get(session_id)
+        if session is None:
+            return jsonify({'error': 'Session tidak ditemukan atau sudah kedaluwarsa'}), 404
+
+        frame, _, error = read_frame_request()
+        if error:
+            return error
+        if frame is None:
+            return jsonify({'error': 'Data tidak lengkap'}), 400
+
+        return jsonify(session_frame(session, frame))
+
+    except PoolTimeout as e:
+        logger.warning("Pose pool exhausted: %s", e)
+        return jsonify({'error': 'Server sedang sibuk, coba lagi'}), 503
+    except Exception as e:
+        logger.exception("push_detect_frame error: %s", e)
+        return jsonify({'error': f'Terjadi kesalahan di server: {e}'}), 500
+
+def close_session(session_id):
+    if not session_store.close(session_id):
+        return {'error': 'Session tidak ditemukan atau sudah kedaluwarsa'}, 404
+    result_cache.discard(f'session:{session_id}')
+    return {'message': 'Session ditutup'}, 200
+
+@detect_bp.route('/api/detect/session/<session_id>', methods=['DELETE'])
+@require_api_key
+def close_detect_session(session_id):
+    payload, status = close_session(session_id)
+    return jsonify(payload), status
+    
+def detect_stats():
+    return {
+        'model_loaded': pipeline.is_loaded(),
+        'backend': pipeline.backend_name(),
+        'batcher': pipeline.batcher_stats(),
+        'pose_pool': pipeline.pose_pool_stats(),
+        'result_cache': result_cache.stats(),
+        'active_sessions': len(session_store)
+    }
+
+@detect_bp.route('/api/detect/stats', methods=['GET'])
+@require_api_key
+def get_detect_stats():
+    return jsonify(detect_stats()), 200
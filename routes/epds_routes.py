@@ -1,84 +1,77 @@
 from datetime import datetime
-import traceback
-from flask import Blueprint, request, jsonify
+import logging
+from flask import Blueprint, request, jsonify, g
 from db import epds_collection
-from utils import verify_token
-from middleware import require_api_key
+from middleware import require_api_key, require_user
+from pagination import find_page, parse_page_args, with_next_cursor
+from http_cache import PRIVATE_CACHE_CONTROL, conditional
 from bson import ObjectId
 
 epds_bp = Blueprint('epds', __name__)
+logger = logging.getLogger(__name__)
+
+def epds_record(user_id, score):
+    # Menentukan hasil berdasarkan skor
+    result_text = ''
+    if score >= 13:
+        result_text = 'Beresiko Tinggi Depresi'
+    elif score >= 9:
+        result_text = 'Berkemungkinan Depresi'
+    else:
+        result_text = 'Resiko Rendah'
+
+    # Membuat dokumen baru untuk disimpan
+    return {
+        'userId': user_id,
+        'score': score,
+        'result': result_text,
+        'date': datetime.utcnow() # Simpan waktu saat ini
+    }
+
+def epds_history_query(user_id):
+    """(filter, field urut, projection) halaman riwayat EPDS untuk find_page/find_page_async."""
+    return {'userId': user_id}, 'date', {'score': 1}
+
+def format_epds_history(records):
+    # Format data agar hanya berisi skor (sesuai kebutuhan LineChart Anda),
+    # tetap urut dari yang lama ke yang baru di dalam satu halaman
+    return [record['score'] for record in reversed(records)]
 
 @epds_bp.route('/api/epds', methods=['POST'])
 @require_api_key
+@require_user
 def save_epds_result():
     try:
-        # Verifikasi token untuk mendapatkan user_id
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({'message': 'Token tidak ditemukan'}), 401
-        
-        token = auth_header.split(' ')[1]
-        user_id = verify_token(token) # Dapatkan user_id dari token
-        
-        if not user_id:
-            return jsonify({'message': 'Token tidak valid'}), 401
+        user_id = g.user_id
 
         data = request.get_json()
         score = data['score']
 
-        # Menentukan hasil berdasarkan skor
-        result_text = ''
-        if score >= 13:
-            result_text = 'Beresiko Tinggi Depresi'
-        elif score >= 9:
-            result_text = 'Berkemungkinan Depresi'
-        else:
-            result_text = 'Resiko Rendah'
-
-        # Membuat dokumen baru untuk disimpan
-        new_record = {
-            'userId': user_id,
-            'score': score,
-            'result': result_text,
-            'date': datetime.utcnow() # Simpan waktu saat ini
-        }
-
         # Simpan ke database
-        epds_collection.insert_one(new_record)
+        epds_collection.insert_one(epds_record(user_id, score))
 
         return jsonify({'message': 'Hasil EPDS berhasil disimpan'}), 201
     except Exception as e:
-        print(f"❌ Error saat menyimpan: {e}")
+        logger.exception("❌ Error saat menyimpan: %s", e)
         return jsonify({'message': 'Terjadi kesalahan di server'}), 500
 
 @epds_bp.route('/api/epds/history', methods=['GET'])
 @require_api_key
+@require_user
 def get_epds_history():
     try:
-        auth_header = request.headers.get('Authorization')
-
-        if not auth_header or not auth_header.startswith('Bearer '):
-            print("ERROR: No valid Authorization header")
-            return jsonify({'message': 'Token tidak ditemukan'}), 401
-
-        token = auth_header.split(' ')[1]
-        user_id = verify_token(token)
-
-        if not user_id:
-            print("ERROR: Token verification failed")
-            return jsonify({'message': 'Token tidak valid'}), 401
+        user_id = g.user_id
         
-        records = list(epds_collection.find({'userId': user_id}).sort('date', 1))
-    
-        if not records:
-            return jsonify([]), 200 # Kembalikan array kosong jika tidak ada riwayat
+        try:
+            limit, cursor = parse_page_args(request.args)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
 
-        # Format data agar hanya berisi skor (sesuai kebutuhan LineChart Anda)
-        # Jika Anda butuh tanggalnya juga, Anda bisa mengirim seluruh record
-        score_history = [record['score'] for record in records]
+        # Halaman diambil dari yang terbaru; cursor berikutnya menuju record yang lebih lama
+        records, next_cursor = find_page(epds_collection, *epds_history_query(user_id), limit, cursor)
 
-        return jsonify(score_history), 200
+        response = with_next_cursor(jsonify(format_epds_history(records)), next_cursor)
+        return conditional(response, PRIVATE_CACHE_CONTROL)
     except Exception as e:
-        print(f"History error: {e}")
-        traceback.print_exc()
+        logger.exception("History error: %s", e)
         return jsonify({'message': 'Terjadi kesalahan server'}), 500
\ No newline at end of file
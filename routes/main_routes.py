@@ -1,9 +1,28 @@
 from flask import Blueprint, jsonify
 from middleware import require_api_key
+import startup
 
 main_bp = Blueprint('main', __name__)
 
 @main_bp.route('/', methods=['GET'])
 @require_api_key
 def health_check():
-    return jsonify({'status': 'OK', 'message': 'Server is running'}), 200
\ No newline at end of file
+    return jsonify({'status': 'OK', 'message': 'Server is running'}), 200
+
+# Liveness: proses hidup dan bisa menjawab request (tanpa cek dependency)
+@main_bp.route('/healthz', methods=['GET'])
+def liveness():
+    return jsonify({'status': 'OK'}), 200
+
+def readiness_payload(ready, dependencies):
+    """(payload, status) /readyz; dipakai juga oleh asgi_routes/main_routes.py."""
+    return {
+        'status': 'READY' if ready else 'NOT_READY',
+        'dependencies': dependencies
+    }, 200 if ready else 503
+
+# Readiness: semua dependency (MongoDB, Firebase, model, pose detector) siap
+@main_bp.route('/readyz', methods=['GET'])
+def readiness():
+    payload, status = readiness_payload(*startup.readiness())
+    return jsonify(payload), status
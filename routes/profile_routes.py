@@ -1,80 +1,80 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, g
 from db import users_collection
-from utils import verify_token
-from middleware import require_api_key
+from middleware import require_api_key, require_user, current_user
+from utils import token_cache
 from bson import ObjectId
-import traceback
+import logging
 
 profile_bp = Blueprint('profile', __name__)
+logger = logging.getLogger(__name__)
+
+# Fungsi tanpa I/O di bawah dipakai juga oleh asgi_routes/profile_routes.py
+
+def profile_payload(user):
+    return {
+        'nama': user['nama'],
+        'email': user['email'],
+        'program': user['program'],
+        'usia': user.get('usia'),
+        'foto_profil': user.get('foto_profil')
+    }
+
+def parse_profile_update(data):
+    """Body PUT /profile -> (field yang diubah, None) atau (None, error)."""
+    if not data:
+        return None, ({'message': 'Data tidak valid'}, 400)
+
+    # Diubah: Ambil 'nama' dan 'program' dari data JSON
+    nama = data.get('nama')
+    program = data.get('program')
+
+    update_fields = {}
+    if nama is not None:
+        update_fields['nama'] = nama
+    if program is not None:
+        update_fields['program'] = program
+
+    if not update_fields:
+        return None, ({'message': 'Tidak ada data untuk diperbarui'}, 400)
+    return update_fields, None
+
+def parse_program_update(data):
+    """Body PUT /program -> (field yang diubah, None) atau (None, error)."""
+    if not data:
+        logger.warning("No JSON data received")
+        return None, ({'message': 'Data tidak valid'}, 400)
+    return {'program': data.get('program')}, None
 
 @profile_bp.route('/profile', methods=['GET'])
 @require_api_key
+@require_user
 def get_profile():
     try:
-        print("Processing profile request...")
-        auth_header = request.headers.get('Authorization')
-        print(f"Auth Header: {auth_header}")
-        
-        if not auth_header or not auth_header.startswith('Bearer '):
-            print("ERROR: No valid Authorization header")
-            return jsonify({'message': 'Token tidak ditemukan'}), 401
-
-        token = auth_header.split(' ')[1]
-        user_id = verify_token(token)
-
-        if not user_id:
-            
-            print("ERROR: Token verification failed")
-            return jsonify({'message': 'Token tidak valid'}), 401
+        logger.debug("Processing profile request...")
+        user_id = g.user_id
 
-        user = users_collection.find_one({'_id': ObjectId(user_id)})
+        user = current_user()
         if not user:
-            print(f"ERROR: User not found for ID: {user_id}")
+            logger.warning("User not found for ID: %s", user_id)
             return jsonify({'message': 'Pengguna tidak ditemukan'}), 404
         
-        print(f"Profile request successful for user: {user['email']}")
-        return jsonify({
-            'nama': user['nama'],
-            'email': user['email'],
-            'program': user['program'],
-            'usia': user.get('usia'),
-            'foto_profil': user.get('foto_profil')
-        }), 200
+        logger.debug("Profile request successful for user: %s", user['email'])
+        return jsonify(profile_payload(user)), 200
     except Exception as e:
-        print(f"Profile error: {e}")
-        traceback.print_exc()
+        logger.exception("Profile error: %s", e)
         return jsonify({'message': 'Terjadi kesalahan server'}), 500
 
 @profile_bp.route('/profile', methods=['PUT'])
 @require_api_key
+@require_user
 def update_profile():
     try:
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({'message': 'Token diperlukan'}), 401
-
-        token = auth_header.split(" ")[1]
-        user_id = verify_token(token)
-
-        if not user_id:
-            return jsonify({'message': 'Token tidak valid atau expired'}), 401
-
-        data = request.get_json()
-        if not data:
-            return jsonify({'message': 'Data tidak valid'}), 400
-            
-        # Diubah: Ambil 'nama' dan 'program' dari data JSON
-        nama = data.get('nama')
-        program = data.get('program')
+        user_id = g.user_id
 
-        update_fields = {}
-        if nama is not None:
-            update_fields['nama'] = nama
-        if program is not None:
-            update_fields['program'] = program
-
-        if not update_fields:
-            return jsonify({'message': 'Tidak ada data untuk diperbarui'}), 400
+        update_fields, error = parse_profile_update(request.get_json())
+        if error:
+            payload, status = error
+            return jsonify(payload), status
 
         result = users_collection.update_one(
             {'_id': ObjectId(user_id)},
@@ -86,76 +86,55 @@ def update_profile():
 
         return jsonify({'message': 'Profil berhasil diperbarui'})
     except Exception as e:
-        print(f"Update profile error: {e}")
-        traceback.print_exc()
+        logger.exception("Update profile error: %s", e)
         return jsonify({'message': 'Terjadi kesalahan server'}), 500
     
 @profile_bp.route('/program', methods=['PUT'])
 @require_api_key
+@require_user
 def update_program():
     try:
-        print("Processing profile update request...")
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            print("ERROR: No valid Authorization header")
-            return jsonify({'message': 'Token diperlukan'}), 401
-
-        token = auth_header.split(" ")[1]
-        user_id = verify_token(token)
-
-        if not user_id:
-            print("ERROR: Token verification failed")
-            return jsonify({'message': 'Token tidak valid atau expired'}), 401
-
-        data = request.get_json()
-        if not data:
-            print("ERROR: No JSON data received")
-            return jsonify({'message': 'Data tidak valid'}), 400
-            
-        program = data.get('program')
+        logger.debug("Processing profile update request...")
+        user_id = g.user_id
+
+        update_fields, error = parse_program_update(request.get_json())
+        if error:
+            payload, status = error
+            return jsonify(payload), status
 
         result = users_collection.update_one(
             {'_id': ObjectId(user_id)},
-            {'$set': {'program': program}}
+            {'$set': update_fields}
         )
 
         if result.matched_count == 0:
-            print(f"ERROR: User not found for update: {user_id}")
+            logger.warning("User not found for update: %s", user_id)
             return jsonify({'message': 'Pengguna tidak ditemukan'}), 404
 
-        print(f"Programe updated successfully for user: {user_id}")
+        logger.info("Programe updated successfully for user: %s", user_id)
         return jsonify({'message': 'Program berhasil diperbarui'})
     except Exception as e:
-        print(f"Update program error: {e}")
-        traceback.print_exc()
+        logger.exception("Update program error: %s", e)
         return jsonify({'message': 'Terjadi kesalahan server'}), 500
 
 @profile_bp.route('/profile', methods=['DELETE'])
 @require_api_key
+@require_user
 def delete_profile():
     try:
-        print("Processing profile deletion request...")
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            print("ERROR: No valid Authorization header")
-            return jsonify({'message': 'Token tidak ditemukan'}), 401
-
-        token = auth_header.split(" ")[1]
-        user_id = verify_token(token)
-
-        if not user_id:
-            print("ERROR: Token verification failed")
-            return jsonify({'message': 'Token tidak valid atau expired'}), 401
+        logger.debug("Processing profile deletion request...")
+        user_id = g.user_id
 
         result = users_collection.delete_one({'_id': ObjectId(user_id)})
 
         if result.deleted_count == 0:
-            print(f"ERROR: User not found for deletion: {user_id}")
+            logger.warning("User not found for deletion: %s", user_id)
             return jsonify({'message': 'Pengguna tidak ditemukan'}), 404
 
-        print(f"Profile deleted successfully for user: {user_id}")
+        # Token akun yang sudah dihapus tidak boleh lagi lolos dari cache
+        token_cache.discard_user(user_id)
+        logger.info("Profile deleted successfully for user: %s", user_id)
         return jsonify({'message': 'Akun berhasil dihapus'}), 200
     except Exception as e:
-        print(f"Delete profile error: {e}")
-        traceback.print_exc()
+        logger.exception("Delete profile error: %s", e)
         return jsonify({'message': 'Terjadi kesalahan server'}), 500
\ No newline at end of file
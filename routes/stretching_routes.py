@@ -1,31 +1,49 @@
-import traceback
-import cv2
-from flask import Blueprint, request, jsonify
-import numpy as np
-from db import stretching_collection, movement_collection, stretch_history_collection, users_collection
-from middleware import require_api_key
-from utils import verify_token
+import logging
+import os
+from flask import Blueprint, request, jsonify, g
+from db import stretching_collection, movement_collection, stretch_history_collection
+from middleware import require_api_key, require_user, current_user
+from catalog_cache import cached
+from http_cache import PRIVATE_CACHE_CONTROL, conditional, conditional_json
+from pagination import find_page, parse_page_args, with_next_cursor
 from bson import ObjectId
-import base64
-import tensorflow as tf
-import mediapipe as mp
-from datetime import datetime
+from datetime import datetime, timedelta
+from pymongo.errors import BulkWriteError
 from pytz import timezone 
 import pytz
 
 stretching_bp = Blueprint('stretching', __name__)
-
-model = tf.keras.models.load_model('model.h5')
-
-labels = [
-    "resistance_fight", "slide_out", "pelvic_tilts", "heel_slides",
-    "vacuum_abs_standing", "Pelvic Tilts (Posisi Merangkak)", "Abdominal Brace (Posisi Berbaring Miring)", "Heel Slides",
-    "Knee Taps to Kickbacks", "Leg Lifts with Brace", "Arm Lifts with Brace", "Double Leg Lifts (Tumit Bersama)",
-    "Top Leg Lifts", "Tabletop Leg Lifts(progresi)", "Knee Drops (Kaki & Lutut Bersama)", "curl to side raises", "push and pull", "twist and pull", "single lat and oblique pulls", "single arm tricep extention", "6. Squats", "5. March with Arm Raises", "1. Warm-up running in place", "3. Step and Kick Back", "2. Marching Arm & Leg Lifts", "8. Standing Abdominal Crunch", "10. Calf Raises with Arm Swings", "9. Mini Squat with Step Backs", "7. Squat Taps", "4. Knee Lifts", "teeter_totter", "Deadbug", "calf stretches", "Bridge", "bridge and feet up", "modified side plank", "pillow_pelvic","slide_dumbbell", "plank_4_leg_dog", "toe_tap", "toe_slide", "leg_pillow_plank", "leg_pillow_tap", "pillow_vacuum_abs", "vacuum_abs_dog"
-]
-
-mp_pose = mp.solutions.pose
-pose_detector = mp_pose.Pose(static_image_mode=True, min_detection_confidence=0.5)
+logger = logging.getLogger(__name__)
+
+# Zona waktu tampilan riwayat
+WIB = timezone('Asia/Jakarta')
+
+# Projection, query dan validasi di bawah dipakai juga oleh asgi_routes/stretching_routes.py
+STRETCHING_LIST_PROJECTION = {
+    '_id': 1,
+    'stretching': 1,
+    'program': 1,
+    'imageUrl': 1,
+    'stretchingDesc': 1,
+    'duration': 1, 
+}
+
+MOVEMENT_LIST_PROJECTION = {
+    '_id': 1,
+    'movement': 1,
+    'imageUrl': 1,
+}
+
+def stretching_query(program_filter):
+    query = {}
+    if program_filter:
+        query['program'] = program_filter
+    return query
+
+def with_str_id(doc):
+    if doc:
+        doc['_id'] = str(doc['_id'])
+    return doc
 
 @stretching_bp.route('/api/stretching', methods=['GET'])
 @require_api_key
@@ -33,29 +51,15 @@ def get_stretching():
     try:
         program_filter = request.args.get('program')
 
-        query = {}
-        
-        if program_filter:
-            query['program'] = program_filter
+        def load_stretchings():
+            docs = stretching_collection.find(stretching_query(program_filter), STRETCHING_LIST_PROJECTION)
+            return [with_str_id(doc) for doc in docs]
 
-        projection = {
-            '_id': 1,
-            'stretching': 1,
-            'program': 1,
-            'imageUrl': 1,
-            'stretchingDesc': 1,
-            'duration': 1, 
-        }
+        stretchings, etag = cached('stretching', 'stretching', program_filter, load_stretchings)
 
-        stretchings_cursor = stretching_collection.find(query, projection)
-        stretchings = list(stretchings_cursor)
-
-        for stretching in stretchings:
-            stretching['_id'] = str(stretching['_id'])
-
-        return jsonify(stretchings), 200
+        return conditional_json(stretchings, etag)
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("get_stretching error: %s", e)
         return jsonify({'error': 'Internal Server Error'}), 500
 
 @stretching_bp.route('/api/stretching/<stretching_id>', methods=['GET'])
@@ -65,18 +69,19 @@ def get_stretching_by_id(stretching_id):
         if not ObjectId.is_valid(stretching_id):
             return jsonify({'error': 'Invalid stretching id'}), 400
         
-        # Ambil semua data karena akan dibutuhkan di detail
-        stretching = stretching_collection.find_one({'_id': ObjectId(stretching_id)})
+        def load_stretching():
+            # Ambil semua data karena akan dibutuhkan di detail
+            return with_str_id(stretching_collection.find_one({'_id': ObjectId(stretching_id)}))
+
+        stretching, etag = cached('stretching', 'stretching_detail', stretching_id, load_stretching)
 
         if not stretching:
             return jsonify({'error': 'Stretching not found'}), 404
         
-        stretching['_id'] = str(stretching['_id'])
-        
-        return jsonify(stretching), 200
+        return conditional_json(stretching, etag)
     
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("get_stretching_by_id error: %s", e)
         return jsonify({'message': 'Terjadi kesalahan server'}), 500
 
 @stretching_bp.route('/api/movement', methods=['GET'])
@@ -89,24 +94,16 @@ def get_movement():
         if not stretching_filter:
             return jsonify({'error': 'Parameter "stretching" dibutuhkan'}), 400
 
-        # TAMBAHKAN: Filter movement berdasarkan jenis stretching
-        query = {'stretching': stretching_filter}
-        
-        projection = {
-            '_id': 1,
-            'movement': 1,
-            'imageUrl': 1,
-        }
-
-        movements_cursor = movement_collection.find(query, projection)
-        movements = list(movements_cursor)
+        def load_movements():
+            # TAMBAHKAN: Filter movement berdasarkan jenis stretching
+            docs = movement_collection.find({'stretching': stretching_filter}, MOVEMENT_LIST_PROJECTION)
+            return [with_str_id(doc) for doc in docs]
 
-        for movement in movements:
-            movement['_id'] = str(movement['_id'])
+        movements, etag = cached('movement', 'movement', stretching_filter, load_movements)
 
-        return jsonify(movements), 200
+        return conditional_json(movements, etag)
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("get_movement error: %s", e)
         return jsonify({'error': 'Internal Server Error'}), 500
     
 @stretching_bp.route('/api/movement/<movement_id>', methods=['GET'])
@@ -116,148 +113,238 @@ def get_movement_by_id(movement_id):
         if not ObjectId.is_valid(movement_id):
             return jsonify({'error': 'Invalid movement id'}), 400
         
-        # Ambil semua data karena dibutuhkan di bottom sheet
-        movement = movement_collection.find_one({'_id': ObjectId(movement_id)})
+        def load_movement():
+            # Ambil semua data karena dibutuhkan di bottom sheet
+            return with_str_id(movement_collection.find_one({'_id': ObjectId(movement_id)}))
+
+        movement, etag = cached('movement', 'movement_detail', movement_id, load_movement)
 
         if not movement:
             return jsonify({'error': 'Movement not found'}), 404
         
-        movement['_id'] = str(movement['_id'])
-        
-        return jsonify(movement), 200
+        return conditional_json(movement, etag)
     
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("get_movement_by_id error: %s", e)
         return jsonify({'message': 'Terjadi kesalahan server'}), 500
     
-def extract_keypoints_from_image(image):
-    """Mengekstrak 99 keypoints (x, y, z) dari satu gambar."""
-    results = pose_detector.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
-    if results.pose_landmarks:
-        return np.array([[lm.x, lm.y, lm.z] for lm in results.pose_landmarks.landmark]).flatten()
-    else:
-        return None
+def new_history(user, user_id, data):
+    """Dokumen riwayat dari body POST /api/stretch_history; return (doc, pesan error atau None)."""
+    if not data or 'movement_name' not in data:
+        return None, 'Data tidak lengkap'
+    return {
+        'user_name': user.get('name', 'Nama Tidak Ditemukan'),
+        'user_id': ObjectId(user_id), # Simpan juga ID user jika perlu
+        'movement_name': data['movement_name'],
+        'timestamp': datetime.utcnow()
+    }, None
 
-# TAMBAHKAN ENDPOINT BARU INI
-@stretching_bp.route('/api/detect', methods=['POST'])
+@stretching_bp.route('/api/stretch_history', methods=['POST'])
 @require_api_key
-def detect_pose_api():
+@require_user(error_key='error')
+def add_history():
     try:
-        data = request.get_json()
-        if 'image' not in data or 'target_label' not in data:
-            return jsonify({'error': 'Data tidak lengkap'}), 400
+        # 1. Dokumen user pemilik token (di-load sekali per request)
+        user = current_user()
+        if not user:
+            return jsonify({'error': 'User tidak ditemukan'}), 404
 
-        img_data = base64.b64decode(data['image'])
-        np_arr = np.frombuffer(img_data, np.uint8)
-        frame = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
+        # 2. Lanjutkan logika untuk menyimpan history
+        history_doc, error = new_history(user, g.user_id, request.get_json())
+        if error:
+            return jsonify({'error': error}), 400
 
-        keypoints = extract_keypoints_from_image(frame)
-        if keypoints is None:
-            return jsonify({'status': '❌ Gagal mendeteksi pose'})
+        stretch_history_collection.insert_one(history_doc)
 
-        sequence = np.array([keypoints] * 30)
-        prediction = model.predict(np.expand_dims(sequence, axis=0))[0]
-        
-        target_label = data['target_label']
-        if target_label in labels:
-            target_index = labels.index(target_label)
-            accuracy = float(prediction[target_index]) # Konversi ke float standar Python
-            
-            print(f"Target: {target_label}, Akurasi: {accuracy:.2f}")
-            
-            if accuracy > 0.85:
-                return jsonify({'status': '✅ Gerakan Sudah Tepat'})
-            else:
-                return jsonify({'status': '❌ Gerakan Belum Sesuai'})
-        else:
-            return jsonify({'status': 'Error: Label tidak ditemukan'})
+        return jsonify({'message': 'History berhasil disimpan'}), 201
 
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("add_history error: %s", e)
         return jsonify({'error': f'Terjadi kesalahan di server: {e}'}), 500
-    
-@stretching_bp.route('/api/stretch_history', methods=['POST'])
-@require_api_key
-def add_history():
+
+# Maksimal entry per batch sinkronisasi offline
+MAX_HISTORY_BATCH = int(os.getenv("STRETCH_HISTORY_MAX_BATCH", "100"))
+MAX_IDEMPOTENCY_KEY_LENGTH = 128
+# Toleransi jam HP yang lebih cepat dari server
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+DUPLICATE_KEY_ERROR = 11000
+
+
+def parse_client_timestamp(value, now):
+    """Waktu selesai gerakan dari client (ISO 8601) -> datetime UTC naive; None jika tidak valid."""
+    if value is None:
+        return now
     try:
-        # 1. Ambil token dari header Authorization
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({'error': 'Token tidak ada atau format salah'}), 401
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(pytz.utc).replace(tzinfo=None)
+    if parsed > now + MAX_CLOCK_SKEW:
+        return None
+    return parsed
+
+
+def parse_history_batch(data):
+    """Entry dari body batch; return (entries, pesan error atau None)."""
+    entries = data.get('entries') if isinstance(data, dict) else None
+    if not isinstance(entries, list) or not entries:
+        return None, 'Field "entries" harus berupa array yang tidak kosong'
+    if len(entries) > MAX_HISTORY_BATCH:
+        return None, f'Maksimal {MAX_HISTORY_BATCH} entry per batch'
+    return entries, None
+
+
+def build_history_batch(entries, user_id, user_name, now):
+    """Validasi entry; return (results, docs, positions).
+
+    `results` sudah terisi untuk entry yang tidak valid; `positions[i]` adalah
+    index entry asal untuk `docs[i]`.
+    """
+    results = [None] * len(entries)
+    docs, positions = [], []
+    for index, entry in enumerate(entries):
+        key = entry.get('idempotency_key') if isinstance(entry, dict) else None
+        if not isinstance(key, str) or not key or len(key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+            results[index] = {'idempotency_key': key, 'status': 'invalid', 'error': 'idempotency_key tidak valid'}
+            continue
+        movement_name = entry.get('movement_name')
+        if not movement_name:
+            results[index] = {'idempotency_key': key, 'status': 'invalid', 'error': 'movement_name dibutuhkan'}
+            continue
+        timestamp = parse_client_timestamp(entry.get('timestamp'), now)
+        if timestamp is None:
+            results[index] = {'idempotency_key': key, 'status': 'invalid', 'error': 'timestamp tidak valid'}
+            continue
+        docs.append({
+            'user_name': user_name,
+            'user_id': user_id,
+            'movement_name': movement_name,
+            'timestamp': timestamp,
+            'idempotency_key': key,
+        })
+        positions.append(index)
+    return results, docs, positions
+
+
+def failed_writes(error):
+    """Index doc -> write error dari BulkWriteError insert_many(ordered=False)."""
+    failed = {write_error['index']: write_error for write_error in error.details.get('writeErrors', [])}
+    if any(write_error['code'] != DUPLICATE_KEY_ERROR for write_error in failed.values()):
+        logger.error("add_history_batch write errors: %s", error.details.get('writeErrors'))
+    return failed
+
+
+def duplicate_keys(docs, failed):
+    return [docs[i]['idempotency_key'] for i, error in failed.items() if error['code'] == DUPLICATE_KEY_ERROR]
+
+
+def existing_keys_query(user_id, keys):
+    """(filter, projection) dokumen yang sudah tersimpan untuk idempotency key duplikat."""
+    return {'user_id': user_id, 'idempotency_key': {'$in': keys}}, {'idempotency_key': 1}
+
+
+def finish_history_batch(results, docs, positions, failed, existing):
+    """Lengkapi hasil per entry setelah insert; return body respons batch."""
+    for doc_index, (doc, index) in enumerate(zip(docs, positions)):
+        key = doc['idempotency_key']
+        error = failed.get(doc_index)
+        if error is None:
+            results[index] = {'idempotency_key': key, 'status': 'created', 'id': str(doc['_id'])}
+        elif error['code'] == DUPLICATE_KEY_ERROR:
+            results[index] = {'idempotency_key': key, 'status': 'duplicate', 'id': existing.get(key)}
+        else:
+            results[index] = {'idempotency_key': key, 'status': 'error', 'error': error.get('errmsg')}
+
+    summary = {status: sum(1 for r in results if r['status'] == status)
+               for status in ('created', 'duplicate', 'invalid', 'error')}
+    return {'results': results, 'summary': summary}
 
-        token = auth_header.split(" ")[1]
 
-        # 2. Panggil fungsi verify_token dari utils
-        decrypted_id = verify_token(token)
-        if not decrypted_id:
-            return jsonify({'error': 'Token tidak valid atau kedaluwarsa'}), 401
+@stretching_bp.route('/api/stretch_history/batch', methods=['POST'])
+@require_api_key
+@require_user(error_key='error')
+def add_history_batch():
+    """Sinkronisasi riwayat yang terkumpul saat offline dalam satu request.
 
-        # 3. Cari user di database berdasarkan ID dari token
-        user = users_collection.find_one({'_id': ObjectId(decrypted_id)})
+    Body: {"entries": [{"idempotency_key": "...", "movement_name": "...", "timestamp": "ISO 8601"}]}
+    Entry yang key-nya sudah pernah tersimpan (retry) dilaporkan 'duplicate'.
+    """
+    try:
+        decrypted_id = g.user_id
+
+        entries, error = parse_history_batch(request.get_json(silent=True))
+        if error:
+            return jsonify({'error': error}), 400
+
+        # Satu lookup user untuk seluruh batch (di-load sekali per request)
+        user_id = ObjectId(decrypted_id)
+        user = current_user()
         if not user:
             return jsonify({'error': 'User tidak ditemukan'}), 404
-        
         user_name = user.get('name', 'Nama Tidak Ditemukan')
 
-        # 4. Lanjutkan logika untuk menyimpan history
-        data = request.get_json()
-        if not data or 'movement_name' not in data:
-            return jsonify({'error': 'Data tidak lengkap'}), 400
-            
-        movement_name = data['movement_name']
+        results, docs, positions = build_history_batch(entries, user_id, user_name, datetime.utcnow())
 
-        history_doc = {
-            'user_name': user_name,
-            'user_id': ObjectId(decrypted_id), # Simpan juga ID user jika perlu
-            'movement_name': movement_name,
-            'timestamp': datetime.utcnow()
-        }
+        failed = {}
+        if docs:
+            try:
+                # Unordered: satu entry duplikat tidak menghentikan entry lain
+                stretch_history_collection.insert_many(docs, ordered=False)
+            except BulkWriteError as e:
+                failed = failed_writes(e)
 
-        stretch_history_collection.insert_one(history_doc)
+        # Entry duplikat: ambil id dokumen yang sudah tersimpan sebelumnya (satu query)
+        keys = duplicate_keys(docs, failed)
+        existing = {}
+        if keys:
+            existing = {
+                doc['idempotency_key']: str(doc['_id'])
+                for doc in stretch_history_collection.find(*existing_keys_query(user_id, keys))
+            }
 
-        return jsonify({'message': 'History berhasil disimpan'}), 201
+        return jsonify(finish_history_batch(results, docs, positions, failed, existing)), 200
 
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("add_history_batch error: %s", e)
         return jsonify({'error': f'Terjadi kesalahan di server: {e}'}), 500
     
+def format_history(docs):
+    history_list = []
+    for doc in docs:
+        # Format timestamp ke string yang mudah dibaca dalam WIB
+        local_time = doc['timestamp'].replace(tzinfo=pytz.utc).astimezone(WIB)
+        formatted_time = local_time.strftime('%d %B %Y, %H:%M WIB')
+
+        history_list.append({
+            'id': str(doc['_id']),
+            'movement_name': doc['movement_name'],
+            'timestamp': formatted_time
+        })
+    return history_list
+
+def history_query(user_id):
+    """(filter, field urut, projection) halaman riwayat untuk find_page/find_page_async."""
+    return {'user_id': ObjectId(user_id)}, 'timestamp', {'movement_name': 1}
+
 @stretching_bp.route('/api/stretch_history', methods=['GET'])
 @require_api_key
+@require_user(error_key='error')
 def get_history():
     try:
-        # 1. Verifikasi token untuk mendapatkan ID user
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({'error': 'Token tidak ada atau format salah'}), 401
-
-        token = auth_header.split(" ")[1]
-        decrypted_id = verify_token(token)
-        if not decrypted_id:
-            return jsonify({'error': 'Token tidak valid atau kedaluwarsa'}), 401
-
-        # 2. Ambil semua data history untuk user tersebut, urutkan dari yang terbaru
-        user_history_cursor = stretch_history_collection.find(
-            {'user_id': ObjectId(decrypted_id)}
-        ).sort('timestamp', -1) # -1 untuk descending (terbaru dulu)
-
-        history_list = []
-        
-        # Tentukan zona waktu WIB
-        wib = timezone('Asia/Jakarta')
+        decrypted_id = g.user_id
 
-        for doc in user_history_cursor:
-            # Format timestamp ke string yang mudah dibaca dalam WIB
-            local_time = doc['timestamp'].replace(tzinfo=pytz.utc).astimezone(wib)
-            formatted_time = local_time.strftime('%d %B %Y, %H:%M WIB')
+        try:
+            limit, cursor = parse_page_args(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
 
-            history_list.append({
-                'id': str(doc['_id']),
-                'movement_name': doc['movement_name'],
-                'timestamp': formatted_time
-            })
+        # Ambil satu halaman history user tersebut, urutkan dari yang terbaru
+        docs, next_cursor = find_page(stretch_history_collection, *history_query(decrypted_id), limit, cursor)
 
-        return jsonify(history_list), 200
+        response = with_next_cursor(jsonify(format_history(docs)), next_cursor)
+        return conditional(response, PRIVATE_CACHE_CONTROL)
 
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("get_history error: %s", e)
         return jsonify({'error': f'Terjadi kesalahan di server: {e}'}), 500
\ No newline at end of file
@@ -0,0 +1,204 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+logger = logging.getLogger(__name__)
+
+# Batas waktu per dependency dan total waktu startup (detik)
+DEPENDENCY_TIMEOUT = float(os.getenv("STARTUP_DEPENDENCY_TIMEOUT", "30"))
+STARTUP_TIMEOUT = float(os.getenv("STARTUP_TIMEOUT", "90"))
+# 1 = create_app menunggu semua dependency (dan warm-up) sebelum worker menerima traffic
+STARTUP_BLOCKING = os.getenv("STARTUP_BLOCKING", "1") == "1"
+# Hasil pengecekan ulang di /readyz disimpan sebentar agar probe tidak membebani DB
+READINESS_CACHE_SECONDS = float(os.getenv("READINESS_CACHE_SECONDS", "2"))
+
+
+class Dependency:
+    """Satu dependency startup: fungsi init (sekali) dan fungsi check (berulang).
+
+    `preload` (opsional) adalah bagian init yang aman dijalankan di master gunicorn
+    sebelum fork, mis. import modul besar yang lalu dibagi ke worker lewat copy-on-write.
+    """
+
+    def __init__(self, name, init, check=None, timeout=DEPENDENCY_TIMEOUT, preload=None):
+        self.name = name
+        self.init = init
+        self.check = check
+        self.timeout = timeout
+        self.preload = preload
+        self.state = 'pending'
+        self.error = None
+        self.init_ms = None
+        self.check_ms = None
+        self.checked_at = None
+        self._lock = threading.Lock()
+
+    def run_init(self):
+        started = time.perf_counter()
+        try:
+            self.init()
+        except Exception as e:
+            with self._lock:
+                self.state, self.error = 'failed', str(e)[:200]
+            logger.exception("Startup dependency %s failed: %s", self.name, e)
+        else:
+            with self._lock:
+                self.state, self.error = 'ready', None
+            logger.info("Startup dependency %s ready", self.name)
+        finally:
+            self.init_ms = round((time.perf_counter() - started) * 1000, 2)
+            self.checked_at = time.monotonic()
+
+    def mark_timeout(self):
+        """Init belum selesai saat batas waktu startup; tetap berjalan di background."""
+        with self._lock:
+            # Init yang baru saja selesai tidak ditimpa
+            if self.state == 'pending':
+                self.state, self.error = 'timeout', f'timeout setelah {self.timeout:.0f}s'
+
+    def run_check(self):
+        """Cek ulang dependency yang sudah siap (mis. ping MongoDB)."""
+        if self.check is None or self.state in ('pending', 'timeout'):
+            return
+        with self._lock:
+            if self.checked_at and time.monotonic() - self.checked_at < READINESS_CACHE_SECONDS:
+                return
+            started = time.perf_counter()
+            try:
+                self.check()
+            except Exception as e:
+                self.state, self.error = 'failed', str(e)[:200]
+            else:
+                self.state, self.error = 'ready', None
+            self.check_ms = round((time.perf_counter() - started) * 1000, 2)
+            self.checked_at = time.monotonic()
+
+    def report(self):
+        return {
+            'status': self.state,
+            'error': self.error,
+            'init_ms': self.init_ms,
+            'check_ms': self.check_ms,
+        }
+
+
+_dependencies = {}
+
+# True di master gunicorn --preload (lihat gunicorn.conf.py): koneksi MongoDB, graph
+# MediaPipe dan runtime TensorFlow tidak aman di-fork, jadi start() hanya menjalankan
+# `preload` dan init sebenarnya ditunda ke after_fork() di setiap worker.
+_deferred = False
+_deferred_role = None
+
+
+def register(name, init, check=None, timeout=DEPENDENCY_TIMEOUT, preload=None):
+    _dependencies[name] = Dependency(name, init, check, timeout, preload)
+
+
+def defer_until_fork():
+    global _deferred
+    _deferred = True
+
+
+def after_fork():
+    """Dipanggil dari hook post_fork gunicorn: jalankan init dan thread background yang ditunda."""
+    global _deferred
+    if not _deferred:
+        return
+    _deferred = False
+    start()
+    if _deferred_role is not None:
+        start_background_tasks(_deferred_role)
+
+
+def _preload():
+    for dep in _dependencies.values():
+        if dep.preload is None:
+            continue
+        started = time.perf_counter()
+        try:
+            dep.preload()
+        except Exception as e:
+            # Init di worker tetap jalan dan melaporkan error-nya sendiri di /readyz
+            logger.warning("Preload %s failed: %s", dep.name, e)
+        else:
+            logger.info("Preloaded %s in %.0f ms", dep.name, (time.perf_counter() - started) * 1000)
+
+
+def start(wait=STARTUP_BLOCKING):
+    """Jalankan semua init dependency secara paralel.
+
+    Jika `wait`, fungsi ini menunggu sampai semua selesai atau timeout. Init
+    yang melewati timeout tetap berjalan di background dan statusnya menjadi
+    'ready' (atau 'failed') ketika selesai; sampai saat itu /readyz melaporkan 'timeout'.
+    """
+    if _deferred:
+        _preload()
+        return
+    pending = [dep for dep in _dependencies.values() if dep.state == 'pending']
+    if not pending:
+        return
+    executor = ThreadPoolExecutor(max_workers=len(pending), thread_name_prefix='startup')
+    futures = {dep: executor.submit(dep.run_init) for dep in pending}
+    executor.shutdown(wait=False)
+    if not wait:
+        return
+
+    started = time.monotonic()
+    for dep, future in futures.items():
+        # Timeout dihitung dari awal startup, bukan dari saat mulai menunggu dependency ini
+        deadline = started + min(dep.timeout, STARTUP_TIMEOUT)
+        remaining = max(0.0, deadline - time.monotonic())
+        try:
+            future.result(timeout=remaining)
+        except FutureTimeout:
+            dep.mark_timeout()
+            logger.error("Startup dependency %s timed out", dep.name)
+
+    summary = {name: dep.state for name, dep in _dependencies.items()}
+    logger.info("Startup finished: %s", summary)
+
+
+def readiness():
+    """Return (siap, laporan per dependency)."""
+    for dep in _dependencies.values():
+        dep.run_check()
+    report = {name: dep.report() for name, dep in _dependencies.items()}
+    return all(dep.state == 'ready' for dep in _dependencies.values()), report
+
+
+def register_role_dependencies(role, mongodb=True):
+    """Dependency per role (dipakai app Flask dan ASGI); status-nya dilaporkan di /readyz.
+
+    App ASGI memakai `mongodb=False` dan mendaftarkan ping client async sendiri
+    setelah event loop worker berjalan.
+    """
+    if role in ('api', 'all'):
+        import db
+        import firebase_verifier
+        if mongodb:
+            register('mongodb', db.ping, check=db.ping)
+        register('firebase', firebase_verifier.init_firebase)
+        register('firebase_certs', firebase_verifier.warm_up)
+
+    if role in ('inference', 'all'):
+        from inference import pipeline
+        register('model', pipeline.warm_up_model, preload=pipeline.preload_model)
+        register('pose_detector', pipeline.warm_up_pose, preload=pipeline.preload_pose)
+
+
+def start_background_tasks(role):
+    """Thread background per worker (aman dipanggil lagi setelah fork)."""
+    global _deferred_role
+    if _deferred:
+        _deferred_role = role
+        return
+    if role in ('api', 'all'):
+        # Refresh berkala ringkasan /api/visualization (hanya satu worker per lease)
+        import visualization
+        visualization.start_scheduler()
+        # Kirim email OTP yang masih tertunda di outbox (mis. setelah restart)
+        import mailer
+        mailer.start_dispatcher()
@@ -0,0 +1,16 @@
+"""Env untuk tes. Modul proyek membaca env saat di-import, jadi nilainya diset di sini
+sebelum modul tes di-collect (load_dotenv tidak menimpa env yang sudah ada).
+
+Tes tidak butuh MongoDB: collection diganti objek palsu atau mongomock, dan DB_URI
+menunjuk ke port yang tidak pernah dihubungi.
+"""
+import os
+
+from cryptography.fernet import Fernet
+
+os.environ.setdefault('SECRET_KEY', 'test-secret-key-for-hs256-signing-only')
+os.environ.setdefault('FERNET_KEY', Fernet.generate_key().decode())
+os.environ.setdefault('API_KEY', 'test-api-key')
+os.environ.setdefault('DB_URI', 'mongodb://localhost:1')
+os.environ.setdefault('DB_SERVER_SELECTION_TIMEOUT_MS', '100')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
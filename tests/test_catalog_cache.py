@@ -0,0 +1,229 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import catalog_cache
+from catalog_cache import CatalogCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(catalog_cache, 'time', clock)
+    return clock
+
+
+class CountingLoader:
+    def __init__(self, value='data'):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return {'value': self.value, 'call': self.calls}
+
+
+def test_concurrent_misses_run_loader_once():
+    cache = CatalogCache()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(threading.current_thread().name)
+        started.set()
+        release.wait(5)
+        return ['artikel']
+
+    results = []
+
+    def request():
+        results.append(cache.get_entry('articles', 'list', 10, loader))
+
+    leader = threading.Thread(target=request)
+    leader.start()
+    assert started.wait(5)
+    followers = [threading.Thread(target=request) for _ in range(7)]
+    for thread in followers:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert len(results) == 8
+    assert len({etag for _, etag in results}) == 1
+    assert all(value == ['artikel'] for value, _ in results)
+    counts = cache.stats()['endpoints']['list']
+    assert counts['misses'] == 1
+    assert counts['coalesced'] + counts['hits'] == 7
+
+
+def test_loader_error_reaches_waiters_and_is_not_cached():
+    cache = CatalogCache()
+    started = threading.Event()
+    release = threading.Event()
+
+    def failing_loader():
+        started.set()
+        release.wait(5)
+        raise RuntimeError('db down')
+
+    errors = []
+
+    def request():
+        try:
+            cache.get_entry('articles', 'list', 10, failing_loader)
+        except RuntimeError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=request)]
+    threads[0].start()
+    assert started.wait(5)
+    threads.append(threading.Thread(target=request))
+    threads[1].start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(errors) == 2
+    loader = CountingLoader()
+    cache.get_or_load('articles', 'list', 10, loader)
+    assert loader.calls == 1
+
+
+def test_concurrent_async_misses_run_loader_once():
+    cache = CatalogCache()
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return ['stretching']
+
+    async def main():
+        return await asyncio.gather(*(
+            cache.get_entry_async('stretching', 'list', None, loader) for _ in range(5)
+        ))
+
+    results = asyncio.run(main())
+
+    assert len(calls) == 1
+    assert all(result == results[0] for result in results)
+
+
+def test_entry_expires_after_ttl(clock):
+    cache = CatalogCache(ttl=60)
+    loader = CountingLoader()
+
+    first = cache.get_or_load('articles', 'detail', 'a1', loader)
+    clock.advance(59)
+    assert cache.get_or_load('articles', 'detail', 'a1', loader) == first
+    clock.advance(2)
+    assert cache.get_or_load('articles', 'detail', 'a1', loader)['call'] == 2
+    assert loader.calls == 2
+
+
+def test_invalidate_only_drops_its_namespace(clock):
+    cache = CatalogCache()
+    articles, stretching = CountingLoader(), CountingLoader()
+    cache.get_or_load('articles', 'list', 10, articles)
+    cache.get_or_load('stretching', 'list', None, stretching)
+
+    cache.invalidate('articles')
+    cache.get_or_load('articles', 'list', 10, articles)
+    cache.get_or_load('stretching', 'list', None, stretching)
+
+    assert articles.calls == 2
+    assert stretching.calls == 1
+
+
+def test_load_started_before_invalidation_is_not_stored(clock):
+    cache = CatalogCache()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        if len(calls) == 1:
+            # Editor mempublikasikan konten saat query pertama masih berjalan
+            cache.invalidate('articles')
+            return ['lama']
+        return ['baru']
+
+    assert cache.get_or_load('articles', 'list', 10, loader) == ['lama']
+    assert cache.get_or_load('articles', 'list', 10, loader) == ['baru']
+    assert cache.get_or_load('articles', 'list', 10, loader) == ['baru']
+    assert len(calls) == 2
+
+
+def test_version_bump_invalidates_after_check_interval(clock):
+    versions = {'articles': 1, 'stretching': 4}
+    cache = CatalogCache(version_source=lambda: dict(versions), version_check_interval=5)
+    articles, stretching = CountingLoader(), CountingLoader()
+    cache.get_or_load('articles', 'list', 10, articles)
+    cache.get_or_load('stretching', 'list', None, stretching)
+
+    versions['articles'] += 1
+    clock.advance(1)
+    cache.get_or_load('articles', 'list', 10, articles)
+    assert articles.calls == 1
+
+    clock.advance(5)
+    cache.get_or_load('articles', 'list', 10, articles)
+    cache.get_or_load('stretching', 'list', None, stretching)
+    assert articles.calls == 2
+    assert stretching.calls == 1
+    assert cache.stats()['versions'] == {'articles': 2, 'stretching': 4}
+
+
+def test_version_source_failure_keeps_serving_cache(clock):
+    def broken_source():
+        raise ConnectionError('MongoDB tidak terjangkau')
+
+    cache = CatalogCache(version_source=broken_source, version_check_interval=5)
+    loader = CountingLoader()
+    cache.get_or_load('articles', 'list', 10, loader)
+    clock.advance(10)
+
+    cache.get_or_load('articles', 'list', 10, loader)
+
+    assert loader.calls == 1
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = CatalogCache(max_entries=2)
+    loaders = {key: CountingLoader(key) for key in ('a', 'b', 'c')}
+    cache.get_or_load('articles', 'detail', 'a', loaders['a'])
+    cache.get_or_load('articles', 'detail', 'b', loaders['b'])
+    cache.get_or_load('articles', 'detail', 'a', loaders['a'])
+
+    cache.get_or_load('articles', 'detail', 'c', loaders['c'])
+    for key in ('a', 'b', 'c'):
+        cache.get_or_load('articles', 'detail', key, loaders[key])
+
+    assert {key: loader.calls for key, loader in loaders.items()} == {'a': 1, 'b': 2, 'c': 2}
+
+
+def test_disabled_cache_always_loads():
+    cache = CatalogCache(max_entries=0)
+    loader = CountingLoader()
+
+    cache.get_or_load('articles', 'list', 10, loader)
+    cache.get_or_load('articles', 'list', 10, loader)
+
+    assert loader.calls == 2
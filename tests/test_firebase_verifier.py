@@ -0,0 +1,114 @@
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from firebase_verifier import (
+    MAX_SUB_LENGTH, ExpiredFirebaseToken, FirebaseTokenTooEarly, FirebaseVerifier, InvalidFirebaseToken,
+    StaticKeySource,
+)
+
+PROJECT_ID = 'momstretch-test'
+KID = 'test-kid'
+
+
+@pytest.fixture(scope='module')
+def private_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+@pytest.fixture
+def verifier(private_key):
+    return FirebaseVerifier(StaticKeySource({KID: private_key.public_key()}), project_id=PROJECT_ID, clock_skew=0)
+
+
+def make_token(key, kid=KID, algorithm='RS256', **claims):
+    """Token dengan claim ID token Firebase yang valid; claim bernilai None dihapus."""
+    now = int(time.time())
+    payload = {
+        'aud': PROJECT_ID,
+        'iss': f'https://securetoken.google.com/{PROJECT_ID}',
+        'sub': 'firebase-uid-1',
+        'iat': now - 10,
+        'auth_time': now - 10,
+        'exp': now + 3600,
+        'email': 'ibu@example.com',
+    }
+    payload.update(claims)
+    payload = {name: value for name, value in payload.items() if value is not None}
+    return jwt.encode(payload, key, algorithm=algorithm, headers={'kid': kid})
+
+
+def test_valid_token_returns_claims_with_uid(verifier, private_key):
+    claims = verifier.verify(make_token(private_key))
+
+    assert claims['uid'] == 'firebase-uid-1'
+    assert claims['email'] == 'ibu@example.com'
+
+
+@pytest.mark.parametrize('claims', [
+    {'aud': 'other-project'},
+    {'iss': 'https://securetoken.google.com/other-project'},
+    {'iss': 'https://accounts.google.com'},
+])
+def test_wrong_audience_or_issuer_is_rejected(verifier, private_key, claims):
+    with pytest.raises(InvalidFirebaseToken):
+        verifier.verify(make_token(private_key, **claims))
+
+
+def test_non_rs256_algorithm_is_rejected(verifier):
+    token = make_token('a-shared-secret-that-is-long-enough-for-hs256', algorithm='HS256')
+
+    with pytest.raises(InvalidFirebaseToken, match='RS256'):
+        verifier.verify(token)
+
+
+def test_unsigned_token_is_rejected(verifier):
+    with pytest.raises(InvalidFirebaseToken):
+        verifier.verify(make_token(None, algorithm='none'))
+
+
+def test_unknown_kid_is_rejected(verifier, private_key):
+    with pytest.raises(InvalidFirebaseToken, match='Kunci tidak dikenal'):
+        verifier.verify(make_token(private_key, kid='rotated-away'))
+
+
+def test_signature_from_another_key_is_rejected(verifier):
+    other_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+    with pytest.raises(InvalidFirebaseToken):
+        verifier.verify(make_token(other_key))
+
+
+def test_expired_token_raises_expired(verifier, private_key):
+    now = int(time.time())
+
+    with pytest.raises(ExpiredFirebaseToken):
+        verifier.verify(make_token(private_key, iat=now - 7200, auth_time=now - 7200, exp=now - 60))
+
+
+def test_future_iat_raises_too_early_and_passes_with_more_skew(verifier, private_key):
+    now = int(time.time())
+    token = make_token(private_key, iat=now + 120, auth_time=now)
+
+    with pytest.raises(FirebaseTokenTooEarly):
+        verifier.verify(token)
+    assert verifier.verify(token, clock_skew=300)['uid'] == 'firebase-uid-1'
+
+
+def test_future_auth_time_raises_too_early(verifier, private_key):
+    with pytest.raises(FirebaseTokenTooEarly, match='auth_time'):
+        verifier.verify(make_token(private_key, auth_time=int(time.time()) + 120))
+
+
+@pytest.mark.parametrize('claims', [{'sub': ''}, {'sub': None}, {'sub': 'x' * (MAX_SUB_LENGTH + 1)}])
+def test_missing_empty_or_long_sub_is_rejected(verifier, private_key, claims):
+    with pytest.raises(InvalidFirebaseToken):
+        verifier.verify(make_token(private_key, **claims))
+
+
+def test_sub_at_max_length_is_accepted(verifier, private_key):
+    sub = 'x' * MAX_SUB_LENGTH
+
+    assert verifier.verify(make_token(private_key, sub=sub))['uid'] == sub
@@ -0,0 +1,154 @@
+import socket
+import threading
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+
+import mailer
+
+
+@pytest.fixture
+def smtp_server():
+    server = mailer.StandInSmtpServer(('127.0.0.1', 0))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def outbox(monkeypatch):
+    collection = mongomock.MongoClient().db['mail_outbox']
+    monkeypatch.setattr(mailer, 'outbox_collection', collection)
+    monkeypatch.setattr(mailer, 'EMAIL_ADDRESS', 'noreply@momstretch.test')
+    monkeypatch.setattr(mailer, 'EMAIL_PASSWORD', None)
+    monkeypatch.setattr(mailer, 'SMTP_SSL', False)
+    return collection
+
+
+@pytest.fixture
+def connection(outbox, smtp_server, monkeypatch):
+    monkeypatch.setattr(mailer, 'SMTP_HOST', '127.0.0.1')
+    monkeypatch.setattr(mailer, 'SMTP_PORT', smtp_server.server_address[1])
+    connection = mailer.SmtpConnection()
+    yield connection
+    connection.close()
+
+
+@pytest.fixture
+def refused_connection(outbox, monkeypatch):
+    """Koneksi ke port yang tidak didengarkan siapa pun, jadi setiap pengiriman gagal."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    monkeypatch.setattr(mailer, 'SMTP_HOST', '127.0.0.1')
+    monkeypatch.setattr(mailer, 'SMTP_PORT', port)
+    monkeypatch.setattr(mailer, 'SMTP_TIMEOUT', 1)
+    return mailer.SmtpConnection()
+
+
+def enqueue(outbox, otp='123456', **fields):
+    record = mailer.otp_email_record('ibu@example.com', otp, datetime.utcnow() + timedelta(minutes=10))
+    record.update(fields)
+    return outbox.insert_one(record).inserted_id
+
+
+def test_due_email_is_sent_and_body_removed(outbox, connection, smtp_server):
+    email_id = enqueue(outbox, otp='654321')
+
+    assert mailer.dispatch_once(connection) == 1
+
+    record = outbox.find_one({'_id': email_id})
+    assert record['status'] == 'sent'
+    assert record['attempts'] == 1
+    assert 'body' not in record and 'claimed_until' not in record
+    [(recipients, message)] = smtp_server.messages
+    assert recipients == ['<ibu@example.com>']
+    assert '654321' in message
+
+
+def test_batch_reuses_one_connection(outbox, connection, smtp_server):
+    for otp in ('111111', '222222', '333333'):
+        enqueue(outbox, otp=otp)
+
+    assert mailer.dispatch_once(connection) == 3
+    assert mailer.dispatch_once(connection) == 0
+    assert len(smtp_server.messages) == 3
+    assert outbox.count_documents({'status': 'sent'}) == 3
+
+
+def test_failed_send_is_rescheduled_with_backoff(outbox, refused_connection):
+    email_id = enqueue(outbox)
+    before = datetime.utcnow()
+
+    assert mailer.dispatch_once(refused_connection) == 1
+
+    record = outbox.find_one({'_id': email_id})
+    assert record['status'] == 'pending'
+    assert record['attempts'] == 1
+    assert record['last_error']
+    # Body tetap ada supaya bisa dikirim ulang
+    assert '123456' in record['body']
+    delay = (record['next_attempt_at'] - before).total_seconds()
+    assert mailer.RETRY_BASE_SECONDS - 1 <= delay <= mailer.RETRY_BASE_SECONDS + 1
+    # Belum jatuh tempo, jadi tidak diklaim lagi
+    assert mailer.dispatch_once(refused_connection) == 0
+
+
+def test_retry_delay_doubles_up_to_the_cap(monkeypatch):
+    monkeypatch.setattr(mailer, 'RETRY_BASE_SECONDS', 5)
+    monkeypatch.setattr(mailer, 'RETRY_MAX_SECONDS', 30)
+
+    assert [mailer._retry_delay(attempts) for attempts in range(1, 6)] == [5, 10, 20, 30, 30]
+
+
+def test_last_attempt_marks_failed_and_removes_body(outbox, refused_connection):
+    email_id = enqueue(outbox, attempts=mailer.MAX_ATTEMPTS - 1)
+
+    assert mailer.dispatch_once(refused_connection) == 1
+
+    record = outbox.find_one({'_id': email_id})
+    assert record['status'] == 'failed'
+    assert record['attempts'] == mailer.MAX_ATTEMPTS
+    assert 'body' not in record and 'claimed_until' not in record
+
+
+def test_expired_otp_is_not_sent(outbox, connection, smtp_server):
+    email_id = enqueue(outbox, expires_at=datetime.utcnow() - timedelta(minutes=1))
+
+    assert mailer.dispatch_once(connection) == 1
+
+    record = outbox.find_one({'_id': email_id})
+    assert record['status'] == 'expired'
+    assert 'body' not in record and 'claimed_until' not in record
+    assert smtp_server.messages == []
+
+
+def test_stale_claim_is_reclaimed_but_live_claim_is_not(outbox, connection, smtp_server):
+    now = datetime.utcnow()
+    stale_id = enqueue(outbox, otp='777777', status='sending', attempts=1,
+                       claimed_until=now - timedelta(seconds=1))
+    live_id = enqueue(outbox, otp='888888', status='sending', attempts=1,
+                      claimed_until=now + timedelta(seconds=mailer.CLAIM_TIMEOUT))
+
+    assert mailer.dispatch_once(connection) == 1
+
+    stale = outbox.find_one({'_id': stale_id})
+    assert stale['status'] == 'sent'
+    assert stale['attempts'] == 2
+    assert outbox.find_one({'_id': live_id})['status'] == 'sending'
+    [(_, message)] = smtp_server.messages
+    assert '777777' in message
+
+
+def test_claim_is_atomic_across_dispatchers(outbox):
+    enqueue(outbox)
+    now = datetime.utcnow()
+
+    first = mailer._claim(now)
+
+    assert first['status'] == 'sending'
+    assert first['claimed_until'] > now
+    assert mailer._claim(now) is None
@@ -0,0 +1,126 @@
+import base64
+import os
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+from bson import ObjectId
+from flask import Flask
+from werkzeug.datastructures import MultiDict
+
+from pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, decode_cursor, encode_cursor, find_page, parse_page_args,
+)
+
+
+def b64(raw):
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def test_cursor_round_trip():
+    # MongoDB menyimpan datetime dengan presisi milidetik
+    value = datetime(2025, 3, 14, 9, 26, 53, 589000)
+    doc_id = ObjectId()
+
+    cursor = encode_cursor(value, doc_id)
+
+    assert '=' not in cursor
+    assert decode_cursor(cursor) == (value, doc_id)
+
+
+@pytest.mark.parametrize('cursor', [
+    'bukan-cursor!',
+    b64(b'1700000000000'),
+    b64(b'abc:' + str(ObjectId()).encode()),
+    b64(b'1700000000000:bukan-objectid'),
+    b64(b'1700000000000:' + str(ObjectId()).encode() + b':extra'),
+    b64(b'\xff\xfe:\xff'),
+])
+def test_malformed_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError, match='Cursor tidak valid'):
+        decode_cursor(cursor)
+
+
+def test_page_args_defaults_and_clamp():
+    assert parse_page_args(MultiDict()) == (DEFAULT_PAGE_SIZE, None)
+    assert parse_page_args(MultiDict({'limit': str(MAX_PAGE_SIZE + 1)}))[0] == MAX_PAGE_SIZE
+    assert parse_page_args(MultiDict({'limit': '5', 'cursor': ''})) == (5, None)
+
+
+@pytest.mark.parametrize('args, message', [
+    ({'limit': 'sepuluh'}, 'angka'),
+    ({'limit': '0'}, 'minimal 1'),
+    ({'limit': '-3'}, 'minimal 1'),
+    ({'cursor': 'rusak'}, 'Cursor tidak valid'),
+])
+def test_invalid_page_args_raise_value_error(args, message):
+    with pytest.raises(ValueError, match=message):
+        parse_page_args(MultiDict(args))
+
+
+@pytest.fixture
+def history():
+    collection = mongomock.MongoClient().db['epds_records']
+    start = datetime(2025, 1, 1)
+    # Beberapa record berbagi tanggal yang sama: urutan ditentukan _id
+    dates = [start, start, start + timedelta(days=1), start + timedelta(days=1), start + timedelta(days=2)]
+    collection.insert_many([{'userId': 'u1', 'date': date, 'score': score} for score, date in enumerate(dates)])
+    collection.insert_one({'userId': 'u2', 'date': start, 'score': 99})
+    return collection
+
+
+def test_find_page_walks_every_record_once_newest_first(history):
+    pages, cursor = [], None
+    while True:
+        docs, next_cursor = find_page(history, {'userId': 'u1'}, 'date', {'score': 1}, 2, cursor)
+        pages.append([doc['score'] for doc in docs])
+        if next_cursor is None:
+            break
+        cursor = decode_cursor(next_cursor)
+
+    assert pages == [[4, 3], [2, 1], [0]]
+
+
+def test_find_page_without_more_records_has_no_cursor(history):
+    docs, cursor = find_page(history, {'userId': 'u1'}, 'date', {'score': 1}, 5)
+
+    assert len(docs) == 5
+    assert cursor is None
+
+
+@pytest.fixture
+def client(history, monkeypatch):
+    # Cukup blueprint EPDS: create_app ikut menjalankan init dependency dan thread background
+    import routes.epds_routes as epds_routes
+    monkeypatch.setattr(epds_routes, 'epds_collection', history)
+    app = Flask(__name__)
+    app.register_blueprint(epds_routes.epds_bp)
+    return app.test_client()
+
+
+@pytest.fixture
+def headers():
+    from utils import generate_token
+    return {'x-api-key': os.environ['API_KEY'], 'Authorization': f'Bearer {generate_token("u1")}'}
+
+
+def test_history_route_pages_with_next_cursor_header(client, headers):
+    response = client.get('/api/epds/history?limit=3', headers=headers)
+
+    assert response.status_code == 200
+    # Di dalam satu halaman skor tetap urut dari yang lama ke yang baru
+    assert response.get_json() == [2, 3, 4]
+    cursor = response.headers[NEXT_CURSOR_HEADER]
+
+    response = client.get(f'/api/epds/history?limit=3&cursor={cursor}', headers=headers)
+
+    assert response.get_json() == [0, 1]
+    assert NEXT_CURSOR_HEADER not in response.headers
+
+
+@pytest.mark.parametrize('query', ['cursor=rusak', 'limit=0', 'limit=banyak'])
+def test_history_route_rejects_bad_page_args(client, headers, query):
+    response = client.get(f'/api/epds/history?{query}', headers=headers)
+
+    assert response.status_code == 400
+    assert 'message' in response.get_json()
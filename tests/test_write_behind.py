@@ -0,0 +1,136 @@
+import itertools
+import time
+
+import pytest
+from bson import ObjectId
+from prometheus_client import REGISTRY
+from pymongo.errors import BulkWriteError
+
+from write_behind import DUPLICATE_KEY, WriteBehindWriter
+
+VALIDATION_FAILED = 121
+_names = itertools.count()
+
+
+class FakeCollection:
+    """insert_many dengan ordered=False yang menolak dokumen tertentu seperti MongoDB.
+
+    `rejections` memetakan nilai `doc['n']` ke berapa kali dokumen itu ditolak;
+    nilai None berarti selalu ditolak. `down` membuat seluruh panggilan gagal.
+    """
+
+    def __init__(self, rejections=None):
+        self.rejections = dict(rejections or {})
+        self.stored = {}
+        self.calls = []
+        self.down = False
+
+    def insert_many(self, docs, ordered=True):
+        assert ordered is False
+        if self.down:
+            raise ConnectionError('MongoDB tidak terjangkau')
+        self.calls.append([doc['n'] for doc in docs])
+        errors = []
+        for index, doc in enumerate(docs):
+            doc.setdefault('_id', ObjectId())
+            remaining = self.rejections.get(doc['n'], 0)
+            if doc['_id'] in self.stored:
+                errors.append({'index': index, 'code': DUPLICATE_KEY, 'errmsg': 'duplicate key'})
+            elif remaining is None or remaining > 0:
+                if remaining:
+                    self.rejections[doc['n']] = remaining - 1
+                errors.append({'index': index, 'code': VALIDATION_FAILED, 'errmsg': 'Document failed validation'})
+            else:
+                self.stored[doc['_id']] = doc
+        if errors:
+            raise BulkWriteError({'writeErrors': errors, 'nInserted': len(docs) - len(errors)})
+
+    def written(self):
+        return sorted(doc['n'] for doc in self.stored.values())
+
+
+def make_writer(collection, **options):
+    options.setdefault('flush_interval', 0.01)
+    return WriteBehindWriter(f'test-{next(_names)}', collection, **options)
+
+
+def batch_of(*numbers):
+    return [[{'n': n}, 0] for n in numbers]
+
+
+def recorded(writer, outcome):
+    return REGISTRY.get_sample_value(
+        'momstretch_write_behind_records_total', {'queue': writer.name, 'outcome': outcome},
+    ) or 0
+
+
+def test_partial_failure_retries_only_rejected_docs():
+    collection = FakeCollection({2: 1, 4: 1})
+    writer = make_writer(collection)
+
+    retry = writer._flush(batch_of(1, 2, 3, 4))
+
+    assert [(doc['n'], attempts) for doc, attempts in retry] == [(2, 1), (4, 1)]
+    assert collection.written() == [1, 3]
+    assert writer._flush(retry) == []
+    assert collection.written() == [1, 2, 3, 4]
+    assert collection.calls == [[1, 2, 3, 4], [2, 4]]
+    assert recorded(writer, 'written') == 4
+
+
+def test_duplicate_key_on_retry_counts_as_written():
+    collection = FakeCollection()
+    writer = make_writer(collection)
+    batch = batch_of(1, 2)
+    writer._flush(batch)
+
+    # Batch yang sama dikirim ulang (mis. balasan insert_many hilang): _id sudah tersimpan
+    assert writer._flush(batch) == []
+    assert collection.written() == [1, 2]
+
+
+def test_doc_is_dropped_after_max_attempts():
+    collection = FakeCollection({2: None})
+    writer = make_writer(collection, max_attempts=3)
+
+    batch = batch_of(1, 2)
+    flushes = 0
+    while batch:
+        batch = writer._flush(batch)
+        flushes += 1
+
+    assert flushes == 3
+    assert collection.written() == [1]
+    assert recorded(writer, 'dropped') == 1
+
+
+def test_total_failure_keeps_whole_batch_without_counting_attempts():
+    collection = FakeCollection()
+    collection.down = True
+    writer = make_writer(collection, max_attempts=1)
+    batch = batch_of(1, 2)
+
+    assert writer._flush(batch) is batch
+    assert [attempts for _, attempts in batch] == [0, 0]
+    assert collection.written() == []
+
+
+def test_background_thread_retries_partial_failures_until_max_attempts():
+    collection = FakeCollection({3: 1, 5: None})
+    writer = make_writer(collection, batch_size=4, max_attempts=2)
+
+    for n in range(1, 7):
+        writer.submit({'n': n})
+    deadline = time.monotonic() + 5
+    while recorded(writer, 'dropped') < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    writer.close()
+
+    assert collection.written() == [1, 2, 3, 4, 6]
+    assert recorded(writer, 'dropped') == 1
+    assert recorded(writer, 'written') == 5
+
+
+def test_unknown_overflow_policy_is_rejected():
+    with pytest.raises(ValueError, match='Overflow policy'):
+        WriteBehindWriter('invalid', FakeCollection(), overflow='spill')
@@ -4,17 +4,17 @@ import jwt
 import datetime
 from dotenv import load_dotenv
 import os
-import smtplib
-from email.message import EmailMessage
 import random
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 
 # Load environment variables
 load_dotenv()
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 FERNET_KEY = os.getenv("FERNET_KEY")
-EMAIL_ADDRESS = os.getenv("EMAIL_ADDRESS") # verif email
-EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
 
 # Validasi bahwa kunci tidak kosong
 if not SECRET_KEY or not FERNET_KEY:
@@ -23,12 +23,30 @@ if not SECRET_KEY or not FERNET_KEY:
 fernet = Fernet(FERNET_KEY.encode())
 
 # Password hashing
+# Format werkzeug: "scrypt:n:r:p" atau "pbkdf2:sha256:iterasi". Mengubah nilai ini
+# tidak butuh migrasi: hash lama di-upgrade otomatis saat user berhasil login.
+PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+PASSWORD_SALT_LENGTH = int(os.getenv("PASSWORD_SALT_LENGTH", "16"))
+
 def hash_password(password):
-    return generate_password_hash(password)
+    return generate_password_hash(password, method=PASSWORD_HASH_METHOD, salt_length=PASSWORD_SALT_LENGTH)
 
 def verify_password(hash_password_db, input_password):
     return check_password_hash(hash_password_db, input_password)
 
+_current_hash_prefix = None
+
+def password_needs_rehash(hash_password_db):
+    """True jika hash tersimpan dibuat dengan parameter selain yang dikonfigurasi sekarang."""
+    global _current_hash_prefix
+    if _current_hash_prefix is None:
+        # Parameter default werkzeug dilengkapi ("scrypt" -> "scrypt:32768:8:1"), jadi
+        # prefix pembanding diambil dari hash sungguhan (sekali per proses)
+        _current_hash_prefix = generate_password_hash('', method=PASSWORD_HASH_METHOD, salt_length=1).split('$', 1)[0]
+    method, _, rest = hash_password_db.partition('$')
+    salt = rest.split('$', 1)[0]
+    return method != _current_hash_prefix or len(salt) != PASSWORD_SALT_LENGTH
+
 # Enkripsi dan dekripsi data
 def encrypt_data(data):
     return fernet.encrypt(data.encode()).decode()
@@ -46,40 +64,87 @@ def generate_token(user_id):
     token = jwt.encode(payload, SECRET_KEY, algorithm='HS256')
     return token
 
+# Cache hasil verifikasi token: request berurutan dengan token yang sama tidak
+# perlu decode JWT + decrypt Fernet lagi. Entry tidak pernah hidup melewati `exp` token.
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "900"))
+
+class TokenCache:
+    def __init__(self, max_entries=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # sha256(token) -> (user_id, berlaku sampai (epoch detik))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def _key(token):
+        # Simpan digest, bukan token mentah
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token):
+        if self.max_entries <= 0:
+            return None
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def put(self, token, user_id, exp):
+        if self.max_entries <= 0:
+            return
+        valid_until = min(float(exp), time.time() + self.ttl)
+        with self._lock:
+            self._entries[self._key(token)] = (user_id, valid_until)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard_user(self, user_id):
+        """Buang semua token milik user (mis. setelah akun dihapus)."""
+        with self._lock:
+            for key in [k for k, (uid, _) in self._entries.items() if uid == user_id]:
+                del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': self._hits / lookups if lookups else 0.0,
+            }
+
+token_cache = TokenCache()
+
 # JWT token verification
 def verify_token(token):
+    cached_id = token_cache.get(token)
+    if cached_id is not None:
+        return cached_id
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
+        # Token tanpa exp ditolak (401): semua token dari generate_token punya exp,
+        # dan exp dipakai sebagai batas umur entry token_cache
+        payload = jwt.decode(token, SECRET_KEY, algorithms=['HS256'], options={'require': ['exp']})
         decrypted_id = decrypt_data(payload['data'])
-        return decrypted_id
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
         return None
     except Exception:
         return None
+    token_cache.put(token, decrypted_id, payload['exp'])
+    return decrypted_id
 
 # Fungsi OTP
 def generate_otp():
     return str(random.randint(100000, 999999))  # OTP 6 digit
-
-def send_otp_email(to_email, otp_code):
-    msg = EmailMessage()
-    msg['Subject'] = 'Kode OTP Verifikasi MomStretch+'
-    msg['From'] = EMAIL_ADDRESS
-    msg['To'] = to_email
-    msg.set_content(f'''
-Hai!
-
-Kode OTP kamu adalah: {otp_code}
-
-Kode ini hanya berlaku selama 10 menit.
-Jangan bagikan kode ini ke siapa pun.
-
-Salam hangat,
-Tim MomStretch+
-''')
-
-    with smtplib.SMTP_SSL('smtp.gmail.com', 465) as smtp:
-        smtp.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
-        smtp.send_message(msg)
\ No newline at end of file
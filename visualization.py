@@ -0,0 +1,272 @@
+"""Ringkasan visualisasi (/api/v2/visualization) yang dikelola backend sendiri.
+
+Record baru di stretch_history dan epds_records diagregasi ke collection
+`visualization_rollups` dengan `$merge`, lalu dokumen `visualization`
+{'_id': 'summary_v2'} dibangun dari rollup yang kecil itu. Setiap sumber punya
+watermark `_id` sendiri, jadi setiap refresh hanya membaca record sejak refresh
+terakhir lewat index `_id`. Dokumen {'_id': 'summary'} (format lama yang ditulis
+proses di luar service ini) tidak disentuh; /api/visualization menyajikannya
+sampai VISUALIZATION_LEGACY_SUNSET, sesudah itu ringkasan milik backend.
+
+Setiap rollup menyimpan hasil window terakhirnya terpisah dari `base` (jumlah
+window sebelumnya). Window yang diproses ulang dengan awal yang sama (proses mati
+sebelum watermark tersimpan) mengganti hasil window itu, bukan menambahkannya lagi.
+
+    python visualization.py refresh            # refresh inkremental
+    python visualization.py refresh --rebuild  # hitung ulang dari nol
+
+Di proses API, scheduler menjalankan refresh setiap VISUALIZATION_REFRESH_SECONDS;
+lease di MongoDB memastikan hanya satu proses (worker atau CLI) yang menjalankannya.
+"""
+import argparse
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from email.utils import format_datetime
+
+from bson import ObjectId
+from pymongo import DESCENDING
+from pymongo.errors import DuplicateKeyError
+
+from catalog_cache import bump_version
+from db import db, epds_collection, stretch_history_collection, users_collection, visualization_collection
+
+logger = logging.getLogger(__name__)
+
+# 0 = scheduler mati (refresh hanya lewat CLI)
+REFRESH_SECONDS = float(os.getenv("VISUALIZATION_REFRESH_SECONDS", "300"))
+# Record yang lebih muda dari ini ditunda ke refresh berikutnya, supaya insert
+# yang _id-nya dibuat sebelum watermark tapi baru tersimpan sesudahnya tidak terlewat
+WATERMARK_LAG_SECONDS = float(os.getenv("VISUALIZATION_WATERMARK_LAG_SECONDS", "60"))
+SUMMARY_DAYS = int(os.getenv("VISUALIZATION_SUMMARY_DAYS", "30"))
+TOP_MOVEMENTS = 10
+SUMMARY_ID = 'summary_v2'
+# Dokumen format lama. Mulai tanggal sunset /api/visualization menyajikan SUMMARY_ID,
+# dan penulis eksternal dokumen ini boleh dimatikan
+LEGACY_SUMMARY_ID = 'summary'
+LEGACY_SUNSET = date.fromisoformat(os.getenv("VISUALIZATION_LEGACY_SUNSET", "2027-01-31"))
+
+ROLLUPS_COLLECTION = 'visualization_rollups'
+rollups_collection = db[ROLLUPS_COLLECTION]
+
+WATERMARK_ID = 'watermark'
+LEASE_ID = 'lease'
+_MIN_ID = ObjectId('0' * 24)
+
+_day_key = {'$dateToString': {'format': '%Y-%m-%d', 'date': '$timestamp', 'timezone': 'Asia/Jakarta'}}
+
+# sumber -> (collection, [(metric, key expression, expression yang dijumlahkan ke total)])
+SOURCES = {
+    'stretch_history': (stretch_history_collection, [
+        ('stretch_by_movement', '$movement_name', 0),
+        ('stretch_by_day', _day_key, 0),
+        ('stretch_by_user', '$user_id', 0),
+    ]),
+    'epds_records': (epds_collection, [
+        ('epds_by_result', '$result', '$score'),
+        ('epds_by_user', '$userId', 0),
+    ]),
+}
+
+
+def legacy_summary_active(today=None):
+    """True selama /api/visualization masih menyajikan dokumen LEGACY_SUMMARY_ID."""
+    return (today or datetime.utcnow().date()) < LEGACY_SUNSET
+
+
+def legacy_headers():
+    """Header Sunset (RFC 8594) dan penggantinya untuk respons format lama."""
+    sunset = datetime.combine(LEGACY_SUNSET, datetime.min.time(), tzinfo=timezone.utc)
+    return {
+        'Sunset': format_datetime(sunset, usegmt=True),
+        'Link': '</api/v2/visualization>; rel="successor-version"',
+    }
+
+
+def _merge_rollup(collection, id_range, metric, key, total):
+    # _id rollup = (metric, key). Hasil window ini disimpan di window_count/window_total;
+    # window dengan awal yang sama mengganti hasil itu, window baru memindahkannya ke base.
+    same_window = {'$eq': ['$window', '$$new.window']}
+    collection.aggregate([
+        {'$match': {'_id': id_range}},
+        {'$group': {'_id': key, 'count': {'$sum': 1}, 'total': {'$sum': total}}},
+        {'$project': {'_id': {'metric': {'$literal': metric}, 'key': '$_id'}, 'metric': {'$literal': metric},
+                      'key': '$_id', 'window': {'$literal': id_range['$gte']},
+                      'base_count': {'$literal': 0}, 'base_total': {'$literal': 0},
+                      'window_count': '$count', 'window_total': '$total', 'count': 1, 'total': 1}},
+        {'$merge': {
+            'into': ROLLUPS_COLLECTION,
+            'on': '_id',
+            'whenMatched': [
+                {'$set': {
+                    'base_count': {'$cond': [same_window, '$base_count', {'$add': ['$base_count', '$window_count']}]},
+                    'base_total': {'$cond': [same_window, '$base_total', {'$add': ['$base_total', '$window_total']}]},
+                    'window': '$$new.window',
+                    'window_count': '$$new.window_count',
+                    'window_total': '$$new.window_total',
+                }},
+                {'$set': {
+                    'count': {'$add': ['$base_count', '$window_count']},
+                    'total': {'$add': ['$base_total', '$window_total']},
+                }},
+            ],
+            'whenNotMatched': 'insert',
+        }},
+    ])
+
+
+def refresh(rebuild=False):
+    """Proses record baru sejak watermark lalu perbarui dokumen summary jika berubah.
+
+    Return jumlah sumber yang punya record baru.
+    """
+    started = time.perf_counter()
+    if rebuild:
+        rollups_collection.delete_many({'_id': {'$ne': LEASE_ID}})
+
+    watermarks = rollups_collection.find_one({'_id': WATERMARK_ID}) or {}
+    upper = ObjectId.from_datetime(datetime.utcnow() - timedelta(seconds=WATERMARK_LAG_SECONDS))
+    changed = 0
+    for source, (collection, rollups) in SOURCES.items():
+        lower = watermarks.get(source, _MIN_ID)
+        if lower >= upper:
+            continue
+        id_range = {'$gte': lower, '$lt': upper}
+        if collection.find_one({'_id': id_range}, {'_id': 1}) is None:
+            continue
+        for metric, key, total in rollups:
+            _merge_rollup(collection, id_range, metric, key, total)
+        # Jika proses mati sebelum baris ini, refresh berikutnya memulai window dari
+        # `lower` yang sama dan hasil window yang sudah di-merge diganti, tidak dihitung dua kali
+        rollups_collection.update_one({'_id': WATERMARK_ID}, {'$set': {source: upper}}, upsert=True)
+        changed += 1
+
+    # Summary selalu dibangun ulang (murah): jumlah user bisa turun tanpa record baru
+    data = build_summary()
+    current = visualization_collection.find_one({'_id': SUMMARY_ID}, {'data': 1}) or {}
+    if rebuild or current.get('data') != data:
+        visualization_collection.replace_one(
+            {'_id': SUMMARY_ID},
+            {'data': data, 'updated_at': datetime.utcnow()},
+            upsert=True,
+        )
+        bump_version('visualization')
+    logger.info("Visualization refresh: %s source(s) updated in %.0f ms",
+                changed, (time.perf_counter() - started) * 1000)
+    return changed
+
+
+def _rollup_rows(metric, sort=None, limit=0):
+    cursor = rollups_collection.find({'metric': metric}, {'_id': 0, 'key': 1, 'count': 1, 'total': 1})
+    if sort:
+        cursor = cursor.sort(sort)
+    return list(cursor.limit(limit))
+
+
+def build_summary():
+    """Susun data summary dari rollup (beberapa puluh dokumen, bukan collection penuh)."""
+    movements = _rollup_rows('stretch_by_movement', [('count', DESCENDING)], TOP_MOVEMENTS)
+    since = (datetime.utcnow() + timedelta(hours=7) - timedelta(days=SUMMARY_DAYS)).strftime('%Y-%m-%d')
+    days = [row for row in _rollup_rows('stretch_by_day', [('key', DESCENDING)], SUMMARY_DAYS)
+            if row['key'] and row['key'] >= since]
+    epds_rows = _rollup_rows('epds_by_result')
+    epds_records = sum(row['count'] for row in epds_rows)
+
+    return {
+        'users': {
+            # Dihitung langsung (metadata collection) supaya user yang dihapus ikut berkurang
+            'registered': users_collection.estimated_document_count(),
+        },
+        'stretching': {
+            'sessions': sum(row['count'] for row in _rollup_rows('stretch_by_movement')),
+            'active_users': rollups_collection.count_documents({'metric': 'stretch_by_user'}),
+            'top_movements': [{'movement_name': row['key'], 'count': row['count']} for row in movements],
+            'daily': [{'date': row['key'], 'count': row['count']} for row in reversed(days)],
+        },
+        'epds': {
+            'records': epds_records,
+            'users': rollups_collection.count_documents({'metric': 'epds_by_user'}),
+            'average_score': (
+                round(sum(row['total'] for row in epds_rows) / epds_records, 2) if epds_records else None
+            ),
+            'by_result': {str(row['key']): row['count'] for row in epds_rows},
+        },
+    }
+
+
+def _acquire_lease(owner, seconds):
+    """Lease sederhana di MongoDB agar hanya satu proses yang menjalankan refresh."""
+    now = datetime.utcnow()
+    try:
+        rollups_collection.find_one_and_update(
+            {'_id': LEASE_ID, '$or': [{'expires_at': {'$lt': now}}, {'owner': owner}]},
+            {'$set': {'owner': owner, 'expires_at': now + timedelta(seconds=seconds)}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        # Lease masih dipegang proses lain
+        return False
+    return True
+
+
+def _lease_owner(prefix=''):
+    return f'{prefix}{socket.gethostname()}:{os.getpid()}'
+
+
+def _release_lease(owner):
+    rollups_collection.update_one({'_id': LEASE_ID, 'owner': owner}, {'$set': {'expires_at': datetime.utcnow()}})
+
+
+_scheduler_pid = None
+_scheduler_lock = threading.Lock()
+
+
+def _run_scheduler(interval):
+    owner = _lease_owner()
+    while True:
+        time.sleep(interval)
+        try:
+            if _acquire_lease(owner, interval * 2):
+                refresh()
+        except Exception as e:
+            logger.exception("Visualization refresh failed: %s", e)
+
+
+def start_scheduler(interval=REFRESH_SECONDS):
+    """Mulai thread scheduler (sekali per proses, aman dipanggil lagi setelah fork)."""
+    global _scheduler_pid
+    if interval <= 0 or _scheduler_pid == os.getpid():
+        return
+    with _scheduler_lock:
+        if _scheduler_pid == os.getpid():
+            return
+        _scheduler_pid = os.getpid()
+        threading.Thread(target=_run_scheduler, args=(interval,), name='visualization-refresh',
+                         daemon=True).start()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=('refresh',))
+    parser.add_argument('--rebuild', action='store_true', help="Hapus rollup dan hitung ulang dari awal")
+    parser.add_argument('--lease-seconds', type=float, default=max(REFRESH_SECONDS * 2, 600),
+                        help="Lama lease yang dipegang selama refresh")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s %(message)s')
+    owner = _lease_owner('cli:')
+    if not _acquire_lease(owner, args.lease_seconds):
+        logger.error("Refresh lain sedang berjalan (lease dipegang proses lain), coba lagi nanti")
+        sys.exit(1)
+    try:
+        refresh(rebuild=args.rebuild)
+    finally:
+        _release_lease(owner)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+import asyncio
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from pymongo.errors import BulkWriteError
+
+import metrics
+from db import history_collection
+
+logger = logging.getLogger(__name__)
+
+# Kapasitas antrian, ukuran batch insert_many dan interval flush (detik)
+QUEUE_SIZE = int(os.getenv("LOGIN_HISTORY_QUEUE_SIZE", "10000"))
+BATCH_SIZE = int(os.getenv("LOGIN_HISTORY_BATCH_SIZE", "200"))
+FLUSH_INTERVAL = float(os.getenv("LOGIN_HISTORY_FLUSH_INTERVAL", "1"))
+# Saat antrian penuh: sync (tulis langsung seperti dulu), drop_newest, drop_oldest, block
+OVERFLOW_POLICY = os.getenv("LOGIN_HISTORY_OVERFLOW", "sync")
+BLOCK_TIMEOUT = float(os.getenv("LOGIN_HISTORY_BLOCK_TIMEOUT", "0.05"))
+# Batas waktu menguras antrian saat proses berhenti
+DRAIN_TIMEOUT = float(os.getenv("LOGIN_HISTORY_DRAIN_TIMEOUT", "10"))
+# Dokumen yang ditolak server sebanyak ini dibuang (mis. dokumen yang memang tidak valid)
+MAX_ATTEMPTS = int(os.getenv("LOGIN_HISTORY_MAX_ATTEMPTS", "5"))
+
+DUPLICATE_KEY = 11000
+
+OVERFLOW_POLICIES = ('sync', 'drop_newest', 'drop_oldest', 'block')
+
+
+class WriteBehindWriter:
+    """Antrian in-process yang menulis dokumen ke MongoDB secara batch di background.
+
+    Request cukup memanggil `submit(doc)`; thread writer menggabungkan dokumen
+    dan memanggil `insert_many` ketika batch penuh atau interval flush lewat.
+    Jika MongoDB gagal, batch disimpan dan dicoba lagi di interval berikutnya,
+    sementara dokumen baru menumpuk di antrian sampai kebijakan overflow berlaku.
+    Jika hanya sebagian dokumen gagal, hanya dokumen itu yang dicoba lagi, paling
+    banyak `max_attempts` kali.
+    """
+
+    def __init__(self, name, collection, max_size=QUEUE_SIZE, batch_size=BATCH_SIZE,
+                 flush_interval=FLUSH_INTERVAL, overflow=OVERFLOW_POLICY, drain_timeout=DRAIN_TIMEOUT,
+                 max_attempts=MAX_ATTEMPTS):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Overflow policy tidak dikenal: {overflow} (pilihan: {', '.join(OVERFLOW_POLICIES)})")
+        self.name = name
+        self.collection = collection
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.drain_timeout = drain_timeout
+        self.max_attempts = max_attempts
+        self._pid = None
+        self._thread = None
+        self._queue = None
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+        atexit.register(self.close)
+
+    def _ensure_started(self):
+        # Thread tidak ikut ter-fork: worker gunicorn membuat antrian dan thread sendiri
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.max_size)
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._run, name=f'write-behind-{self.name}', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def _count(self, outcome, amount=1):
+        metrics.WRITE_BEHIND_RECORDS.labels(queue=self.name, outcome=outcome).inc(amount)
+
+    def _report_depth(self):
+        metrics.WRITE_BEHIND_QUEUE_DEPTH.labels(queue=self.name).set(self._queue.qsize())
+
+    def submit(self, doc):
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(doc)
+        except queue.Full:
+            self._handle_overflow(doc)
+        self._report_depth()
+
+    async def submit_async(self, doc):
+        """submit() untuk route async: overflow 'sync'/'block' dijalankan di thread, bukan di event loop."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(doc)
+        except queue.Full:
+            await asyncio.to_thread(self._handle_overflow, doc)
+        self._report_depth()
+
+    def _handle_overflow(self, doc):
+        if self.overflow == 'sync':
+            try:
+                self.collection.insert_one(doc)
+                self._count('sync')
+            except Exception as e:
+                self._count('dropped')
+                logger.error("%s overflow write failed: %s", self.name, e)
+            return
+        if self.overflow == 'drop_oldest':
+            try:
+                self._queue.get_nowait()
+                self._count('dropped')
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(doc)
+                return
+            except queue.Full:
+                pass
+        elif self.overflow == 'block':
+            try:
+                self._queue.put(doc, timeout=BLOCK_TIMEOUT)
+                return
+            except queue.Full:
+                pass
+        self._count('dropped')
+        logger.warning("%s queue full, record dropped (policy=%s)", self.name, self.overflow)
+
+    def _flush(self, batch):
+        """Tulis batch berisi pasangan [doc, jumlah_gagal]; return item yang perlu dicoba lagi."""
+        started = time.perf_counter()
+        outcome = 'ok'
+        try:
+            self.collection.insert_many([doc for doc, _ in batch], ordered=False)
+        except BulkWriteError as e:
+            outcome = 'partial'
+            return self._retry_failed(batch, e.details.get('writeErrors', []))
+        except Exception as e:
+            # Gagal total (mis. MongoDB tidak terjangkau): seluruh batch dicoba lagi
+            outcome = 'error'
+            logger.error("%s flush of %s records failed: %s", self.name, len(batch), e)
+            return batch
+        finally:
+            metrics.WRITE_BEHIND_FLUSH_LATENCY.labels(queue=self.name, outcome=outcome).observe(
+                time.perf_counter() - started
+            )
+        self._count('written', len(batch))
+        return []
+
+    def _retry_failed(self, batch, write_errors):
+        # insert_many mengisi _id di setiap dokumen, jadi dokumen yang sudah tersimpan di
+        # percobaan sebelumnya kembali sebagai duplicate key: dianggap sudah tertulis
+        failed = {error['index']: error for error in write_errors if error.get('code') != DUPLICATE_KEY}
+        self._count('written', len(batch) - len(failed))
+        retry = []
+        for index, error in sorted(failed.items()):
+            doc, attempts = batch[index]
+            attempts += 1
+            if attempts >= self.max_attempts:
+                self._count('dropped')
+                logger.error("%s record dropped after %s attempts: %s", self.name, attempts, error.get('errmsg'))
+            else:
+                retry.append([doc, attempts])
+        if retry:
+            logger.warning("%s flush: %s of %s records failed, retrying", self.name, len(retry), len(batch))
+        return retry
+
+    def _run(self):
+        batch = []
+        next_flush = time.monotonic() + self.flush_interval
+        retry_at = 0.0
+        while True:
+            stopping = self._stop.is_set()
+            now = time.monotonic()
+            if len(batch) < self.batch_size:
+                try:
+                    if stopping:
+                        batch.append([self._queue.get_nowait(), 0])
+                    else:
+                        batch.append([self._queue.get(timeout=max(0.001, next_flush - now)), 0])
+                    while len(batch) < self.batch_size:
+                        batch.append([self._queue.get_nowait(), 0])
+                except queue.Empty:
+                    pass
+                self._report_depth()
+            elif not stopping:
+                # Batch penuh tapi flush sebelumnya gagal: tunggu jadwal retry
+                self._stop.wait(max(0.0, retry_at - now))
+
+            now = time.monotonic()
+            due = len(batch) >= self.batch_size or now >= next_flush or stopping
+            if batch and due and (now >= retry_at or stopping):
+                batch = self._flush(batch)
+                if batch and stopping:
+                    self._count('dropped', len(batch))
+                    batch = []
+                elif batch:
+                    retry_at = now + self.flush_interval
+            if now >= next_flush:
+                next_flush = now + self.flush_interval
+            if stopping and not batch and self._queue.empty():
+                return
+
+    def close(self):
+        """Kuras antrian ke MongoDB (dipanggil saat proses berhenti)."""
+        if self._pid != os.getpid() or self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(self.drain_timeout)
+        if self._thread.is_alive():
+            logger.error("%s drain timed out, %s records left", self.name, self._queue.qsize())
+
+    def stats(self):
+        return {
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'max_size': self.max_size,
+            'batch_size': self.batch_size,
+            'flush_interval_seconds': self.flush_interval,
+            'overflow': self.overflow,
+        }
+
+
+login_history_writer = WriteBehindWriter('login_history', history_collection)